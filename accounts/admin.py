@@ -1,9 +1,12 @@
 # accounts/admin.py
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from django.utils import timezone
 from django.contrib import messages
 
+from . import payments
+from .admin_paging import ScalableChangeListMixin
+from .audit import log_event
+from .exports import AUDIT_EVENT_COLUMNS, PAYMENT_COLUMNS, stream_export
 from .models import (
     User,
     UserProfile,
@@ -13,6 +16,7 @@ from .models import (
     AgreementTemplate,
     UserAgreement,
     AuditEvent,
+    AuditEventRollup,
     CaseTimelineEvent,
     SentimentSnapshot,
 )
@@ -64,24 +68,16 @@ class AgreementTemplateAdmin(admin.ModelAdmin):
 # --------------------------------------------------
 # Admin Actions
 # --------------------------------------------------
-@admin.action(description="📤 إرسال الاتفاقية للعميل")
-def send_agreement(modeladmin, request, queryset):
-    sent_count = 0
-
-    for ag in queryset:
-        if ag.status == "sent":
-            continue
+# إجراءات الاتفاقيات على مجموعة (accounts/payments.py) + ملخص audit واحد
+def _log_bulk(request, action, rows, status):
+    if rows:
+        log_event(request, "admin_action", action=action, count=len(rows), status=status)
 
-        ag.status = "sent"
-        ag.sent_at = timezone.now()
-        ag.save(update_fields=["status", "sent_at"])
 
-        user = ag.user
-        if user.account_status == "active":
-            user.account_status = "pending_agreement"
-            user.save(update_fields=["account_status"])
-
-        sent_count += 1
+@admin.action(description="📤 إرسال الاتفاقية للعميل")
+def send_agreement(modeladmin, request, queryset):
+    sent_count, rows = payments.send_agreements(queryset)
+    _log_bulk(request, "send_agreement", rows, "sent")
 
     messages.success(
         request,
@@ -91,28 +87,36 @@ def send_agreement(modeladmin, request, queryset):
 
 @admin.action(description="✅ اعتماد الدفع (تفعيل الاتفاقية والحساب)")
 def approve_payment(modeladmin, request, queryset):
-    now = timezone.now()
+    approved, rows = payments.approve_payments(queryset)
+    _log_bulk(request, "approve_payment", rows, "paid")
+    messages.success(request, f"تم اعتماد {approved} دفعة.")
 
-    for ag in queryset:
-        ag.status = "paid"
-        ag.paid_at = now
 
-        if not ag.receipt_number:
-            ag.receipt_number = f"OFFICE-{now.strftime('%Y%m%d')}-{ag.id}"
+@admin.action(description="❌ رفض الدفع (إرجاعها لانتظار الدفع)")
+def reject_payment(modeladmin, request, queryset):
+    rejected, rows = payments.reject_payments(queryset)
+    _log_bulk(request, "reject_payment", rows, "payment_pending")
+    messages.success(request, f"تم إرجاع {rejected} اتفاقية لانتظار الدفع.")
 
-        ag.save()
 
-        user = ag.user
-        if user.account_status != "active":
-            user.account_status = "active"
-            user.save(update_fields=["account_status"])
+@admin.action(description="⬇️ تصدير بيانات الدفع CSV")
+def export_payments_csv(modeladmin, request, queryset):
+    return stream_export(queryset.order_by("-created_at"), PAYMENT_COLUMNS, "csv", "payments")
 
 
-@admin.action(description="❌ رفض الدفع (إرجاعها لانتظار الدفع)")
-def reject_payment(modeladmin, request, queryset):
-    for ag in queryset:
-        ag.status = "payment_pending"
-        ag.save()
+@admin.action(description="⬇️ تصدير بيانات الدفع NDJSON")
+def export_payments_ndjson(modeladmin, request, queryset):
+    return stream_export(queryset.order_by("-created_at"), PAYMENT_COLUMNS, "ndjson", "payments")
+
+
+@admin.action(description="⬇️ تصدير السجلات CSV")
+def export_events_csv(modeladmin, request, queryset):
+    return stream_export(queryset.order_by("-created_at"), AUDIT_EVENT_COLUMNS, "csv", "audit_events")
+
+
+@admin.action(description="⬇️ تصدير السجلات NDJSON")
+def export_events_ndjson(modeladmin, request, queryset):
+    return stream_export(queryset.order_by("-created_at"), AUDIT_EVENT_COLUMNS, "ndjson", "audit_events")
 
 
 # --------------------------------------------------
@@ -139,6 +143,7 @@ class UserAgreementAdmin(admin.ModelAdmin):
         "user__username",
         "office_invoice_number",
         "client_payment_receipt",
+        "=receipt_code_normalized",
         "token",
     )
 
@@ -151,6 +156,8 @@ class UserAgreementAdmin(admin.ModelAdmin):
         send_agreement,
         approve_payment,
         reject_payment,
+        export_payments_csv,
+        export_payments_ndjson,
     ]
 
     fieldsets = (
@@ -181,6 +188,7 @@ class UserAgreementAdmin(admin.ModelAdmin):
                 "office_invoice_number",
                 "client_payment_receipt",
                 "client_receipt_image",
+                "receipt_duplicate_of",
                 "receipt_number",
                 "paid_at",
                 "receipt_pdf",
@@ -195,18 +203,34 @@ class UserAgreementAdmin(admin.ModelAdmin):
         "sent_at",
         "created_at",
         "paid_at",
+        "receipt_duplicate_of",
     )
 
 
 # --------------------------------------------------
 # Extra Registers
 # --------------------------------------------------
+# جداول كبيرة: عدد تقديري + "التالي" بمؤشر + date_hierarchy على created_at المفهرس
+# والبحث مطابقة تامة (=) أو بداية (^) بدل icontains عبر الـ joins
 @admin.register(AuditEvent)
-class AuditEventAdmin(admin.ModelAdmin):
-    list_display = ("event_type", "user", "path", "ip", "created_at")
+class AuditEventAdmin(ScalableChangeListMixin, admin.ModelAdmin):
+    list_display = ("event_type", "user", "path", "ip", "count", "created_at")
     list_filter = ("event_type",)
-    search_fields = ("user__username", "path", "ip")
+    list_select_related = ("user", "path")
+    search_fields = ("=user__username", "^path__value", "=ip", "=token", "=case_number")
+    raw_id_fields = ("user", "path", "user_agent")
     ordering = ("-created_at",)
+    date_hierarchy = "created_at"
+    actions = [export_events_csv, export_events_ndjson]
+
+
+@admin.register(AuditEventRollup)
+class AuditEventRollupAdmin(admin.ModelAdmin):
+    list_display = ("day", "event_type", "user", "path", "count")
+    list_filter = ("event_type",)
+    search_fields = ("user__username", "path")
+    ordering = ("-day",)
+    date_hierarchy = "day"
 
 
 @admin.register(CaseTimelineEvent)
@@ -218,11 +242,14 @@ class CaseTimelineEventAdmin(admin.ModelAdmin):
 
 
 @admin.register(SentimentSnapshot)
-class SentimentSnapshotAdmin(admin.ModelAdmin):
+class SentimentSnapshotAdmin(ScalableChangeListMixin, admin.ModelAdmin):
     list_display = ("target", "label", "score", "user", "case", "created_at")
     list_filter = ("target", "label")
-    search_fields = ("user__username", "case__case_number")
+    list_select_related = ("user", "case")
+    search_fields = ("=user__username", "=case__case_number")
+    raw_id_fields = ("user", "case")
     ordering = ("-created_at",)
+    date_hierarchy = "created_at"
 
 
 admin.site.register(UserProfile)
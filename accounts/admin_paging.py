@@ -0,0 +1,269 @@
+# accounts/admin_paging.py
+"""
+Changelist للجداول الكبيرة (AuditEvent / SentimentSnapshot) في الأدمن:
+
+- EstimatedCountPaginator: بدون COUNT(*) كامل
+    * بدون فلاتر => تقدير من إحصائيات القاعدة (PostgreSQL reltuples / MySQL TABLE_ROWS)
+      أو MAX(pk) - MIN(pk) + 1 (SQLite، من طرفي الفهرس)
+    * مع فلاتر => COUNT على LIMIT COUNT_CAP (العدد المعروض "10000+")
+- KeysetChangeList: "التالي" بمؤشر (created_at, pk) بدل OFFSET (?after=...)
+  متاح مع الترتيب الافتراضي فقط؛ الصفحة لا تعدّ شيئًا ولا تتباطأ مع العمق.
+- indexed_date_hierarchy: روابط date_hierarchy بقفزات MIN(field) >= بداية الفترة التالية
+  (loose index scan) بدل DISTINCT على كل الصفوف (admin/accounts/scalable_change_list.html)
+
+    class AuditEventAdmin(ScalableChangeListMixin, admin.ModelAdmin):
+        keyset_field = "created_at"
+"""
+import calendar
+import datetime
+
+from django.conf import settings
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.db.models import Max, Min, Q
+from django.utils import formats, timezone
+from django.utils.functional import cached_property
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+from .messaging import InvalidCursor, decode_cursor, encode_cursor
+from .query_budget import budget_exempt
+
+KEYSET_VAR = "after"
+COUNT_CAP = 10_000
+
+
+def estimated_rows(model, using="default"):
+    """
+    عدد صفوف الجدول تقريبيًا بدون مسح. None => غير متاح.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", [table])
+            row = cursor.fetchone()
+            # -1 => الجدول لم يُحلَّل بعد (ANALYZE)
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor == "mysql":
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+                [table],
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+    bounds = model._base_manager.using(using).aggregate(lo=Min("pk"), hi=Max("pk"))
+    if bounds["lo"] is None:
+        return 0
+    return bounds["hi"] - bounds["lo"] + 1
+
+
+class EstimatedCountPaginator(Paginator):
+    # "" دقيق | "estimated" تقدير الجدول كاملًا | "capped" أكثر من COUNT_CAP
+    count_kind = ""
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if not qs.query.where and not qs.query.distinct:
+            estimate = estimated_rows(qs.model, qs.db)
+            if estimate is not None:
+                self.count_kind = "estimated"
+                return estimate
+        n = qs.order_by()[:COUNT_CAP + 1].count()
+        if n > COUNT_CAP:
+            self.count_kind = "capped"
+            return COUNT_CAP
+        return n
+
+
+class KeysetChangeList(ChangeList):
+    def __init__(self, request, *args, **kwargs):
+        self.keyset_cursor = request.GET.get(KEYSET_VAR) or None
+        self.keyset_next_url = ""
+        self.keyset_first_url = ""
+        super().__init__(request, *args, **kwargs)
+
+    @property
+    def keyset_enabled(self):
+        return ORDER_VAR not in self.params and not self.list_editable
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(KEYSET_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # روابط الفلاتر/الترتيب تبدأ من أول القائمة
+        if not new_params or KEYSET_VAR not in new_params:
+            remove = [*(remove or []), KEYSET_VAR]
+        return super().get_query_string(new_params, remove)
+
+    def get_queryset(self, request, exclude_parameters=None):
+        qs = super().get_queryset(request, exclude_parameters)
+        if self.keyset_cursor and self.keyset_enabled:
+            try:
+                value, pk = decode_cursor(self.keyset_cursor)
+            except InvalidCursor as e:
+                raise IncorrectLookupParameters(e)
+            field = self.model_admin.keyset_field
+            qs = qs.filter(Q(**{f"{field}__lt": value}) | Q(**{field: value, "pk__lt": pk}))
+        return qs
+
+    def _cursor_for(self, obj):
+        return encode_cursor(getattr(obj, self.model_admin.keyset_field), obj.pk)
+
+    def get_results(self, request):
+        if not (self.keyset_cursor and self.keyset_enabled):
+            super().get_results(request)
+            if self.keyset_enabled and self.multi_page and not self.show_all:
+                # صفحة ممتلئة => قد يوجد تالٍ (حتى بعد آخر صفحة في العدد المحدود)
+                self.result_list = list(self.result_list)
+                if len(self.result_list) == self.list_per_page:
+                    self.keyset_next_url = self.get_query_string({KEYSET_VAR: self._cursor_for(self.result_list[-1])})
+            return
+
+        # صفحة بمؤشر: LIMIT فقط (+1 لمعرفة وجود التالي)، بدون COUNT
+        rows = list(self.queryset[:self.list_per_page + 1])
+        self.result_list = rows[:self.list_per_page]
+        if len(rows) > self.list_per_page:
+            self.keyset_next_url = self.get_query_string({KEYSET_VAR: self._cursor_for(self.result_list[-1])})
+        self.keyset_first_url = self.get_query_string()
+
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = len(self.result_list)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = False
+
+
+class ScalableChangeListMixin:
+    """
+    ModelAdmin لجدول كبير مرتب بـ keyset_field تنازليًا (ordering + فهرس على الحقل).
+    """
+    keyset_field = "created_at"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = "admin/accounts/scalable_change_list.html"
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+# --------------------------------------------------
+# date_hierarchy
+# --------------------------------------------------
+def _period_start(value, step):
+    value = timezone.localtime(value) if timezone.is_aware(value) else value
+    if step == "year":
+        return datetime.date(value.year, 1, 1)
+    if step == "month":
+        return datetime.date(value.year, value.month, 1)
+    return value.date()
+
+
+def _next_period(day, step):
+    if step == "year":
+        return datetime.date(day.year + 1, 1, 1)
+    if step == "month":
+        return day.replace(day=calendar.monthrange(day.year, day.month)[1]) + datetime.timedelta(days=1)
+    return day + datetime.timedelta(days=1)
+
+
+def _as_bound(day, is_datetime):
+    if not is_datetime:
+        return day
+    value = datetime.datetime.combine(day, datetime.time.min)
+    return timezone.make_aware(value) if settings.USE_TZ else value
+
+
+def distinct_periods(qs, field, step, is_datetime=True):
+    """
+    الفترات (year/month/day) التي فيها صفوف: استعلام MIN واحد لكل فترة موجودة (فهرس field).
+    """
+    qs = qs.order_by()
+    periods = []
+    lower = None
+    # استعلام لكل فترة مقصود (ليس N+1)
+    with budget_exempt():
+        while True:
+            page = qs if lower is None else qs.filter(**{f"{field}__gte": _as_bound(lower, is_datetime)})
+            first = page.aggregate(first=Min(field))["first"]
+            if first is None:
+                return periods
+            start = _period_start(first, step)
+            periods.append(start)
+            lower = _next_period(start, step)
+
+
+def indexed_date_hierarchy(cl):
+    """
+    نفس بيانات date_hierarchy في django.contrib.admin (admin/date_hierarchy.html).
+    """
+    if not cl.date_hierarchy:
+        return {"show": False}
+    field_name = cl.date_hierarchy
+    is_datetime = isinstance(cl.model._meta.get_field(field_name), models.DateTimeField)
+    year_field, month_field, day_field = (f"{field_name}__{p}" for p in ("year", "month", "day"))
+    year_lookup = cl.params.get(year_field)
+    month_lookup = cl.params.get(month_field)
+    day_lookup = cl.params.get(day_field)
+
+    def link(filters):
+        return cl.get_query_string(filters, [f"{field_name}__"])
+
+    if not (year_lookup or month_lookup or day_lookup):
+        bounds = cl.queryset.order_by().aggregate(first=Min(field_name), last=Max(field_name))
+        if bounds["first"] and bounds["last"]:
+            first, last = _period_start(bounds["first"], "day"), _period_start(bounds["last"], "day")
+            if first.year == last.year:
+                year_lookup = first.year
+                if first.month == last.month:
+                    month_lookup = first.month
+
+    if year_lookup and month_lookup and day_lookup:
+        day = datetime.date(int(year_lookup), int(month_lookup), int(day_lookup))
+        return {
+            "show": True,
+            "back": {
+                "link": link({year_field: year_lookup, month_field: month_lookup}),
+                "title": capfirst(formats.date_format(day, "YEAR_MONTH_FORMAT")),
+            },
+            "choices": [{"title": capfirst(formats.date_format(day, "MONTH_DAY_FORMAT"))}],
+        }
+    if year_lookup and month_lookup:
+        days = distinct_periods(cl.queryset, field_name, "day", is_datetime)
+        return {
+            "show": True,
+            "back": {"link": link({year_field: year_lookup}), "title": str(year_lookup)},
+            "choices": [
+                {
+                    "link": link({year_field: year_lookup, month_field: month_lookup, day_field: day.day}),
+                    "title": capfirst(formats.date_format(day, "MONTH_DAY_FORMAT")),
+                }
+                for day in days
+            ],
+        }
+    if year_lookup:
+        months = distinct_periods(cl.queryset, field_name, "month", is_datetime)
+        return {
+            "show": True,
+            "back": {"link": link({}), "title": _("All dates")},
+            "choices": [
+                {
+                    "link": link({year_field: year_lookup, month_field: month.month}),
+                    "title": capfirst(formats.date_format(month, "YEAR_MONTH_FORMAT")),
+                }
+                for month in months
+            ],
+        }
+    years = distinct_periods(cl.queryset, field_name, "year", is_datetime)
+    return {
+        "show": True,
+        "back": None,
+        "choices": [{"link": link({year_field: str(year.year)}), "title": str(year.year)} for year in years],
+    }
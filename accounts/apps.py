@@ -5,3 +5,6 @@ class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
     verbose_name = 'الحسابات'
+
+    def ready(self):
+        from . import badges, checks, realtime  # noqa: F401  (signals: شارات الهيدر + التحديثات المباشرة؛ فحوص النشر)
@@ -0,0 +1,335 @@
+# accounts/audit.py
+"""
+سياسة تسجيل AuditEvent لكل نوع حدث (AUDIT_EVENT_POLICIES في settings):
+
+- "always"   : صف لكل حدث (الافتراضي)
+- "sample"   : يسجل نسبة rate فقط، والصف يحمل count = 1/rate (وزن العينة)
+- "coalesce" : نفس (النوع + المستخدم/IP + المسار + meta) خلال window ثانية
+               => صف واحد، والتكرارات تُعد في الـ cache وتُضاف للصف (count)
+               كل flush_every تكرار أو عند بداية نافذة جديدة.
+               صف واحد بين الـ workers يحتاج cache مشتركًا (Redis / Memcached).
+
+أحداث الأمان (SECURITY_EVENT_TYPES) تُسجل دائمًا مهما كانت الإعدادات.
+ملاحظة: تكرارات أقل من flush_every في نافذة لم يعد لها المستخدم قد لا تُضاف للعدد
+(مقبول لتصفح الصفحات فقط).
+
+طلبات GET تستخدم defer(): الأحداث تُجمع في الذاكرة وتُكتب دفعات من thread خلفي
+(AUDIT_DEFERRED) => صفحة العرض لا تكتب في DB. أحداث الأمان (auth_logout عبر GET مثلًا)
+تُكتب فورًا حتى من defer().
+
+meta = dict (JSONField). المفاتيح الأكثر استعلامًا (PROMOTED_META_KEYS) تُنقل
+لأعمدة مفهرسة في AuditEvent => سجل اتفاقية/قضية/ملف بدون LIKE.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+
+from . import interning, metrics, throttle
+from .models import AuditEvent
+
+logger = logging.getLogger("security")
+
+SECURITY_EVENT_TYPES = frozenset({
+    "auth_login",
+    "auth_logout",
+    "auth_failed",
+    "agreement_accept",
+    "agreement_sign",
+    "payment_submit",
+    "admin_action",
+    "security_block",
+    "data_export",
+})
+
+ALWAYS = {"mode": "always"}
+
+PROMOTED_META_KEYS = ("case_number", "token", "folder_id", "error_code")
+_PROMOTED_MAX_LEN = {"case_number": 50, "token": 64, "error_code": 64}
+
+
+# --------------------------------------------------
+# meta
+# --------------------------------------------------
+def split_meta(meta):
+    """
+    يفصل المفاتيح المفهرسة (أعمدة) عن باقي meta. يرجع (columns, rest).
+    """
+    rest = dict(meta or {})
+    columns = {}
+    for key in PROMOTED_META_KEYS:
+        value = rest.pop(key, None)
+        if value in (None, ""):
+            continue
+        if key == "folder_id":
+            try:
+                columns[key] = int(value)
+            except (TypeError, ValueError):
+                rest["folder"] = value
+            continue
+        columns[key] = str(value)[: _PROMOTED_MAX_LEN[key]]
+    return columns, rest
+
+
+# النص القديم: "token:X receipt:Y" / "case:X" / "folder:1 title:..." / "payment_page:TOKEN" / "signature_invalid"
+_LEGACY_PAIR_RE = re.compile(r"\s*\b(token|case|folder|receipt|title):")
+_LEGACY_PAIR_KEYS = {"token": "token", "case": "case_number", "folder": "folder_id", "receipt": "receipt", "title": "title"}
+_LEGACY_ENTITY_KEYS = {
+    "agreement_view": "token",
+    "payment_page": "token",
+    "payment_pending_review": "token",
+    "payment_success": "token",
+    "case_timeline": "case_number",
+    "master_client_detail": "folder_id",
+}
+_ERROR_EVENT_TYPES = {"security_block", "auth_failed"}
+
+
+def parse_legacy_meta(event_type, text):
+    """
+    يحول meta النصي القديم إلى dict (rehydrate للأرشيف القديم؛ migration 0021 له نسخة مجمدة).
+    """
+    text = (text or "").strip()
+    if not text:
+        return {}
+
+    parts = _LEGACY_PAIR_RE.split(text)
+    if len(parts) > 1 and parts[0] == "":
+        return {_LEGACY_PAIR_KEYS[k]: v.strip() for k, v in zip(parts[1::2], parts[2::2])}
+
+    head, sep, rest = text.partition(":")
+    if sep and head in _LEGACY_ENTITY_KEYS:
+        return {"action": head, _LEGACY_ENTITY_KEYS[head]: rest.strip()}
+    if event_type in _ERROR_EVENT_TYPES and re.fullmatch(r"\w+", head):
+        return {"error_code": head, "detail": rest.strip()} if sep else {"error_code": head}
+    if re.fullmatch(r"\w+", text):
+        return {"action": text}
+    return {"text": text}
+
+
+def policy_for(event_type: str) -> dict:
+    if event_type in SECURITY_EVENT_TYPES:
+        return ALWAYS
+    return getattr(settings, "AUDIT_EVENT_POLICIES", {}).get(event_type, ALWAYS)
+
+
+def _prepare(fields):
+    columns, rest = split_meta(fields.pop("meta", None))
+    fields.update(columns)
+    fields["meta"] = rest or None
+    fields["path_id"] = interning.paths.id_for(fields.pop("path", ""))
+    fields["user_agent_id"] = interning.user_agents.id_for(fields.pop("user_agent", ""))
+    return fields
+
+
+def _sampled_out(fields, policy):
+    """
+    True => الحدث لا يُسجل. المسجل يحمل count = 1/rate.
+    """
+    if policy.get("mode") != "sample":
+        return False
+    rate = float(policy.get("rate", 1.0))
+    if rate <= 0 or random.random() >= rate:
+        return True
+    fields["count"] = max(1, round(1 / rate))
+    return False
+
+
+def record(**fields):
+    """
+    يطبق سياسة النوع ثم يكتب (أو لا يكتب). يرجع AuditEvent إن أُنشئ صف جديد.
+    """
+    policy = policy_for(fields["event_type"])
+    if _sampled_out(fields, policy):
+        return None
+    fields = _prepare(fields)
+    if policy.get("mode") == "coalesce":
+        return _coalesce(fields, policy)
+    return AuditEvent.objects.create(**fields)
+
+
+def _coalesce_key(fields):
+    user = fields.get("user")
+    who = f"u{user.pk}" if user is not None else f"ip{fields.get('ip') or ''}"
+    meta = {k: fields.get(k) for k in PROMOTED_META_KEYS}
+    meta.update(fields.get("meta") or {})
+    raw = "|".join((fields["event_type"], who, str(fields.get("path_id")), json.dumps(meta, sort_keys=True, default=str)))
+    return "audit:co:" + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _take_pending(pk, pending_key, n):
+    """
+    ينقل n من عداد الـ cache إلى count الصف. decr بنفس n => التكرارات التي وصلت
+    في الأثناء تبقى في العداد (لا تضيع ولا تُحسب مرتين).
+    """
+    if n <= 0:
+        return
+    try:
+        cache.decr(pending_key, n)
+    except ValueError:  # انتهى العداد => لا شيء لنقله
+        return
+    AuditEvent.objects.filter(pk=pk).update(count=F("count") + n, last_seen_at=timezone.now())
+
+
+def _coalesce(fields, policy):
+    """
+    كل العمليات على الـ cache ذرية (add / incr / decr) => طلبات متزامنة لا تفتح نافذتين
+    ولا تفقد تكرارات. بين عدة workers فقط مع cache مشترك (Redis / Memcached):
+    LocMemCache (CACHES الافتراضي) لكل عملية => نافذة وصف لكل worker (فحص accounts.W002).
+
+    - key:open  (TTL = window)  : cache.add ينجح لطلب واحد => هو من يفتح النافذة وينشئ الصف
+    - key       (TTL = window*2): pk صف النافذة الحالية (يبقى بعدها لنقل الباقي)
+    - key:n                     : التكرارات غير المضافة بعد (cache.incr)
+    """
+    window = int(policy.get("window", 300))
+    flush_every = int(policy.get("flush_every", 20))
+    key = _coalesce_key(fields)
+    pending_key = f"{key}:n"
+
+    if cache.add(f"{key}:open", 1, timeout=window):
+        previous = cache.get(key)
+        if previous:
+            _take_pending(previous["pk"], pending_key, cache.get(pending_key) or 0)
+        event = AuditEvent.objects.create(**fields)
+        cache.set(key, {"pk": event.pk}, timeout=window * 2)
+        return event
+
+    cache.add(pending_key, 0, timeout=window * 2)
+    try:
+        pending = cache.incr(pending_key)
+    except ValueError:  # انتهى بين add و incr
+        cache.set(pending_key, 1, timeout=window * 2)
+        pending = 1
+    # مضاعفات flush_every فقط: incr يرجع كل قيمة لطلب واحد => flush واحد لكل دفعة
+    if pending % flush_every == 0:
+        entry = cache.get(key)
+        if entry:
+            _take_pending(entry["pk"], pending_key, flush_every)
+    return None
+
+
+# --------------------------------------------------
+# Deferred writes (طلبات GET بدون كتابة في DB)
+# --------------------------------------------------
+def _deferred_config():
+    return {"ENABLED": False, "FLUSH_INTERVAL": 2.0, "MAX_BUFFER": 500, **getattr(settings, "AUDIT_DEFERRED", {})}
+
+
+def _write_batch(items):
+    """
+    دفعة واحدة: coalesce عبر الـ cache كالمعتاد، والباقي bulk_create واحد.
+    (created_at = وقت الكتابة، أي متأخر حتى FLUSH_INTERVAL ثانية)
+    """
+    rows = []
+    for fields in items:
+        fields = _prepare(fields)
+        policy = policy_for(fields["event_type"])
+        if policy.get("mode") == "coalesce":
+            _coalesce(fields, policy)
+        else:
+            rows.append(AuditEvent(**fields))
+    AuditEvent.objects.bulk_create(rows)
+
+
+class DeferredAuditWriter:
+    """
+    طابور داخل العملية + thread خلفي يكتب كل FLUSH_INTERVAL ثانية
+    (أو فورًا عند MAX_BUFFER). الطلب نفسه لا يلمس DB ولا قفل الكتابة.
+    """
+
+    def __init__(self):
+        self._items = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def add(self, fields, config):
+        with self._lock:
+            self._items.append(fields)
+            size = len(self._items)
+            # بعد fork (gunicorn --preload) الـ thread لا ينتقل للعملية الجديدة
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, args=(config["FLUSH_INTERVAL"],), name="audit-writer", daemon=True,
+                )
+                self._thread.start()
+        if size >= config["MAX_BUFFER"]:
+            self._wake.set()
+
+    def _run(self, interval):
+        while True:
+            self._wake.wait(interval)
+            self._wake.clear()
+            self.flush()
+            connections.close_all()  # اتصالات هذا الـ thread فقط
+
+    def flush(self):
+        with self._lock:
+            items, self._items = self._items, []
+        if not items:
+            return 0
+        try:
+            _write_batch(items)
+        except Exception:
+            logger.exception("Deferred audit flush failed (%d events dropped)", len(items))
+        return len(items)
+
+
+deferred_writer = DeferredAuditWriter()
+atexit.register(deferred_writer.flush)
+
+
+def defer(**fields):
+    """
+    مثل record لكن الكتابة مؤجلة (AUDIT_DEFERRED). العينة تُحسم فورًا
+    حتى لا تدخل الأحداث المستبعدة الطابور. SECURITY_EVENT_TYPES => record دائمًا.
+    """
+    config = _deferred_config()
+    # أحداث الأمان لا تنتظر في الذاكرة (تضيع لو توقفت العملية قبل flush)
+    if not config["ENABLED"] or fields["event_type"] in SECURITY_EVENT_TYPES:
+        return record(**fields)
+    if _sampled_out(fields, policy_for(fields["event_type"])):
+        return None
+    deferred_writer.add(fields, config)
+    return None
+
+
+def flush_deferred():
+    return deferred_writer.flush()
+
+
+# --------------------------------------------------
+# من الطلب
+# --------------------------------------------------
+def log_event(request, event_type: str, **meta):
+    """
+    حدث من طلب HTTP (views / admin): المستخدم + المسار + IP + User-Agent من الطلب.
+    meta => JSON (مثال: action="user_dashboard" / token=... / error_code=..., detail=...).
+    """
+    # GET/HEAD: كتابة مؤجلة (دفعات) => صفحة العرض لا تكتب في DB
+    # (أحداث الأمان SECURITY_EVENT_TYPES تُكتب فورًا داخل defer)
+    write = defer if request.method in ("GET", "HEAD") else record
+    try:
+        write(
+            user=request.user if getattr(request, "user", None) and request.user.is_authenticated else None,
+            event_type=event_type,
+            path=request.path[:300] if request.path else "",
+            ip=throttle.client_ip(request),
+            user_agent=(request.META.get("HTTP_USER_AGENT") or "")[:300],
+            meta=meta,
+        )
+        metrics.inc_audit_event(event_type)
+    except Exception:
+        pass
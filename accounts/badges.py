@@ -0,0 +1,117 @@
+# accounts/badges.py
+"""
+شارات الهيدر (header.html) من cache:
+
+- العميل  : رسائل المكتب غير المقروءة (ClientMasterFolder.unread_from_lawyer)
+- الموظفون: مدفوعات بانتظار المراجعة + رسائل عملاء غير مقروءة (مشتركة بين كل الموظفين)
+
+القيم في cache حتى HEADER_BADGES["TTL"]، وتُحذف عند تغيّر الرسائل/الاتفاقيات
+(signals أدناه، بعد commit) => الطلب المعتاد بدون أي استعلام للهيدر.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .messaging import messages_read
+from .models import ClientMasterFolder, ClientMasterMessage, UserAgreement
+
+DEFAULTS = {
+    "CACHE": "default",
+    "TTL": 300,
+}
+
+STAFF_KEY = "badges:staff"
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "HEADER_BADGES", {})}
+
+
+def _cache():
+    return caches[get_config()["CACHE"]]
+
+
+def client_key(user_id):
+    return f"badges:u{user_id}"
+
+
+def _compute_client(user_id):
+    unread = (
+        ClientMasterFolder.objects.filter(user_id=user_id)
+        .values_list("unread_from_lawyer", flat=True)
+        .first()
+    )
+    return {"unread_messages": unread or 0}
+
+
+def _compute_staff():
+    # الشرط = شرط folder_unread_client_idx (partial) => مسح الفهرس الصغير فقط، لا جدول الملفات كله
+    unread = ClientMasterFolder.objects.filter(unread_from_client__gt=0).aggregate(n=Sum("unread_from_client"))["n"]
+    return {
+        "pending_payments": UserAgreement.objects.filter(status="under_review").count(),
+        "unread_messages": unread or 0,
+    }
+
+
+def badge_counts(user):
+    """
+    يرجع dict الشارات للمستخدم (فارغ للزائر).
+    """
+    if not user or not user.is_authenticated:
+        return {}
+    if user.is_staff:
+        key, compute = STAFF_KEY, _compute_staff
+    else:
+        key, compute = client_key(user.pk), lambda: _compute_client(user.pk)
+
+    cache = _cache()
+    counts = cache.get(key)
+    if counts is None:
+        counts = compute()
+        cache.set(key, counts, timeout=get_config()["TTL"])
+    return counts
+
+
+def invalidate(*user_ids, staff=True):
+    """
+    الحذف بعد commit: القراءة قبلها قد تعيد ملء الـ cache بقيم قديمة.
+    """
+    keys = [client_key(uid) for uid in user_ids if uid]
+    if staff:
+        keys.append(STAFF_KEY)
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+# --------------------------------------------------
+# Signals
+# --------------------------------------------------
+def _folder_user_id(folder_id):
+    return ClientMasterFolder.objects.filter(pk=folder_id).values_list("user_id", flat=True).first()
+
+
+# بدون post_delete: receiver عليه يلغي fast-delete للـ cascade (حذف مستخدم = صف صف).
+# الحذف نادر والقيمة تنتهي بعد TTL.
+@receiver(post_save, sender=ClientMasterMessage)
+def _on_message_change(sender, instance, **kwargs):
+    if instance.direction == "client":
+        invalidate()  # تغيّر unread_from_client فقط
+        return
+    cached = ClientMasterMessage.folder.is_cached(instance)
+    invalidate(instance.folder.user_id if cached else _folder_user_id(instance.folder_id))
+
+
+@receiver(messages_read)
+def _on_messages_read(sender, folder, direction, **kwargs):
+    # العميل قرأ => شارته فقط؛ المكتب قرأ => شارة الموظفين فقط
+    if direction == "lawyer":
+        invalidate(folder.user_id, staff=False)
+    else:
+        invalidate()
+
+
+@receiver(post_save, sender=UserAgreement)
+def _on_agreement_change(sender, instance, **kwargs):
+    invalidate()
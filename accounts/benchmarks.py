@@ -0,0 +1,356 @@
+# accounts/benchmarks.py
+"""
+Benchmarks للصفحات الساخنة والدوال المساعدة (تشغيل: python manage.py run_benchmarks).
+
+- تعمل على قاعدة البيانات الحالية (يفضل بعد seed_synthetic).
+- كل شيء داخل transaction يتم التراجع عنها => لا تتغير البيانات.
+- الملفات المرفوعة (توقيع/إيصال) تكتب في MEDIA_ROOT مؤقت.
+"""
+import asyncio
+import base64
+import statistics
+import tempfile
+import time
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.db import connection, connections, transaction
+from django.test import AsyncRequestFactory, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from .models import User, ClientMasterFolder, UserAgreement
+from .security import validate_safe_multiline, validate_safe_text
+from .sentiment import analyze_sentiment
+
+
+# PNG 1x1 صالح (للتوقيع وصورة الإيصال)
+_PNG_1PX = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+SAMPLE_TEXT = (
+    "السلام عليكم، أنا قلق من تأخر القضية وأحتاج متابعة مستمرة.\n"
+    "الحمد لله الأمور أفضل بعد الجلسة الأخيرة - شكرًا لكم (رقم 12345).\n"
+) * 20
+
+
+class BenchmarkSkipped(Exception):
+    pass
+
+
+def _summary(samples_ms, queries=None):
+    ordered = sorted(samples_ms)
+    n = len(ordered)
+    out = {
+        "iterations": n,
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(ordered[n // 2], 3),
+        "p95_ms": round(ordered[min(n - 1, int(n * 0.95))], 3),
+        "min_ms": round(ordered[0], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+    if queries is not None:
+        out["queries"] = int(statistics.median(queries))
+    return out
+
+
+class BenchmarkRunner:
+    def __init__(self, iterations: int = 20, warmup: int = 2, micro_number: int = 2000):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.micro_number = micro_number
+
+    # --------------------------------------------------
+    # Fixtures (من البيانات الموجودة)
+    # --------------------------------------------------
+    def _staff_user(self):
+        staff = User.objects.filter(is_staff=True, is_active=True).order_by("id").first()
+        if staff:
+            return staff
+        # فقط داخل transaction الـ rollback في run() => لا يبقى في قاعدة البيانات
+        if not connection.in_atomic_block:
+            raise RuntimeError("bench_staff يُنشأ داخل transaction.atomic() فقط")
+        return User.objects.create_user(
+            username="bench_staff", email="bench_staff@example.sa", password=None, is_staff=True,
+        )
+
+    @staticmethod
+    def _client_user():
+        # عميل عنده قضايا ورسائل (أثقل حالة واقعية)
+        folder = (
+            ClientMasterFolder.objects.filter(messages__isnull=False, user__account_cases__isnull=False)
+            .select_related("user")
+            .order_by("id")
+            .first()
+        )
+        if not folder:
+            raise BenchmarkSkipped("لا توجد بيانات عملاء. شغّل seed_synthetic أولًا.")
+        return folder.user, folder
+
+    @staticmethod
+    def _agreement(status):
+        ag = UserAgreement.objects.filter(status=status).select_related("user").order_by("id").first()
+        if not ag:
+            raise BenchmarkSkipped(f"لا توجد اتفاقية بحالة {status}.")
+        return ag
+
+    # --------------------------------------------------
+    # Timing
+    # --------------------------------------------------
+    def _time_request(self, make_request):
+        """
+        كل تكرار داخل savepoint يتم التراجع عنه (حتى POST يبدأ من نفس الحالة).
+        """
+        samples, queries = [], []
+        for i in range(self.warmup + self.iterations):
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as ctx:
+                    t0 = time.perf_counter()
+                    response = make_request()
+                    elapsed = (time.perf_counter() - t0) * 1000
+                transaction.set_rollback(True)
+            if response.status_code >= 400:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            if i >= self.warmup:
+                samples.append(elapsed)
+                queries.append(len(ctx.captured_queries))
+        return _summary(samples, queries)
+
+    def _time_call(self, fn):
+        # نفس منهجية timeit: أفضل تمثيل لدالة صغيرة
+        runs = timeit.repeat(fn, number=self.micro_number, repeat=max(3, self.iterations // 4))
+        per_call_ms = [r / self.micro_number * 1000 for r in runs]
+        return _summary(per_call_ms)
+
+    # --------------------------------------------------
+    # Views
+    # --------------------------------------------------
+    def view_benchmarks(self):
+        client_user, folder = self._client_user()
+        staff = self._staff_user()
+
+        as_client = Client()
+        as_client.force_login(client_user)
+        as_staff = Client()
+        as_staff.force_login(staff)
+        anon = Client()
+
+        benches = {
+            "legal.home": lambda: anon.get(reverse("home")),
+            "user_dashboard": lambda: as_client.get(reverse("user_dashboard")),
+            "master_clients_list": lambda: as_staff.get(reverse("master_clients_list")),
+            "master_client_detail": lambda: as_staff.get(reverse("master_client_detail", args=[folder.id])),
+            "master_events_dashboard": lambda: as_staff.get(reverse("master_events_dashboard")),
+        }
+
+        try:
+            ag = self._agreement("sent")
+            signer = Client()
+            signer.force_login(ag.user)
+            signature = "data:image/png;base64," + base64.b64encode(_PNG_1PX).decode()
+            benches["agreement_view POST"] = lambda: signer.post(
+                reverse("agreement_view", args=[ag.token]),
+                {"accept_checkbox": "on", "signature_data": signature},
+            )
+        except BenchmarkSkipped:
+            pass
+
+        try:
+            pay = self._agreement("payment_pending")
+            payer = Client()
+            payer.force_login(pay.user)
+            benches["payment_page POST"] = lambda: payer.post(
+                reverse("payment_page", args=[pay.token]),
+                {
+                    "client_payment_receipt": "RCPT-BENCH-001",
+                    "client_receipt_image": SimpleUploadedFile("r.png", _PNG_1PX, content_type="image/png"),
+                },
+            )
+        except BenchmarkSkipped:
+            pass
+
+        return {name: self._time_request(fn) for name, fn in benches.items()}
+
+    # --------------------------------------------------
+    # Concurrency (sync vs async views)
+    # --------------------------------------------------
+    def _concurrent_summary(self, samples_ms, wall_s):
+        out = _summary(samples_ms)
+        out["rps"] = round(len(samples_ms) / wall_s, 1) if wall_s else 0.0
+        return out
+
+    def _run_threads(self, call, concurrency):
+        """
+        N thread كل واحد بطلباته (مثل workers WSGI بـ threads)، اتصال DB لكل thread.
+        """
+        def worker(n):
+            samples = []
+            try:
+                for i in range(self.warmup + n):
+                    t0 = time.perf_counter()
+                    response = call()
+                    elapsed = (time.perf_counter() - t0) * 1000
+                    if response.status_code >= 400:
+                        raise RuntimeError(f"HTTP {response.status_code}")
+                    if i >= self.warmup:
+                        samples.append(elapsed)
+            finally:
+                connections.close_all()
+            return samples
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            t0 = time.perf_counter()
+            chunks = list(pool.map(worker, [self.iterations] * concurrency))
+            wall = time.perf_counter() - t0
+        return self._concurrent_summary([s for chunk in chunks for s in chunk], wall)
+
+    def _run_tasks(self, acall, concurrency):
+        """
+        N coroutine على event loop واحد (مثل worker ASGI واحد).
+        ThreadSensitiveContext لكل طلب مثل ASGIHandler => أجزاء sync لطلبات مختلفة لا تنتظر بعضها.
+        """
+        async def worker(n):
+            samples = []
+            for i in range(self.warmup + n):
+                t0 = time.perf_counter()
+                async with ThreadSensitiveContext():
+                    response = await acall()
+                elapsed = (time.perf_counter() - t0) * 1000
+                if response.status_code >= 400:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+                if i >= self.warmup:
+                    samples.append(elapsed)
+            return samples
+
+        async def main():
+            t0 = time.perf_counter()
+            chunks = await asyncio.gather(*(worker(self.iterations) for _ in range(concurrency)))
+            return chunks, time.perf_counter() - t0
+
+        chunks, wall = asyncio.run(main())
+        return self._concurrent_summary([s for chunk in chunks for s in chunk], wall)
+
+    def concurrency_benchmarks(self, concurrency=8):
+        """
+        user_dashboard / master_client_detail: النسخة المتزامنة في N thread
+        مقابل النسخة async (fan-out) في N coroutine، بنفس التزامن.
+        استدعاء الـ view مباشرة (بدون middleware) => الفرق هو الـ view فقط.
+        GET فقط وعلى البيانات الموجودة (خارج transaction: الـ threads لا ترى ما لم يُعتمد).
+        """
+        from . import views
+
+        client_user, folder = self._client_user()
+        # خارج الـ rollback: بدون موظف في البيانات => مستخدم غير محفوظ
+        # (الـ view يفحص is_staff فقط، وأحداث view لا تُكتب هنا)
+        staff = User.objects.filter(is_staff=True, is_active=True).order_by("id").first() or User(
+            username="bench_staff", is_staff=True, is_active=True,
+        )
+
+        def attach_user(request, user):
+            request.user = user
+
+            async def auser():
+                return user
+
+            request.auser = auser
+            return request
+
+        rf, arf = RequestFactory(), AsyncRequestFactory()
+        dashboard_path = reverse("user_dashboard")
+        detail_path = reverse("master_client_detail", args=[folder.id])
+
+        cases = {
+            "user_dashboard": (
+                lambda: views.user_dashboard(attach_user(rf.get(dashboard_path), client_user)),
+                lambda: views.user_dashboard_async(attach_user(arf.get(dashboard_path), client_user)),
+            ),
+            "master_client_detail": (
+                lambda: views.master_client_detail(attach_user(rf.get(detail_path), staff), folder_id=folder.id),
+                lambda: views.master_client_detail_async(attach_user(arf.get(detail_path), staff), folder_id=folder.id),
+            ),
+        }
+
+        results = {}
+        for name, (call, acall) in cases.items():
+            results[f"{name} sync x{concurrency}"] = self._run_threads(call, concurrency)
+            results[f"{name} async x{concurrency}"] = self._run_tasks(acall, concurrency)
+        # الاتصالات التي فتحها sync_to_async(thread_sensitive=True) في asyncio.run
+        connections.close_all()
+        return results
+
+    # --------------------------------------------------
+    # Helpers (micro)
+    # --------------------------------------------------
+    def micro_benchmarks(self):
+        from .audit import log_event
+
+        request = RequestFactory().get("/accounts/dashboard/", HTTP_USER_AGENT="bench")
+        request.user = AnonymousUser()
+
+        def _log():
+            log_event(request, "view", action="bench")
+
+        results = {
+            "analyze_sentiment": self._time_call(lambda: analyze_sentiment(SAMPLE_TEXT)),
+            "validate_safe_multiline": self._time_call(
+                lambda: validate_safe_multiline(SAMPLE_TEXT, "bench", max_len=10000)
+            ),
+        }
+        results.update(self.scaling_benchmarks())
+
+        # log_event يكتب في DB: عدد أقل من التكرارات
+        number, self.micro_number = self.micro_number, max(1, self.micro_number // 20)
+        try:
+            results["log_event"] = self._time_call(_log)
+        finally:
+            self.micro_number = number
+        return results
+
+    def scaling_benchmarks(self, sizes=(10_000, 100_000, 1_000_000)):
+        """
+        validators على مدخلات كبيرة: ns/char ثابت تقريبًا => زمن خطي.
+        (signature_base64 = نفس مسار التوقيع 200KB في agreement_view)
+        """
+        results = {}
+        number, self.micro_number = self.micro_number, 0
+        try:
+            for size in sizes:
+                text = (SAMPLE_TEXT * (size // len(SAMPLE_TEXT) + 1))[:size].strip()
+                self.micro_number = max(1, 2_000_000 // size)
+                row = self._time_call(lambda: validate_safe_multiline(text, "bench", max_len=size))
+                row["ns_per_char"] = round(row["p50_ms"] * 1e6 / len(text), 2)
+                results[f"validate_safe_multiline[{size // 1000}k]"] = row
+
+            signature = base64.b64encode(_PNG_1PX * (150_000 // len(_PNG_1PX))).decode()
+            signature = signature.replace("+", "").replace("/", "").replace("=", "")[:200_000]
+            self.micro_number = 10
+            row = self._time_call(lambda: validate_safe_text(signature, "signature_base64", max_len=200_000))
+            row["ns_per_char"] = round(row["p50_ms"] * 1e6 / len(signature), 2)
+            results["validate_safe_text[signature]"] = row
+        finally:
+            self.micro_number = number
+        return results
+
+    def run(self, concurrency=0):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root,
+            ALLOWED_HOSTS=["testserver"],
+            # كتابة فورية داخل الـ transaction (الـ thread الخلفي يكتب خارج الـ rollback)
+            AUDIT_DEFERRED={"ENABLED": False},
+        ):
+            results = {}
+            if concurrency:
+                # خارج الـ rollback => أحداث view لا تُسجل (لا كتابة في البيانات)
+                with override_settings(AUDIT_EVENT_POLICIES={"view": {"mode": "sample", "rate": 0}}):
+                    results["concurrency"] = self.concurrency_benchmarks(concurrency)
+            with transaction.atomic():
+                results.update({
+                    "views": self.view_benchmarks(),
+                    "micro": self.micro_benchmarks(),
+                })
+                transaction.set_rollback(True)
+        return results
@@ -0,0 +1,104 @@
+# accounts/broadcast.py
+"""
+رسالة واحدة من المكتب لمجموعة ملفات عملاء (مثلًا كل من حالته payment_pending).
+
+بدل send_message لكل ملف (INSERT رسالة + UPDATE عدادات + sentiment + audit لكل عميل):
+- bulk_create للرسائل على دفعات BATCH_SIZE
+- UPDATE واحد لعدادات ملفات الدفعة (نفس تغييرات messaging.send_message)
+- تحليل المشاعر مرة واحدة للنص (نفس النص لكل المستلمين)
+- شارات الهيدر + الأحداث المباشرة بعد commit كل دفعة
+
+bulk_create لا يرسل post_save => الآثار الجانبية هنا صراحة بدل signals.
+"""
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import badges, metrics, realtime
+from .query_budget import budget_exempt
+from .models import ClientMasterFolder, ClientMasterMessage, SentimentSnapshot
+from .sentiment import analyze_sentiment
+
+BATCH_SIZE = 2000
+
+# الجمهور => (الوصف، فلتر على ClientMasterFolder)
+AUDIENCES = {
+    "all": ("كل العملاء", Q()),
+    "payment_pending": ("بانتظار الدفع/المراجعة", Q(user__account_status="payment_pending")),
+    "pending_agreement": ("بانتظار الاتفاقية", Q(user__account_status="pending_agreement")),
+    "active": ("الحسابات المفعلة", Q(user__account_status="active")),
+    "awaiting_reply": ("ينتظرون ردًا", Q(awaiting_reply_since__isnull=False)),
+}
+
+
+def audience_folders(audience):
+    """
+    KeyError لجمهور غير معروف.
+    """
+    _, condition = AUDIENCES[audience]
+    return ClientMasterFolder.objects.filter(condition, user__is_active=True)
+
+
+def _send_batch(sender, body, rows):
+    folder_ids = [folder_id for folder_id, _ in rows]
+    # وقت واحد للدفعة: created_at للرسائل = last_lawyer_message_at (مثل send_message: msg.created_at)
+    now = timezone.now()
+    with transaction.atomic():
+        created = ClientMasterMessage.objects.bulk_create(
+            [
+                ClientMasterMessage(folder_id=folder_id, sender=sender, direction="lawyer", message=body, created_at=now)
+                for folder_id in folder_ids
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        ClientMasterFolder.objects.filter(pk__in=folder_ids).update(
+            unread_from_lawyer=F("unread_from_lawyer") + 1,
+            last_lawyer_message_at=now,
+            awaiting_reply_since=None,
+        )
+
+        # نفس أحداث signal realtime: قناة الملف (المكتب) + قناة العميل
+        # (id = None على قواعد بدون RETURNING في bulk_create)
+        items = []
+        for msg, (folder_id, user_id) in zip(created, rows):
+            data = {"id": msg.pk, "direction": "lawyer", "message": body, "created_at": now.isoformat()}
+            items.append((realtime.folder_channel(folder_id), "message", data))
+            items.append((realtime.user_channel(user_id), "message", data))
+        transaction.on_commit(lambda: realtime.hub.publish_many(items))
+        # رسالة من المكتب => شارة العميل فقط
+        badges.invalidate(*(user_id for _, user_id in rows), staff=False)
+
+
+def send_broadcast(sender, body, folders):
+    """
+    يرسل body كرسالة من المكتب لكل ملف في folders (QuerySet). يرجع عدد المستلمين.
+    كل دفعة في transaction خاصة => لا قفل طويل على الجداول مع عشرات الآلاف.
+    الدفعات بـ pk > آخر pk (keyset) لا iterator: الدفعة تعدّل جدول الملفات نفسه.
+    """
+    rows = folders.order_by("pk").values_list("pk", "user_id")
+
+    sent = 0
+    last_pk = 0
+    # عدد الاستعلامات يتبع عدد الدفعات (مقصود) => خارج query budget / كشف N+1
+    with budget_exempt():
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk)[:BATCH_SIZE])
+            if not batch:
+                break
+            _send_batch(sender, body, batch)
+            sent += len(batch)
+            last_pk = batch[-1][0]
+
+    if sent:
+        # نفس النص لكل المستلمين => snapshot واحد للرسالة الجماعية
+        res = analyze_sentiment(body)
+        SentimentSnapshot.objects.create(
+            user=sender,
+            case=None,
+            target="lawyer",
+            label=res.label,
+            score=res.score,
+            source_text=body[:2000],
+        )
+        metrics.inc_sentiment_job("lawyer", res.label)
+    return sent
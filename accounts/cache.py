@@ -0,0 +1,22 @@
+# accounts/cache.py
+from django.core.cache.backends.locmem import LocMemCache
+
+from .perf import record_cache
+
+_MISSING = object()
+
+
+class InstrumentedLocMemCache(LocMemCache):
+    """
+    LocMemCache + عدّ hits/misses للطلب الحالي (accounts.perf).
+    get_many في BaseCache يمر عبر get فيتم عدّه تلقائيًا.
+    """
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version=version)
+        if value is _MISSING:
+            record_cache(hit=False)
+            return default
+        record_cache(hit=True)
+        return value
+
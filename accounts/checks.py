@@ -0,0 +1,46 @@
+# accounts/checks.py
+"""
+python manage.py check --deploy:
+- ملف CSS المبني (build_assets) قبل النشر. بدونه القوالب تعمل على Tailwind CDN
+  ({% app_stylesheet %}) => تحذير فقط.
+- سياسات audit "coalesce" على cache محلي للعملية (accounts/audit.py: _coalesce).
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Tags, Warning, register
+
+from .storage import BUILT_CSS, built_css_available
+
+
+@register(Tags.staticfiles, deploy=True)
+def built_assets_check(app_configs, **kwargs):
+    if built_css_available():
+        return []
+    return [
+        Warning(
+            f"{BUILT_CSS} غير مبني: الصفحات تُنسق من TAILWIND_CDN_URL (سكربت خارجي في CSP).",
+            hint="python manage.py build_assets (Tailwind CLI: TAILWIND_CLI)",
+            id="accounts.W001",
+        )
+    ]
+
+
+@register(Tags.caches, deploy=True)
+def coalesce_cache_check(app_configs, **kwargs):
+    coalesced = sorted(
+        event_type
+        for event_type, policy in getattr(settings, "AUDIT_EVENT_POLICIES", {}).items()
+        if policy.get("mode") == "coalesce"
+    )
+    if not coalesced or not isinstance(caches["default"], (LocMemCache, DummyCache)):
+        return []
+    return [
+        Warning(
+            f"AUDIT_EVENT_POLICIES coalesce ({', '.join(coalesced)}) على cache محلي للعملية: "
+            "نافذة وصف AuditEvent لكل worker بدل صف واحد.",
+            hint="CACHES['default'] مشترك بين الـ workers (Redis / Memcached)، أو worker واحد.",
+            id="accounts.W002",
+        )
+    ]
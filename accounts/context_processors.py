@@ -0,0 +1,12 @@
+# accounts/context_processors.py
+from django.utils.functional import SimpleLazyObject
+
+from .badges import badge_counts
+
+
+def header_badges(request):
+    """
+    header_badges.unread_messages / header_badges.pending_payments
+    تُحسب (من cache) فقط إذا قرأها القالب فعلًا.
+    """
+    return {"header_badges": SimpleLazyObject(lambda: badge_counts(getattr(request, "user", None)))}
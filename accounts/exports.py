@@ -0,0 +1,165 @@
+# accounts/exports.py
+"""
+تصدير CSV / NDJSON بالـ streaming (للمحاسبين والمراجعة):
+
+- values_list + iterator(chunk_size) => لا model instances ولا cache للـ queryset
+- StreamingHttpResponse => الذاكرة ثابتة سواء 1,000 صف أو 10,000,000
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import AuditEvent
+from .security import validate_safe_text
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+}
+
+# (اسم العمود, حقل values_list)
+AUDIT_EVENT_COLUMNS = (
+    ("id", "id"),
+    ("created_at", "created_at"),
+    ("event_type", "event_type"),
+    ("username", "user__username"),
+    ("ip", "ip"),
+    ("path", "path__value"),
+    ("user_agent", "user_agent__value"),
+    ("case_number", "case_number"),
+    ("token", "token"),
+    ("folder_id", "folder_id"),
+    ("error_code", "error_code"),
+    ("meta", "meta"),
+    ("count", "count"),
+    ("last_seen_at", "last_seen_at"),
+)
+
+PAYMENT_COLUMNS = (
+    ("id", "id"),
+    ("username", "user__username"),
+    ("status", "status"),
+    ("payment_method", "payment_method"),
+    ("payment_amount", "payment_amount"),
+    ("office_invoice_number", "office_invoice_number"),
+    ("client_payment_receipt", "client_payment_receipt"),
+    ("client_paid_at", "client_paid_at"),
+    ("receipt_number", "receipt_number"),
+    ("paid_at", "paid_at"),
+    ("created_at", "created_at"),
+)
+
+# خلايا تبدأ بهذه الرموز تُفسَّر كمعادلات في Excel (CSV injection)
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def filter_audit_events(qs, params):
+    """
+    نفس فلاتر master_events_dashboard (type + q + مفاتيح الكيان). يرجع (qs, q, type).
+    """
+    q = (params.get("q") or "").strip()
+    et = (params.get("type") or "").strip()
+
+    if et:
+        allowed = {c[0] for c in AuditEvent.EVENT_TYPES}
+        if et in allowed:
+            qs = qs.filter(event_type=et)
+
+    if q:
+        try:
+            q_safe = validate_safe_text(q, "events_search", max_len=80, min_len=1)
+        except ValidationError:
+            q_safe = ""
+        if q_safe:
+            qs = qs.filter(
+                Q(user__username__icontains=q_safe) |
+                Q(path__value__icontains=q_safe) |
+                Q(ip__icontains=q_safe) |
+                Q(token=q_safe) |
+                Q(case_number=q_safe)
+            )
+
+    # سجل كيان واحد (أعمدة مفهرسة): ?token= / ?case= / ?folder= / ?error=
+    for param, field in (("token", "token"), ("case", "case_number"), ("error", "error_code")):
+        value = (params.get(param) or "").strip()
+        if value:
+            qs = qs.filter(**{field: value[:64]})
+    folder = (params.get("folder") or "").strip()
+    if folder.isdigit():
+        qs = qs.filter(folder_id=int(folder))
+
+    return qs, q, et
+
+
+def _plain(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _csv_cell(value):
+    text = _plain(value)
+    if text.startswith(_FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+class _Echo:
+    # csv.writer يكتب في "ملف" يرجع السطر نفسه => نرسله مباشرة بدون buffer
+    def write(self, value):
+        return value
+
+
+def _csv_rows(headers, rows):
+    writer = csv.writer(_Echo())
+    yield "\ufeff"  # BOM => Excel يقرأ العربي صح
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_csv_cell(v) for v in row])
+
+
+def _ndjson_rows(headers, rows):
+    for row in rows:
+        # datetime/Decimal => نص، والباقي بنوعه (int/null)
+        yield json.dumps(dict(zip(headers, row)), ensure_ascii=False, default=_plain) + "\n"
+
+
+def _batched(lines, size):
+    # سطر لكل write مكلف على WSGI: نجمع عدة صفوف في كل chunk
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
+
+
+def stream_export(qs, columns, fmt, basename):
+    """
+    StreamingHttpResponse لأي queryset. fmt غير معروف => csv.
+    """
+    if fmt not in EXPORT_FORMATS:
+        fmt = "csv"
+
+    headers = [name for name, _ in columns]
+    fields = [field for _, field in columns]
+    chunk_size = getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+    rows = qs.values_list(*fields).iterator(chunk_size=chunk_size)
+
+    body = _csv_rows(headers, rows) if fmt == "csv" else _ndjson_rows(headers, rows)
+    response = StreamingHttpResponse(_batched(body, 500), content_type=EXPORT_FORMATS[fmt])
+    filename = f"{basename}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response["Cache-Control"] = "no-store"
+    return response
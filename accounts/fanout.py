@@ -0,0 +1,52 @@
+# accounts/fanout.py
+"""
+تنفيذ قراءات مستقلة للصفحة بالتوازي (views async تحت ASGI).
+
+ORM الـ async في Django (aget / async for ...) يمر عبر sync_to_async(thread_sensitive=True)
+=> كل الاستعلامات على thread واحد بالتتابع، فـ asyncio.gather وحده لا يوازي شيئًا.
+هنا كل loader يعمل في thread مستقل (thread_sensitive=False) باتصال DB خاص به:
+
+    data = await gather_reads({"profile": load_profile, "cases": load_cases})
+
+- loader = دالة sync تُرجع بيانات مكتملة (list / Page بعد التحميل) => القالب لا يستعلم.
+- عدّاد الطلب (accounts.perf) و query budget يشملان استعلامات الـ threads.
+- اتصال الـ thread يُغلق بعد الـ loader حسب CONN_MAX_AGE (close_old_connections).
+
+المكسب من زمن انتظار قاعدة البيانات (شبكة): مع SQLite المحلي وCONN_MAX_AGE=0
+كلفة فتح اتصال لكل loader أكبر من المكسب => python manage.py run_benchmarks --concurrency N.
+"""
+import asyncio
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connections
+
+from . import perf
+from .query_budget import current_collector
+
+
+def _run_isolated(load, wrappers):
+    with ExitStack() as stack:
+        for conn in connections.all():
+            for wrapper in wrappers:
+                stack.enter_context(conn.execute_wrapper(wrapper))
+        try:
+            return load()
+        finally:
+            close_old_connections()
+
+
+async def gather_reads(loaders):
+    """
+    {name: loader} => {name: result}. أول استثناء يُرفع كما هو.
+    """
+    wrappers = [perf.db_execute_wrapper]
+    collector = current_collector()
+    if collector is not None:
+        wrappers.append(collector)
+
+    names = list(loaders)
+    results = await asyncio.gather(*(
+        sync_to_async(_run_isolated, thread_sensitive=False)(loaders[name], wrappers) for name in names
+    ))
+    return dict(zip(names, results))
@@ -0,0 +1,68 @@
+# accounts/interning.py
+"""
+جداول قاموس (interning) لقيم AuditEvent المتكررة: path و user_agent.
+
+الصف في AuditEvent يحمل id صغير بدل نص حتى 300 حرف => الصف والفهارس أصغر بكثير،
+والتجميع حسب المسار/المتصفح يصبح GROUP BY على عمود رقمي.
+
+InternTable = LRU داخل العملية (نص -> id):
+- القيم الساخنة بدون أي استعلام عند الإدراج.
+- أول مرة: SELECT واحد (أو INSERT لو القيمة جديدة) محسوب على query budget الطلب:
+  المسار فيه token/id غالبًا => أول زيارة لكل مسار ليست warm-up لمرة واحدة.
+- الـ id يدخل الـ LRU بعد commit فقط (on_commit) => rollback لا يترك id وهمي في الذاكرة.
+"""
+import threading
+from collections import OrderedDict
+
+from django.db import IntegrityError, transaction
+
+from .models import AuditPath, AuditUserAgent
+
+
+class InternTable:
+    def __init__(self, model, maxsize: int = 4096, max_length: int = 300):
+        self.model = model
+        self.maxsize = maxsize
+        self.max_length = max_length
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def id_for(self, value):
+        value = (value or "")[: self.max_length]
+        if not value:
+            return None
+
+        with self._lock:
+            pk = self._ids.get(value)
+            if pk is not None:
+                self._ids.move_to_end(value)
+                return pk
+
+        pk = self._lookup_or_create(value)
+        transaction.on_commit(lambda: self._remember(value, pk))
+        return pk
+
+    def _lookup_or_create(self, value):
+        pk = self.model.objects.filter(value=value).values_list("id", flat=True).first()
+        if pk is not None:
+            return pk
+        try:
+            with transaction.atomic():
+                return self.model.objects.create(value=value).pk
+        except IntegrityError:  # عملية أخرى أدرجتها في نفس اللحظة
+            return self.model.objects.values_list("id", flat=True).get(value=value)
+
+    def _remember(self, value, pk):
+        with self._lock:
+            self._ids[value] = pk
+            self._ids.move_to_end(value)
+            while len(self._ids) > self.maxsize:
+                self._ids.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+
+paths = InternTable(AuditPath)
+user_agents = InternTable(AuditUserAgent)
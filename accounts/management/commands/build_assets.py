@@ -0,0 +1,50 @@
+# accounts/management/commands/build_assets.py
+import shutil
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "بناء ملف CSS مصغّر (Tailwind purge على templates/) ثم collectstatic بأسماء hashed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--no-collect",
+            action="store_true",
+            help="بناء CSS فقط بدون collectstatic.",
+        )
+
+    def handle(self, *args, **options):
+        cli = shutil.which(settings.TAILWIND_CLI) or settings.TAILWIND_CLI
+        if not Path(cli).exists():
+            raise CommandError(
+                f"Tailwind CLI غير موجود ({settings.TAILWIND_CLI}). "
+                "ثبّت standalone CLI أو حدّد المسار في TAILWIND_CLI."
+            )
+
+        base_dir = Path(settings.BASE_DIR)
+        output = Path(settings.ASSETS_CSS_OUTPUT)
+        output.parent.mkdir(parents=True, exist_ok=True)
+
+        cmd = [
+            cli,
+            "-c", str(base_dir / "tailwind.config.js"),
+            "-i", str(settings.ASSETS_CSS_INPUT),
+            "-o", str(output),
+            "--minify",
+        ]
+        try:
+            subprocess.run(cmd, cwd=base_dir, check=True)
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f"فشل بناء CSS: {e}") from e
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {output.relative_to(base_dir)} ({output.stat().st_size // 1024} KB)"
+        ))
+
+        if not options["no_collect"]:
+            call_command("collectstatic", interactive=False, verbosity=options["verbosity"])
@@ -0,0 +1,59 @@
+# accounts/management/commands/build_receipt_thumbnails.py
+"""
+مصغّرات + بصمات (receipt_image_hash) صور الإيصالات المرفوعة قبلها (accounts/receipts.py).
+الجديدة تُنشأ عند الرفع؛ هذا للسجلات القديمة فقط:
+
+    python manage.py build_receipt_thumbnails
+    python manage.py build_receipt_thumbnails --batch-size 200
+
+بصمات السجلات القديمة تدخل receipts.index عند بنائه => أعد تشغيل الـ workers بعد التشغيل.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from accounts import receipts
+from accounts.models import UserAgreement
+
+
+class Command(BaseCommand):
+    help = "إنشاء مصغّرات وبصمات لصور الإيصالات التي تنقصها."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        pending = (
+            UserAgreement.objects.exclude(client_receipt_image="")
+            .exclude(client_receipt_image__isnull=True)
+            .filter(
+                Q(client_receipt_thumb="") | Q(client_receipt_thumb__isnull=True) | Q(receipt_image_hash__isnull=True)
+            )
+            .only("id", "client_receipt_image", "client_receipt_thumb", "receipt_image_hash")
+            .order_by("pk")
+        )
+
+        built = failed = 0
+        last_pk = 0
+        # دفعات بـ pk > آخر pk: الصفوف الفاشلة تبقى بدون مصغّر ولا تُعاد
+        while True:
+            batch = list(pending.filter(pk__gt=last_pk)[:options["batch_size"]])
+            if not batch:
+                break
+            for agreement in batch:
+                # مصغّر موجود بدون بصمة => يُعاد إنشاؤه مع البصمة (فك ترميز واحد)
+                if agreement.client_receipt_thumb:
+                    agreement.client_receipt_thumb.delete(save=False)
+                try:
+                    with agreement.client_receipt_image.open("rb") as image_file:
+                        ok = receipts.attach_receipt_image(agreement, image_file)
+                except OSError:
+                    ok = False
+                if ok:
+                    agreement.save(update_fields=["client_receipt_thumb", "receipt_image_hash"])
+                    built += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f"⚠️ اتفاقية {agreement.pk}: تعذر قراءة {agreement.client_receipt_image.name}")
+            last_pk = batch[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"✅ تمت معالجة {built} صورة ({failed} تعذر)"))
@@ -0,0 +1,348 @@
+# accounts/management/commands/loadtest.py
+"""
+Load test لرحلة العميل الكاملة ضد خادم محلي (runserver / gunicorn / uvicorn).
+
+رحلة العميل (virtual user):
+    تسجيل -> خروج -> دخول -> رفع قضية -> (المكتب يرسل اتفاقية) -> توقيع
+    -> رفع إيصال الدفع -> متابعة الداشبورد عدة مرات
+رحلة الموظف:
+    دخول -> قائمة العملاء -> ملف عميل -> إرسال رسالة (بشكل متكرر)
+
+أمثلة:
+    python manage.py loadtest --base-url http://127.0.0.1:8000 --clients 50 --staff 5
+    python manage.py loadtest --ramp 10,25,50,100,200 --slo-p95-ms 800
+
+ملاحظات:
+- يحتاج httpx (اختيارية: pip install httpx).
+- خطوة "المكتب يرسل اتفاقية" تُنشأ مباشرة في قاعدة البيانات (نفس DB الخادم المستهدف).
+- كل مستخدم افتراضي يرسل X-Forwarded-For مختلف حتى لا يوقفه SimpleRateLimitMiddleware
+  (20 طلب/دقيقة لكل IP). الخادم المستهدف يقرأه فقط مع TRUSTED_PROXY_COUNT=1
+  (accounts/throttle.client_ip)، وإلا كل المستخدمين IP واحد:
+      TRUSTED_PROXY_COUNT=1 python manage.py runserver
+  قبل أول مرحلة يُفحص ذلك (LIMIT + 1 طلب بعناوين مختلفة) ويتوقف الأمر لو رُفض أحدها.
+  لا تشغّل الخادم هكذا خلف الإنترنت مباشرة: X-Forwarded-For يتحكم فيه العميل.
+- المستخدمون المنشأون يبدأ اسمهم بـ lt_ ويحذفون بـ --cleanup.
+"""
+import asyncio
+import base64
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.middleware import SimpleRateLimitMiddleware
+from accounts.models import User, ClientMasterFolder, UserAgreement
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+USERNAME_PREFIX = "lt_"
+PASSWORD = "LoadTest#2024pw"
+STAFF_USERNAME = f"{USERNAME_PREFIX}staff"
+
+_PNG_1PX = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+SIGNATURE_DATA = "data:image/png;base64," + base64.b64encode(_PNG_1PX).decode()
+
+
+@dataclass
+class Stats:
+    latencies: dict = field(default_factory=lambda: defaultdict(list))
+    errors: dict = field(default_factory=lambda: defaultdict(int))
+    journeys_ok: int = 0
+    journeys_failed: int = 0
+
+    def record(self, step, ms, ok):
+        self.latencies[step].append(ms)
+        if not ok:
+            self.errors[step] += 1
+
+    @property
+    def requests(self):
+        return sum(len(v) for v in self.latencies.values())
+
+    @property
+    def error_count(self):
+        return sum(self.errors.values())
+
+    def all_latencies(self):
+        return [ms for v in self.latencies.values() for ms in v]
+
+
+def _pct(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class JourneyError(Exception):
+    pass
+
+
+class VirtualUser:
+    def __init__(self, base_url, stats, index, timeout):
+        self.stats = stats
+        self.index = index
+        ip = f"10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255 or 1}"
+        self.http = httpx.AsyncClient(
+            base_url=base_url,
+            follow_redirects=False,
+            timeout=timeout,
+            headers={"X-Forwarded-For": ip, "User-Agent": "loadtest/1.0"},
+        )
+
+    async def close(self):
+        await self.http.aclose()
+
+    async def request(self, step, method, url, expect=(200, 302), **kwargs):
+        t0 = time.perf_counter()
+        response = None
+        try:
+            response = await self.http.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            pass
+        ok = response is not None and response.status_code in expect
+        self.stats.record(step, (time.perf_counter() - t0) * 1000, ok)
+        if not ok:
+            raise JourneyError(f"{step}: {response.status_code if response is not None else 'network error'}")
+        return response
+
+    async def get_form(self, step, url):
+        await self.request(step, "GET", url, expect=(200,))
+        token = self.http.cookies.get("csrftoken")
+        if not token:
+            raise JourneyError(f"{step}: no csrftoken cookie")
+        return token
+
+    async def post_form(self, step, url, data, files=None, expect=(302,)):
+        token = self.http.cookies.get("csrftoken") or await self.get_form(step + " (csrf)", url)
+        data = {**data, "csrfmiddlewaretoken": token}
+        return await self.request(step, "POST", url, data=data, files=files, expect=expect)
+
+    async def login(self, username):
+        await self.get_form("login GET", "/accounts/login/")
+        await self.post_form("login POST", "/accounts/login/", {"username": username, "password": PASSWORD})
+
+
+class ClientJourney(VirtualUser):
+    async def run(self, run_id, polls, create_agreement):
+        username = f"{USERNAME_PREFIX}{run_id}_{self.index:05d}"
+
+        await self.get_form("register GET", "/accounts/register/")
+        await self.post_form("register POST", "/accounts/register/", {
+            "username": username,
+            "email": f"{username}@loadtest.sa",
+            "phone_number": f"05{run_id:05d}{self.index:05d}",
+            "password1": PASSWORD,
+            "password2": PASSWORD,
+        })
+        await self.post_form("logout", "/accounts/logout/", {})
+        await self.login(username)
+
+        await self.get_form("case_create GET", "/accounts/case/create/")
+        await self.post_form("case_create POST", "/accounts/case/create/", {
+            "title": "مطالبة مالية",
+            "description": "تم توقيع العقد ولم يلتزم الطرف الآخر بالسداد",
+            "case_type": "civil",
+        })
+
+        token = await create_agreement(username)
+        await self.get_form("agreement GET", f"/accounts/agreement/{token}/")
+        await self.post_form("agreement POST", f"/accounts/agreement/{token}/", {
+            "accept_checkbox": "on",
+            "signature_data": SIGNATURE_DATA,
+        })
+
+        await self.get_form("payment GET", f"/accounts/payment/{token}/")
+        await self.post_form(
+            "payment POST",
+            f"/accounts/payment/{token}/",
+            {"client_payment_receipt": f"RCPT-{run_id}-{self.index}"},
+            files={"client_receipt_image": ("receipt.png", _PNG_1PX, "image/png")},
+        )
+
+        for _ in range(polls):
+            await self.request("dashboard poll", "GET", "/accounts/dashboard/", expect=(200,))
+            await asyncio.sleep(random.uniform(0.2, 1.0))
+
+
+class StaffJourney(VirtualUser):
+    async def run(self, rounds, folder_ids):
+        await self.login(STAFF_USERNAME)
+        for _ in range(rounds):
+            await self.request("master_clients_list", "GET", "/accounts/master/clients/", expect=(200,))
+            if not folder_ids:
+                continue
+            folder_id = random.choice(folder_ids)
+            url = f"/accounts/master/clients/{folder_id}/"
+            await self.request("master_client_detail", "GET", url, expect=(200,))
+            await self.post_form("master_send_message", f"{url}send-message/", {"message": "تم استلام طلبكم وجارٍ المتابعة"})
+            await asyncio.sleep(random.uniform(0.2, 1.0))
+
+
+# --------------------------------------------------
+# DB helpers (نفس قاعدة بيانات الخادم المستهدف)
+# --------------------------------------------------
+@sync_to_async
+def _ensure_staff():
+    user, created = User.objects.get_or_create(
+        username=STAFF_USERNAME,
+        defaults={"email": f"{STAFF_USERNAME}@loadtest.sa", "is_staff": True},
+    )
+    if created or not user.check_password(PASSWORD):
+        user.set_password(PASSWORD)
+        user.is_staff = True
+        user.save()
+
+
+@sync_to_async
+def _create_agreement(username):
+    user = User.objects.get(username=username)
+    ag = UserAgreement.objects.create(
+        user=user,
+        agreement_text="يتفق الطرفان على تقديم الخدمات القانونية وفق الأتعاب المحددة.",
+        payment_amount=5000,
+        office_invoice_number=f"INV-{username}",
+    )
+    return ag.token
+
+
+@sync_to_async
+def _folder_ids(limit=500):
+    return list(ClientMasterFolder.objects.order_by("-id").values_list("id", flat=True)[:limit])
+
+
+async def _check_forwarded_ip(base_url, timeout):
+    """
+    الخادم يعدّ كل X-Forwarded-For كعميل منفصل؟ LIMIT + 1 طلب من عناوين مختلفة
+    (198.18.0.0/15: نطاق اختبارات، خارج عناوين المستخدمين الافتراضيين) => لا 403.
+    """
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as http:
+        for i in range(SimpleRateLimitMiddleware.LIMIT + 1):
+            response = await http.get(
+                "/accounts/login/", headers={"X-Forwarded-For": f"198.18.{i >> 8}.{i & 255}"},
+            )
+            if response.status_code == 403:
+                return False
+    return True
+
+
+@sync_to_async
+def _cleanup():
+    qs = User.objects.filter(username__startswith=USERNAME_PREFIX)
+    n = qs.count()
+    qs.delete()
+    return n
+
+
+class Command(BaseCommand):
+    help = "Load test لرحلة العميل والموظف مع تقرير throughput / error rate / latency percentiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--clients", type=int, default=20, help="عدد العملاء الافتراضيين المتزامنين.")
+        parser.add_argument("--staff", type=int, default=2, help="عدد الموظفين الافتراضيين.")
+        parser.add_argument("--polls", type=int, default=5, help="عدد مرات تحديث الداشبورد لكل عميل.")
+        parser.add_argument("--staff-rounds", type=int, default=10)
+        parser.add_argument("--ramp", default="", help="مراحل تزامن مثل 10,25,50,100 (يتجاهل --clients).")
+        parser.add_argument("--slo-p95-ms", type=float, default=1000.0)
+        parser.add_argument("--slo-error-rate", type=float, default=0.01)
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--cleanup", action="store_true", help="حذف مستخدمي lt_ ثم الخروج.")
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            n = asyncio.run(_cleanup())
+            self.stdout.write(self.style.SUCCESS(f"✅ تم حذف {n} مستخدم lt_"))
+            return
+
+        if httpx is None:
+            raise CommandError("httpx غير مثبتة (pip install httpx).")
+
+        try:
+            forwarded = asyncio.run(_check_forwarded_ip(options["base_url"], options["timeout"]))
+        except httpx.HTTPError as e:
+            raise CommandError(f"تعذر الوصول إلى {options['base_url']}: {e}") from e
+        if not forwarded:
+            raise CommandError(
+                "الخادم يتجاهل X-Forwarded-For => كل المستخدمين الافتراضيين IP واحد وSimpleRateLimitMiddleware "
+                "يرفض ما بعد 20 طلب/دقيقة. شغّل الخادم المستهدف بـ TRUSTED_PROXY_COUNT=1."
+            )
+
+        stages = [int(x) for x in options["ramp"].split(",") if x.strip()] or [options["clients"]]
+        supported = 0
+        for concurrency in stages:
+            stats, elapsed = asyncio.run(self._run_stage(concurrency, options))
+            passed = self._report(concurrency, stats, elapsed, options)
+            if not passed:
+                break
+            supported = concurrency
+
+        if len(stages) > 1:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ أقصى تزامن ضمن SLO (p95 <= {options['slo_p95_ms']:.0f}ms, "
+                f"errors <= {options['slo_error_rate']:.1%}): {supported} عميل"
+            ))
+
+    async def _run_stage(self, concurrency, options):
+        await _ensure_staff()
+        folder_ids = await _folder_ids()
+        stats = Stats()
+        run_id = int(time.time()) % 100000
+
+        clients = [ClientJourney(options["base_url"], stats, i, options["timeout"]) for i in range(concurrency)]
+        staff = [
+            StaffJourney(options["base_url"], stats, 60000 + i, options["timeout"])
+            for i in range(options["staff"])
+        ]
+
+        async def run_client(vu):
+            try:
+                await vu.run(run_id, options["polls"], _create_agreement)
+                stats.journeys_ok += 1
+            except JourneyError:
+                stats.journeys_failed += 1
+
+        async def run_staff(vu):
+            try:
+                await vu.run(options["staff_rounds"], folder_ids)
+            except JourneyError:
+                pass
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(run_client(vu) for vu in clients), *(run_staff(vu) for vu in staff))
+        finally:
+            await asyncio.gather(*(vu.close() for vu in clients + staff))
+        return stats, time.perf_counter() - started
+
+    def _report(self, concurrency, stats, elapsed, options):
+        all_ms = stats.all_latencies()
+        total = stats.requests
+        error_rate = stats.error_count / total if total else 1.0
+        p95 = _pct(all_ms, 0.95)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n=== {concurrency} عميل + {options['staff']} موظف — {elapsed:.1f}s ==="
+        ))
+        self.stdout.write(f"{'step':<24}{'n':>7}{'err':>6}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for step, values in sorted(stats.latencies.items()):
+            self.stdout.write(
+                f"{step:<24}{len(values):>7}{stats.errors.get(step, 0):>6}"
+                f"{_pct(values, .5):>9.0f}{_pct(values, .95):>9.0f}{_pct(values, .99):>9.0f}"
+            )
+        self.stdout.write(
+            f"requests: {total}  throughput: {total / elapsed:.1f} req/s  "
+            f"journeys: {stats.journeys_ok} ok / {stats.journeys_failed} failed "
+            f"({stats.journeys_ok / elapsed:.2f} journeys/s)  "
+            f"error rate: {error_rate:.2%}  p50: {_pct(all_ms, .5):.0f}ms  p95: {p95:.0f}ms  p99: {_pct(all_ms, .99):.0f}ms"
+        )
+        return p95 <= options["slo_p95_ms"] and error_rate <= options["slo_error_rate"]
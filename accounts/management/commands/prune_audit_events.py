@@ -0,0 +1,28 @@
+# accounts/management/commands/prune_audit_events.py
+"""
+أرشفة + تجميع يومي + حذف السجلات القديمة (accounts/retention.py).
+يُشغَّل يوميًا (cron):
+
+    python manage.py prune_audit_events
+    python manage.py prune_audit_events --dry-run
+"""
+from django.core.management.base import BaseCommand
+
+from accounts import retention
+
+
+class Command(BaseCommand):
+    help = "نقل AuditEvent القديمة إلى أرشيف مضغوط وتجميع يومي ثم حذفها على دفعات."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="عرض عدد الصفوف لكل يوم بدون أي تغيير.")
+        parser.add_argument("--batch-size", type=int, default=0)
+
+    def handle(self, *args, **options):
+        config = retention.get_config()
+        if options["batch_size"]:
+            config["BATCH_SIZE"] = options["batch_size"]
+
+        total = retention.prune(config, dry_run=options["dry_run"], log=self.stdout.write)
+        verb = "سيتم حذف" if options["dry_run"] else "تم حذف"
+        self.stdout.write(self.style.SUCCESS(f"✅ {verb} {total} سجل (الأرشيف: {config['ARCHIVE_DIR']})"))
@@ -0,0 +1,30 @@
+# accounts/management/commands/rehydrate_audit_events.py
+"""
+استرجاع سجلات فترة من الأرشيف إلى AuditEvent (للتحقيق/المراجعة):
+
+    python manage.py rehydrate_audit_events --from 2025-01-01 --to 2025-01-07
+
+الصفوف المسترجعة تحتفظ بنفس id وتُطرح من التجميع اليومي؛
+prune_audit_events القادم يعيدها للأرشيف بدون تكرار.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from accounts import retention
+
+
+class Command(BaseCommand):
+    help = "استرجاع AuditEvent لفترة أيام من ملفات الأرشيف المضغوطة."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start", required=True, help="YYYY-MM-DD")
+        parser.add_argument("--to", dest="end", default="", help="YYYY-MM-DD (افتراضي = --from)")
+
+    def handle(self, *args, **options):
+        start = parse_date(options["start"] or "")
+        end = parse_date(options["end"]) if options["end"] else start
+        if not start or not end or end < start:
+            raise CommandError("فترة غير صالحة. استخدم --from YYYY-MM-DD [--to YYYY-MM-DD].")
+
+        total = retention.rehydrate_window(start, end, log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f"✅ تم استرجاع {total} سجل"))
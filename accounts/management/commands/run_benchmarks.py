@@ -0,0 +1,82 @@
+# accounts/management/commands/run_benchmarks.py
+import json
+import platform
+import subprocess
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from accounts.benchmarks import BenchmarkRunner, BenchmarkSkipped
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except Exception:
+        return ""
+
+
+class Command(BaseCommand):
+    help = "قياس زمن/استعلامات الصفحات الساخنة والدوال المساعدة وحفظ النتائج JSON للمقارنة بين الـ commits."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--output", default="", help="مسار ملف JSON (افتراضي: bench_results/<commit>.json)")
+        parser.add_argument("--compare", default="", help="ملف JSON سابق لعرض الفرق.")
+        parser.add_argument(
+            "--concurrency", type=int, default=0,
+            help="N > 0: الداشبورد/ملف العميل sync (N thread) مقابل async (N coroutine).",
+        )
+
+    def handle(self, *args, **options):
+        runner = BenchmarkRunner(iterations=options["iterations"], warmup=options["warmup"])
+        try:
+            results = runner.run(concurrency=options["concurrency"])
+        except BenchmarkSkipped as e:
+            raise CommandError(str(e)) from e
+
+        commit = _git_commit()
+        payload = {
+            "commit": commit,
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": settings.DATABASES["default"]["ENGINE"],
+            **results,
+        }
+
+        output = Path(options["output"] or Path(settings.BASE_DIR) / "bench_results" / f"{commit or 'local'}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+        previous = {}
+        if options["compare"]:
+            previous = json.loads(Path(options["compare"]).read_text(encoding="utf-8"))
+
+        for group in ("concurrency", "views", "micro"):
+            if group not in results:
+                continue
+            self.stdout.write(self.style.MIGRATE_HEADING(group))
+            for name, row in results[group].items():
+                line = f"  {name:<34} p50={row['p50_ms']:>9.3f}ms p95={row['p95_ms']:>9.3f}ms"
+                if "queries" in row:
+                    line += f" q={row['queries']}"
+                if "rps" in row:
+                    line += f" {row['rps']}rps"
+                if "ns_per_char" in row:
+                    line += f" {row['ns_per_char']}ns/char"
+                old = previous.get(group, {}).get(name)
+                if old:
+                    delta = (row["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100 if old["p50_ms"] else 0
+                    line += f"  Δp50={delta:+.1f}%"
+                    if "queries" in row and "queries" in old:
+                        line += f" Δq={row['queries'] - old['queries']:+d}"
+                self.stdout.write(line)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {output}"))
@@ -0,0 +1,398 @@
+# accounts/management/commands/seed_synthetic.py
+"""
+توليد بيانات تجريبية عربية كبيرة (لاختبارات الحمل والتوسع).
+
+أمثلة:
+    python manage.py seed_synthetic                      # preset صغير
+    python manage.py seed_synthetic --preset large       # 50k مستخدم / 200k قضية / 5M حدث / 1M رسالة
+    python manage.py seed_synthetic --users 2000 --audit-events 100000 --seed 7
+    python manage.py seed_synthetic --clear              # حذف البيانات التجريبية السابقة فقط
+
+كل شيء حتمي من --seed و--epoch (نفس القيم => نفس البيانات، بما فيها التواريخ):
+التواريخ في آخر --days يوم قبل --epoch (افتراضي DEFAULT_EPOCH، وليس وقت التشغيل).
+المستخدمون التجريبيون يبدأ اسمهم بـ syn_ حتى يسهل حذفهم.
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, time as dtime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts import interning, messaging, receipts
+from accounts.models import (
+    User,
+    UserProfile,
+    Case,
+    CaseTimelineEvent,
+    ClientMasterFolder,
+    ClientMasterMessage,
+    UserAgreement,
+    AuditEvent,
+)
+
+
+USERNAME_PREFIX = "syn_"
+# ثابت (لا timezone.now) => إعادة التوليد تعطي نفس التواريخ؛ --epoch لتغييره
+DEFAULT_EPOCH = date(2026, 1, 1)
+
+PRESETS = {
+    "small": {"users": 500, "cases": 2000, "audit_events": 50_000, "messages": 10_000, "agreements": 500},
+    "medium": {"users": 5_000, "cases": 20_000, "audit_events": 500_000, "messages": 100_000, "agreements": 5_000},
+    "large": {"users": 50_000, "cases": 200_000, "audit_events": 5_000_000, "messages": 1_000_000, "agreements": 50_000},
+}
+
+FIRST_NAMES = [
+    "محمد", "عبدالله", "فهد", "سلطان", "خالد", "فيصل", "ناصر", "سعود", "تركي", "عبدالرحمن",
+    "نورة", "سارة", "هيفاء", "ريم", "لمى", "منيرة", "العنود", "جواهر", "أمل", "هند",
+]
+FAMILY_NAMES = [
+    "الزمزمي", "القحطاني", "الغامدي", "الزهراني", "العتيبي", "الشهري", "الحربي", "الدوسري",
+    "المطيري", "السبيعي", "الشمري", "العنزي", "البقمي", "الأحمدي", "الجهني", "المالكي",
+]
+CITIES = ["الرياض", "جدة", "مكة المكرمة", "المدينة المنورة", "الدمام", "الطائف", "أبها", "تبوك", "بريدة", "حائل"]
+DISTRICTS = ["حي النخيل", "حي الروضة", "حي العزيزية", "حي الشاطئ", "حي الملقا", "حي السلامة", "حي الفيصلية"]
+
+CASE_TITLES = {
+    "civil": ["مطالبة مالية", "فسخ عقد إيجار", "تعويض عن ضرر", "نزاع على ملكية عقار"],
+    "criminal": ["بلاغ احتيال مالي", "قضية تشهير", "اعتداء وإتلاف ممتلكات"],
+    "commercial": ["نزاع بين شركاء", "مطالبة بقيمة فواتير", "إخلال بعقد توريد"],
+    "family": ["حضانة أطفال", "نفقة", "خلع", "إثبات حضانة وزيارة"],
+    "labor": ["مستحقات نهاية خدمة", "فصل تعسفي", "رواتب متأخرة"],
+    "other": ["استشارة قانونية", "صياغة عقد", "توثيق وكالة"],
+}
+CASE_SENTENCES = [
+    "تم توقيع العقد قبل سنتين ولم يلتزم الطرف الآخر بالسداد",
+    "أرفقت جميع المستندات والإيصالات المتوفرة لدي",
+    "أرغب في معرفة الإجراءات النظامية والمدة المتوقعة",
+    "حاولت التسوية الودية أكثر من مرة بدون نتيجة",
+    "الطرف الآخر يرفض الرد على الاتصالات والرسائل",
+    "أنا قلق من تأخر القضية وأحتاج متابعة مستمرة",
+    "الحمد لله الأمور أفضل بعد الجلسة الأخيرة",
+]
+CLIENT_MESSAGES = [
+    "السلام عليكم، هل يوجد جديد في القضية؟",
+    "أرسلت صورة الإيصال، الرجاء التأكيد",
+    "متى موعد الجلسة القادمة؟",
+    "شكرًا لكم على المتابعة، أنا مرتاح للتعامل",
+    "أحتاج نسخة من الاتفاقية لو سمحتم",
+    "أنا متوتر من تأخر الحكم، هل من تحديث؟",
+]
+LAWYER_MESSAGES = [
+    "وعليكم السلام، تم تحديد موعد الجلسة وسنبلغكم بالتفاصيل",
+    "تم استلام الإيصال وهو تحت المراجعة",
+    "نحتاج صورة الهوية الوطنية سارية المفعول",
+    "مبروك، صدر الحكم لصالحكم",
+    "تم رفع مذكرة الرد إلى المحكمة",
+]
+USER_AGENTS = [
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 14; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15",
+]
+VIEW_PATHS = [
+    "/accounts/dashboard/", "/accounts/profile/", "/accounts/case/create/", "/",
+    "/accounts/login/", "/accounts/master/clients/", "/accounts/master/events/",
+]
+TIMELINE_STAGES = [
+    ("case_submitted", "تم رفع القضية", "تم استلام بيانات القضية من العميل."),
+    ("under_review", "قيد مراجعة المكتب", "المكتب يراجع تفاصيل القضية والمرفقات."),
+    ("sessions", "مرحلة الجلسات", "سيتم تحديث تفاصيل الجلسات هنا."),
+]
+
+EVENT_TYPES = [c[0] for c in AuditEvent.EVENT_TYPES]
+# أغلب الأحداث تصفح صفحات (مثل الواقع)
+EVENT_WEIGHTS = [6 if t == "view" else 1 for t in EVENT_TYPES]
+
+
+@contextmanager
+def _manual_timestamps(*models):
+    """
+    bulk_create يطبق auto_now/auto_now_add ويمسح التواريخ الموزعة.
+    نعطّلها مؤقتًا حتى نكتب created_at بأنفسنا.
+    """
+    saved = []
+    for model in models:
+        for f in model._meta.concrete_fields:
+            if getattr(f, "auto_now", False) or getattr(f, "auto_now_add", False):
+                saved.append((f, f.auto_now, f.auto_now_add))
+                f.auto_now = False
+                f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now = auto_now
+            f.auto_now_add = auto_now_add
+
+
+class Command(BaseCommand):
+    help = "توليد بيانات عربية تجريبية كبيرة بشكل حتمي (bulk_create على دفعات)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+        parser.add_argument("--users", type=int)
+        parser.add_argument("--cases", type=int)
+        parser.add_argument("--audit-events", type=int, dest="audit_events")
+        parser.add_argument("--messages", type=int)
+        parser.add_argument("--agreements", type=int)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--chunk-size", type=int, default=5000, dest="chunk_size")
+        parser.add_argument("--days", type=int, default=365, help="توزيع التواريخ على آخر N يوم قبل --epoch.")
+        parser.add_argument(
+            "--epoch", type=date.fromisoformat, default=DEFAULT_EPOCH,
+            help=f"نهاية فترة التواريخ YYYY-MM-DD (افتراضي {DEFAULT_EPOCH.isoformat()}).",
+        )
+        parser.add_argument("--clear", action="store_true", help="حذف المستخدمين التجريبيين (syn_) وكل ما يتبعهم ثم الخروج.")
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            self._clear()
+            return
+
+        sizes = dict(PRESETS[options["preset"]])
+        for key in sizes:
+            if options.get(key) is not None:
+                sizes[key] = options[key]
+
+        self.rng = random.Random(options["seed"])
+        self.chunk = max(100, options["chunk_size"])
+        self.now = timezone.make_aware(datetime.combine(options["epoch"], dtime.min))
+        self.span_seconds = max(1, options["days"]) * 86400
+
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            self.stderr.write("يوجد بيانات تجريبية سابقة. شغّل --clear أولًا.")
+            return
+
+        started = time.monotonic()
+        with _manual_timestamps(User, UserProfile, ClientMasterFolder, Case, CaseTimelineEvent,
+                                ClientMasterMessage, UserAgreement, AuditEvent):
+            user_ids = self._seed_users(sizes["users"])
+            folder_ids = self._seed_folders(user_ids)
+            case_owner = self._seed_cases(user_ids, sizes["cases"])
+            self._seed_agreements(user_ids, case_owner, sizes["agreements"])
+            self._seed_messages(user_ids, folder_ids, sizes["messages"])
+            self._seed_audit_events(user_ids, sizes["audit_events"])
+
+        self.stdout.write(self.style.SUCCESS(f"✅ تم التوليد خلال {time.monotonic() - started:.1f} ثانية"))
+
+    # --------------------------------------------------
+    # Helpers
+    # --------------------------------------------------
+    def _rand_dt(self, after=None):
+        if after is not None:
+            remaining = max(1, int((self.now - after).total_seconds()))
+            return after + timedelta(seconds=self.rng.randrange(remaining))
+        return self.now - timedelta(seconds=self.rng.randrange(self.span_seconds))
+
+    def _bulk(self, model, rows_iter, label):
+        """
+        يستهلك generator على دفعات ويرجع pks المنشأة بالترتيب.
+        """
+        t0 = time.monotonic()
+        pks = []
+        batch = []
+        done = 0
+        for obj in rows_iter:
+            batch.append(obj)
+            if len(batch) >= self.chunk:
+                done += self._flush(model, batch, pks)
+                batch = []
+        if batch:
+            done += self._flush(model, batch, pks)
+        self.stdout.write(f"  {label}: {done:,} ({time.monotonic() - t0:.1f}s)")
+        return pks
+
+    @staticmethod
+    def _flush(model, batch, pks):
+        with transaction.atomic():
+            created = model.objects.bulk_create(batch, batch_size=len(batch))
+        if created and created[0].pk is not None:
+            pks.extend(o.pk for o in created)
+        return len(batch)
+
+    def _clear(self):
+        qs = User.objects.filter(username__startswith=USERNAME_PREFIX)
+        ids = list(qs.values_list("id", flat=True))
+        for i in range(0, len(ids), 5000):
+            part = ids[i:i + 5000]
+            with transaction.atomic():
+                AuditEvent.objects.filter(user_id__in=part).delete()
+                User.objects.filter(id__in=part).delete()
+        self.stdout.write(self.style.SUCCESS(f"✅ تم حذف {len(ids):,} مستخدم تجريبي"))
+
+    # --------------------------------------------------
+    # Seeders
+    # --------------------------------------------------
+    def _seed_users(self, n):
+        # hash واحد لكل المستخدمين: PBKDF2 لكل مستخدم يجعل التوليد يأخذ ساعات
+        password = make_password("Synthetic#12345", salt="syntheticseed")
+        rng = self.rng
+
+        def rows():
+            for i in range(n):
+                joined = self._rand_dt()
+                yield User(
+                    username=f"{USERNAME_PREFIX}{i:07d}",
+                    email=f"{USERNAME_PREFIX}{i:07d}@example.sa",
+                    phone_number=f"05{i:08d}",
+                    password=password,
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(FAMILY_NAMES),
+                    is_client=True,
+                    account_status=rng.choices(
+                        ["active", "pending_agreement", "payment_pending"], weights=[8, 1, 1]
+                    )[0],
+                    date_joined=joined,
+                    created_at=joined,
+                    updated_at=joined,
+                )
+
+        user_ids = self._bulk(User, rows(), "users")
+
+        def profiles():
+            for idx, uid in enumerate(user_ids):
+                yield UserProfile(
+                    user_id=uid,
+                    full_name=f"{rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(FAMILY_NAMES)}",
+                    national_id=f"1{idx:09d}",
+                    address=f"{rng.choice(CITIES)} - {rng.choice(DISTRICTS)} - مبنى {rng.randint(1000, 9999)}",
+                    created_at=self._rand_dt(),
+                )
+
+        self._bulk(UserProfile, profiles(), "profiles")
+        return user_ids
+
+    def _seed_folders(self, user_ids):
+        def rows():
+            for idx, uid in enumerate(user_ids):
+                yield ClientMasterFolder(
+                    user_id=uid,
+                    national_id=f"1{idx:09d}",
+                    created_at=self._rand_dt(),
+                )
+
+        return self._bulk(ClientMasterFolder, rows(), "master folders")
+
+    def _seed_cases(self, user_ids, n):
+        rng = self.rng
+        case_types = list(CASE_TITLES)
+        owners = [rng.choice(user_ids) for _ in range(n)] if user_ids else []
+        created = []
+
+        def rows():
+            for i, uid in enumerate(owners):
+                ctype = rng.choice(case_types)
+                dt = self._rand_dt()
+                created.append(dt)
+                yield Case(
+                    user_id=uid,
+                    case_number=f"CASE-SYN-{i:08d}",
+                    case_type=ctype,
+                    title=rng.choice(CASE_TITLES[ctype]),
+                    description="\n".join(rng.sample(CASE_SENTENCES, 3)),
+                    status=rng.choice(["new", "under_review", "in_progress", "closed"]),
+                    created_at=dt,
+                )
+
+        case_ids = self._bulk(Case, rows(), "cases")
+
+        def timeline():
+            for cid, dt in zip(case_ids, created):
+                for stage, title, desc in TIMELINE_STAGES[:rng.randint(1, 3)]:
+                    dt = self._rand_dt(after=dt)
+                    yield CaseTimelineEvent(
+                        case_id=cid, stage=stage, title=title, description=desc,
+                        outcome="pending", created_at=dt,
+                    )
+
+        self._bulk(CaseTimelineEvent, timeline(), "timeline events")
+        return list(zip(case_ids, owners))
+
+    def _seed_agreements(self, user_ids, case_owner, n):
+        rng = self.rng
+        statuses = [s[0] for s in UserAgreement.STATUS]
+
+        def rows():
+            for i in range(n):
+                # توزيع متساوٍ على كل الحالات
+                status = statuses[i % len(statuses)]
+                if case_owner:
+                    case_id, uid = rng.choice(case_owner)
+                else:
+                    case_id, uid = None, rng.choice(user_ids)
+                sent = self._rand_dt()
+                submitted = status in ("under_review", "paid", "rejected")
+                receipt = f"RCPT-{rng.getrandbits(40):010X}" if submitted else None
+                yield UserAgreement(
+                    user_id=uid,
+                    case_id=case_id,
+                    token=f"syn{rng.getrandbits(180):045x}",
+                    agreement_text="يتفق الطرفان على تقديم الخدمات القانونية وفق الأتعاب المحددة.",
+                    status=status,
+                    accepted_checkbox=status not in ("sent", "expired"),
+                    accepted_at=sent if status not in ("sent", "expired") else None,
+                    payment_amount=Decimal(rng.choice([1500, 3000, 5000, 7500, 10000, 15000])),
+                    office_invoice_number=f"INV-{i:08d}",
+                    client_payment_receipt=receipt,
+                    receipt_code_normalized=receipts.normalize_receipt_code(receipt),
+                    receipt_image_hash=receipts.hash_to_hex(rng.getrandbits(64)) if submitted else None,
+                    client_paid_at=self._rand_dt(after=sent) if submitted else None,
+                    receipt_number=f"OFFICE-SYN-{i:08d}" if status == "paid" else None,
+                    paid_at=self._rand_dt(after=sent) if status == "paid" else None,
+                    sent_at=sent,
+                    created_at=sent,
+                )
+
+        self._bulk(UserAgreement, rows(), "agreements")
+
+    def _seed_messages(self, user_ids, folder_ids, n):
+        rng = self.rng
+        if not folder_ids:
+            return
+        pairs = list(zip(folder_ids, user_ids))
+
+        def rows():
+            for _ in range(n):
+                fid, uid = rng.choice(pairs)
+                from_client = rng.random() < 0.55
+                yield ClientMasterMessage(
+                    folder_id=fid,
+                    sender_id=uid if from_client else None,
+                    direction="client" if from_client else "lawyer",
+                    message=rng.choice(CLIENT_MESSAGES if from_client else LAWYER_MESSAGES),
+                    is_read=rng.random() < 0.8,
+                    created_at=self._rand_dt(),
+                )
+
+        self._bulk(ClientMasterMessage, rows(), "master messages")
+        # bulk_create لا يمر من messaging.send_message => عدادات الملفات دفعة واحدة
+        messaging.refresh_counters(ClientMasterFolder.objects.filter(user__username__startswith=USERNAME_PREFIX))
+
+    def _seed_audit_events(self, user_ids, n):
+        rng = self.rng
+        if not user_ids:
+            return
+
+        path_ids = {p: interning.paths.id_for(p) for p in VIEW_PATHS}
+        agent_ids = {ua: interning.user_agents.id_for(ua) for ua in USER_AGENTS}
+
+        def rows():
+            for _ in range(n):
+                event_type = rng.choices(EVENT_TYPES, weights=EVENT_WEIGHTS)[0]
+                yield AuditEvent(
+                    user_id=rng.choice(user_ids),
+                    event_type=event_type,
+                    path_id=path_ids[rng.choice(VIEW_PATHS)],
+                    ip=f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+                    user_agent_id=agent_ids[rng.choice(USER_AGENTS)],
+                    meta={"action": event_type},
+                    created_at=self._rand_dt(),
+                )
+
+        self._bulk(AuditEvent, rows(), "audit events")
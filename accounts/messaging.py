@@ -0,0 +1,163 @@
+# accounts/messaging.py
+"""
+رسائل ملف التواصل (ClientMasterFolder) + عدادات مخزنة على الملف:
+
+- unread_from_client / unread_from_lawyer : غير المقروء لكل اتجاه
+- last_client_message_at / last_lawyer_message_at
+- awaiting_reply_since : أول رسالة عميل بلا رد من المكتب بعدها
+
+كل تحديث UPDATE واحد بـ F-expressions داخل نفس transaction الرسالة
+=> لا COUNT(*) على الرسائل في قائمة العملاء، ولا سباق بين طلبين متزامنين.
+
+الكتابة المباشرة (bulk_create / admin / shell) لا تمر من هنا => refresh_counters.
+
+صفحات المحادثة (thread_page) بمؤشر (created_at, id) بدل OFFSET + COUNT.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.dispatch import Signal
+
+from .models import ClientMasterFolder, ClientMasterMessage
+
+UNREAD_FIELD = {"client": "unread_from_client", "lawyer": "unread_from_lawyer"}
+LAST_AT_FIELD = {"client": "last_client_message_at", "lawyer": "last_lawyer_message_at"}
+
+# mark_read يستخدم UPDATE (بدون post_save) => إشارة خاصة (accounts/badges.py)
+messages_read = Signal()  # kwargs: folder, direction, count
+
+
+def send_message(folder, sender, direction, body, *, is_read=False):
+    """
+    ينشئ الرسالة ويحدّث عدادات الملف في نفس الـ transaction.
+    """
+    with transaction.atomic():
+        msg = ClientMasterMessage.objects.create(
+            folder=folder,
+            sender=sender,
+            direction=direction,
+            message=body,
+            is_read=is_read,
+        )
+        changes = {LAST_AT_FIELD[direction]: msg.created_at}
+        if not is_read:
+            changes[UNREAD_FIELD[direction]] = F(UNREAD_FIELD[direction]) + 1
+        if direction == "client":
+            changes["awaiting_reply_since"] = Coalesce(F("awaiting_reply_since"), Value(msg.created_at))
+        else:
+            changes["awaiting_reply_since"] = None
+        ClientMasterFolder.objects.filter(pk=folder.pk).update(**changes)
+    return msg
+
+
+def mark_read(folder, direction, up_to):
+    """
+    يعلّم رسائل الاتجاه حتى id = up_to كمقروءة ويطرح العدد من العداد. يرجع العدد.
+    """
+    field = UNREAD_FIELD[direction]
+    with transaction.atomic():
+        n = folder.messages.filter(direction=direction, is_read=False, id__lte=up_to).update(is_read=True)
+        if n:
+            ClientMasterFolder.objects.filter(pk=folder.pk).update(**{field: Greatest(F(field) - n, Value(0))})
+            messages_read.send(sender=ClientMasterMessage, folder=folder, direction=direction, count=n)
+    return n
+
+
+def refresh_counters(folders=None):
+    """
+    يعيد حساب العدادات من الرسائل (UPDATE مجمّع بـ subqueries، بدون تحميل الصفوف).
+    """
+    folders = ClientMasterFolder.objects.all() if folders is None else folders
+    msgs = ClientMasterMessage.objects.filter(folder=OuterRef("pk")).order_by().values("folder")
+
+    def unread(direction):
+        sub = msgs.filter(direction=direction, is_read=False).annotate(n=Count("id")).values("n")
+        return Coalesce(Subquery(sub), 0)
+
+    def last_at(direction):
+        return Subquery(msgs.filter(direction=direction).annotate(m=Max("created_at")).values("m"))
+
+    def first_client(after=None):
+        sub = msgs.filter(direction="client")
+        if after is not None:
+            sub = sub.filter(created_at__gt=after)
+        return Subquery(sub.annotate(m=Min("created_at")).values("m"))
+
+    updated = folders.update(
+        unread_from_client=unread("client"),
+        unread_from_lawyer=unread("lawyer"),
+        last_client_message_at=last_at("client"),
+        last_lawyer_message_at=last_at("lawyer"),
+    )
+    # UPDATE يقرأ القيم القديمة => awaiting في خطوة ثانية بعد last_lawyer_message_at
+    folders.filter(last_lawyer_message_at__isnull=True).update(awaiting_reply_since=first_client())
+    folders.filter(last_lawyer_message_at__isnull=False).update(
+        awaiting_reply_since=first_client(after=OuterRef("last_lawyer_message_at"))
+    )
+    return updated
+
+
+def waiting_order():
+    """
+    ترتيب قائمة العملاء: المنتظرون أولًا (الأقدم انتظارًا)، ثم الأحدث إنشاءً (folder_awaiting_idx).
+    """
+    return (F("awaiting_reply_since").asc(nulls_last=True), "-created_at")
+
+
+# --------------------------------------------------
+# Thread pages (cursor)
+# --------------------------------------------------
+THREAD_FIELDS = ("id", "direction", "message", "is_read", "created_at")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk):
+    """
+    "<microseconds منذ epoch UTC>-<id>" — بدون float => مطابقة دقيقة لـ created_at.
+    """
+    seconds = int(created_at.astimezone(dt_timezone.utc).replace(microsecond=0).timestamp())
+    return f"{seconds * 1_000_000 + created_at.microsecond}-{pk}"
+
+
+def decode_cursor(value):
+    try:
+        micros, pk = value.split("-", 1)
+        micros, pk = int(micros), int(pk)
+        if micros < 0 or pk < 0:
+            raise ValueError
+        created_at = datetime.fromtimestamp(micros // 1_000_000, tz=dt_timezone.utc)
+    except (AttributeError, ValueError, OverflowError, OSError):
+        raise InvalidCursor(value)
+    return created_at.replace(microsecond=micros % 1_000_000), pk
+
+
+def thread_page(folder_id, *, before=None, after=None, limit=30):
+    """
+    صفحة من رسائل الملف بترتيب زمني تصاعدي (master_msg_thread_idx، بدون COUNT):
+
+    - بدون مؤشر : آخر limit رسالة
+    - before    : الأقدم من المؤشر (تصفح للأعلى)
+    - after     : الأحدث من المؤشر (polling: "ما الجديد منذ X")
+
+    يرجع (rows, has_more) — has_more في اتجاه التصفح، rows = dicts بحقول THREAD_FIELDS.
+    """
+    qs = ClientMasterMessage.objects.filter(folder_id=folder_id).values(*THREAD_FIELDS)
+    if after is not None:
+        created_at, pk = decode_cursor(after)
+        qs = qs.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+        rows = list(qs.order_by("created_at", "id")[:limit + 1])
+        return rows[:limit], len(rows) > limit
+
+    if before is not None:
+        created_at, pk = decode_cursor(before)
+        qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    rows = list(qs.order_by("-created_at", "-id")[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    return rows, has_more
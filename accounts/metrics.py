@@ -0,0 +1,126 @@
+# accounts/metrics.py
+"""
+Prometheus metrics (نص Prometheus على /metrics) لسكربر محلي بدون أي خدمة مستضافة.
+
+- المكتبة prometheus_client اختيارية: لو غير مثبتة تصبح كل الدوال هنا no-op
+  و /metrics يرجع 503.
+- لتشغيل أكثر من process (gunicorn workers): اضبط PROMETHEUS_MULTIPROC_DIR
+  لمجلد فاضي قبل تشغيل الخادم، وفي gunicorn child_exit استدعِ mark_process_dead(worker.pid).
+"""
+import os
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Histogram, multiprocess
+except ImportError:  # pragma: no cover
+    prometheus_client = None
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPLOAD_BUCKETS = (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 2 * 1024 ** 2, 4 * 1024 ** 2, 8 * 1024 ** 2, 16 * 1024 ** 2)
+
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = Histogram(
+        "http_request_duration_seconds",
+        "Request latency per resolved view.",
+        ["view"],
+        buckets=LATENCY_BUCKETS,
+    )
+    REQUEST_DB_TIME = Histogram(
+        "http_request_db_duration_seconds",
+        "Total DB query time per request, per resolved view.",
+        ["view"],
+        buckets=LATENCY_BUCKETS,
+    )
+    AUDIT_EVENTS = Counter(
+        "audit_events_total",
+        "log_event calls by event_type.",
+        ["event_type"],
+    )
+    RATE_LIMIT_BLOCKS = Counter(
+        "rate_limit_blocks_total",
+        "Requests blocked by SimpleRateLimitMiddleware.",
+        ["path"],
+    )
+    SENTIMENT_JOBS = Counter(
+        "sentiment_jobs_total",
+        "Sentiment analyses saved, by target and label.",
+        ["target", "label"],
+    )
+    UPLOAD_SIZE = Histogram(
+        "upload_size_bytes",
+        "Accepted upload sizes by kind.",
+        ["kind"],
+        buckets=UPLOAD_BUCKETS,
+    )
+
+
+def observe_request(view: str, seconds: float, db_seconds: float):
+    if prometheus_client is None:
+        return
+    REQUEST_LATENCY.labels(view).observe(seconds)
+    REQUEST_DB_TIME.labels(view).observe(db_seconds)
+
+
+def inc_audit_event(event_type: str):
+    if prometheus_client is None:
+        return
+    AUDIT_EVENTS.labels(event_type).inc()
+
+
+def inc_rate_limit_block(path: str):
+    if prometheus_client is None:
+        return
+    RATE_LIMIT_BLOCKS.labels(path).inc()
+
+
+def inc_sentiment_job(target: str, label: str):
+    if prometheus_client is None:
+        return
+    SENTIMENT_JOBS.labels(target, label).inc()
+
+
+def observe_upload(kind: str, size: int):
+    if prometheus_client is None:
+        return
+    UPLOAD_SIZE.labels(kind).observe(size or 0)
+
+
+def mark_process_dead(pid: int):
+    """
+    لـ gunicorn child_exit في وضع multiprocess.
+    """
+    if prometheus_client is None or not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return
+    multiprocess.mark_process_dead(pid)
+
+
+def _client_ip(request):
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def metrics_view(request):
+    """
+    /metrics بصيغة Prometheus text.
+    مقصور على METRICS_ALLOWED_IPS (افتراضيًا localhost) لأن السكربر محلي.
+    """
+    if _client_ip(request) not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden("غير مصرح.")
+
+    if prometheus_client is None:
+        return HttpResponse("prometheus_client غير مثبتة.", status=503, content_type="text/plain; charset=utf-8")
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+
+    return HttpResponse(
+        prometheus_client.generate_latest(registry),
+        content_type=prometheus_client.CONTENT_TYPE_LATEST,
+    )
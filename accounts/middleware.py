@@ -1,9 +1,18 @@
 # accounts/middleware.py
 import time
 import logging
+from contextlib import ExitStack
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections
 from django.utils.deprecation import MiddlewareMixin
 from django.core.cache import cache
-from django.http import HttpResponseForbidden
+from django.http import HttpResponse, HttpResponseForbidden
+
+from . import metrics, perf, throttle
+from .query_budget import QueryBudgetExceeded, QueryCollector, collecting, get_budget
+from .storage import HASHED_NAME_RE, built_css_available
 
 logger = logging.getLogger("security")
 
@@ -21,13 +30,17 @@ class SecurityHeadersMiddleware(MiddlewareMixin):
         response["Permissions-Policy"] = "geolocation=(), microphone=(), camera=()"
 
         # CSP خفيف (ممكن تشديده لاحقًا حسب مواردك)
-        # انت تستخدم Tailwind CDN + Google Fonts
+        # CSS مبني محليًا (build_assets) + Google Fonts؛ Tailwind CDN فقط قبل البناء
+        script_src = "'self' 'unsafe-inline'"
+        if not built_css_available():
+            parts = urlsplit(settings.TAILWIND_CDN_URL)
+            script_src += f" {parts.scheme}://{parts.netloc}"
         csp = (
             "default-src 'self'; "
             "img-src 'self' data: blob: https:; "
-            "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com https://cdn.tailwindcss.com; "
+            "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
             "font-src 'self' https://fonts.gstatic.com data:; "
-            "script-src 'self' 'unsafe-inline' https://cdn.tailwindcss.com; "
+            f"script-src {script_src}; "
             "connect-src 'self'; "
             "frame-ancestors 'none'; "
         )
@@ -36,6 +49,120 @@ class SecurityHeadersMiddleware(MiddlewareMixin):
         return response
 
 
+class PerformanceMiddleware:
+    """
+    قياس كل طلب حسب اسم الـ view (زمن / استعلامات DB / cache / حجم الاستجابة)
+    وتجميعه في accounts.perf.registry.
+    يوضع أول MIDDLEWARE حتى يشمل زمن باقي الطبقات.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "PERF_ENABLED", True)
+        perf.registry.flush_interval = getattr(settings, "PERF_FLUSH_INTERVAL", 300)
+
+    def __call__(self, request):
+        if not self.enabled or (request.path or "").startswith(settings.STATIC_URL):
+            return self.get_response(request)
+
+        token = perf.start_request()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(perf.db_execute_wrapper))
+                response = self.get_response(request)
+            request_metrics = perf.current_metrics()
+        finally:
+            perf.end_request(token)
+
+        view_name = self._view_name(request)
+        wall_ms = (time.perf_counter() - request_metrics.started) * 1000
+        perf.registry.observe(
+            view_name,
+            wall_ms,
+            request_metrics,
+            self._response_size(response),
+            response.status_code,
+        )
+        metrics.observe_request(view_name, wall_ms / 1000, request_metrics.db_time_ms / 1000)
+        return response
+
+    @staticmethod
+    def _view_name(request):
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return "<unresolved>"
+        return match.view_name or match._func_path
+
+    @staticmethod
+    def _response_size(response):
+        if getattr(response, "streaming", False):
+            try:
+                return int(response.get("Content-Length") or 0)
+            except ValueError:
+                return 0
+        return len(response.content)
+
+
+class QueryBudgetMiddleware:
+    """
+    يطبق query_budget لكل view + كشف N+1 (accounts/query_budget.py).
+    مفعّل فقط في DEBUG / الاختبارات حسب QUERY_BUDGET_MODE (mashromoahmecom/test_runner.py).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # يُقرأ لكل طلب => override_settings في الاختبارات يعمل مع أي runner
+        mode = getattr(settings, "QUERY_BUDGET_MODE", "off")
+        if mode not in ("log", "raise"):
+            return self.get_response(request)
+
+        collector = QueryCollector()
+        with ExitStack() as stack:
+            stack.enter_context(collecting(collector))
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(collector))
+            response = self.get_response(request)
+
+        view = getattr(getattr(request, "resolver_match", None), "view_name", None) or request.path
+
+        threshold = getattr(settings, "QUERY_BUDGET_DUPLICATE_THRESHOLD", 5)
+        for sql, n, origins in collector.duplicates(threshold):
+            perf.perf_logger.warning(
+                "N+1 suspected in %s: %d× %s | from %s", view, n, sql[:200], ", ".join(origins[:5])
+            )
+
+        budget = get_budget(request)
+        if budget is not None and collector.count > budget:
+            msg = f"{view}: {collector.count} queries > budget {budget}"
+            if mode == "raise":
+                raise QueryBudgetExceeded(msg)
+            perf.perf_logger.warning("Query budget exceeded: %s", msg)
+
+        return response
+
+
+class StaticCacheControlMiddleware(MiddlewareMixin):
+    """
+    Cache-Control للملفات الثابتة:
+    - اسم فيه hash المحتوى (ManifestStaticFilesStorage) => سنة كاملة + immutable
+    - غير ذلك => مدة قصيرة
+    """
+
+    def process_response(self, request, response):
+        path = request.path or ""
+        if not path.startswith(settings.STATIC_URL) or response.status_code != 200:
+            return response
+
+        if HASHED_NAME_RE.search(path):
+            response["Cache-Control"] = f"public, max-age={settings.STATIC_HASHED_MAX_AGE}, immutable"
+        else:
+            response["Cache-Control"] = f"public, max-age={settings.STATIC_DEFAULT_MAX_AGE}"
+        return response
+
+
 class SimpleRateLimitMiddleware(MiddlewareMixin):
     """
     Rate limiting بسيط على مسارات حساسة لتقليل brute-force.
@@ -51,7 +178,8 @@ class SimpleRateLimitMiddleware(MiddlewareMixin):
 
     def process_request(self, request):
         path = request.path or ""
-        if not any(path.startswith(p) for p in self.SENSITIVE_PREFIXES):
+        prefix = next((p for p in self.SENSITIVE_PREFIXES if path.startswith(p)), None)
+        if prefix is None:
             return None
 
         ip = self._get_ip(request)
@@ -71,13 +199,40 @@ class SimpleRateLimitMiddleware(MiddlewareMixin):
 
         if bucket["count"] > self.LIMIT:
             logger.warning("Rate limit exceeded", extra={"ip": ip, "path": path})
+            metrics.inc_rate_limit_block(prefix)
             return HttpResponseForbidden("تم حظر الطلب مؤقتًا بسبب كثرة المحاولات.")
 
         return None
 
-    @staticmethod
-    def _get_ip(request):
-        xff = request.META.get("HTTP_X_FORWARDED_FOR")
-        if xff:
-            return xff.split(",")[0].strip()
-        return request.META.get("REMOTE_ADDR", "unknown")
+    _get_ip = staticmethod(throttle.client_ip)
+
+
+class LoginLockoutMiddleware:
+    """
+    رفض مبكر لمحاولات الدخول على حساب مقفول (accounts/throttle.py).
+    يوضع قبل SessionMiddleware: الطلب المرفوض لا يحمّل session ولا يلمس DB
+    ولا يشغّل PBKDF2 — فقط قراءة cache واحدة.
+    """
+
+    LOGIN_PATHS = ("/accounts/login/",)
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method == "POST" and request.path in self.LOGIN_PATHS:
+            username = throttle.normalize_username(request.POST.get("username"))
+            if username:
+                ip = throttle.client_ip(request)
+                retry_after = throttle.lockout_remaining(ip, username)
+                if retry_after:
+                    logger.warning("Login locked out", extra={"ip": ip, "username": username})
+                    metrics.inc_rate_limit_block(request.path)
+                    response = HttpResponse(
+                        "تم إيقاف محاولات الدخول مؤقتًا لهذا الحساب. حاول لاحقًا.",
+                        status=429,
+                        content_type="text/plain; charset=utf-8",
+                    )
+                    response["Retry-After"] = str(retry_after)
+                    return response
+        return self.get_response(request)
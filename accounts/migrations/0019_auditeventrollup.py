@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_remove_useragreement_token_bound_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEventRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('event_type', models.CharField(choices=[('auth_login', 'دخول'), ('auth_logout', 'خروج'), ('auth_failed', 'محاولة دخول فاشلة'), ('profile_update', 'تحديث الملف الشخصي'), ('case_create', 'رفع قضية'), ('agreement_accept', 'موافقة اتفاقية'), ('agreement_sign', 'توقيع اتفاقية'), ('payment_submit', 'إرسال إيصال دفع'), ('master_message', 'رسالة ماستر'), ('security_block', 'حظر أمني'), ('view', 'تصفح صفحة')], max_length=40, verbose_name='نوع الحدث')),
+                ('path', models.CharField(blank=True, default='', max_length=300, verbose_name='المسار')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='العدد')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='audit_rollups', to=settings.AUTH_USER_MODEL, verbose_name='المستخدم')),
+            ],
+            options={
+                'verbose_name': 'تجميع سجلات يومي',
+                'verbose_name_plural': 'تجميعات السجلات اليومية',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'user', 'event_type', 'path'), name='audit_rollup_unique_day_user_type_path')],
+            },
+        ),
+    ]
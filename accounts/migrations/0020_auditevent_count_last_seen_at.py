@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_auditeventrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditevent',
+            name='count',
+            field=models.PositiveIntegerField(default=1, verbose_name='عدد التكرار'),
+        ),
+        migrations.AddField(
+            model_name='auditevent',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='آخر تكرار'),
+        ),
+    ]
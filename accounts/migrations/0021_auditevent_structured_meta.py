@@ -0,0 +1,163 @@
+# AuditEvent.meta: نص حر => JSON + أعمدة مفهرسة (case_number / token / folder_id / error_code)
+
+import json
+import re
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+# نسخة مجمدة من accounts/audit.py وقت هذا الـ migration (الكود الحالي قد يتغير لاحقًا)
+PROMOTED_META_KEYS = ("case_number", "token", "folder_id", "error_code")
+_PROMOTED_MAX_LEN = {"case_number": 50, "token": 64, "error_code": 64}
+
+_LEGACY_PAIR_RE = re.compile(r"\s*\b(token|case|folder|receipt|title):")
+_LEGACY_PAIR_KEYS = {"token": "token", "case": "case_number", "folder": "folder_id", "receipt": "receipt", "title": "title"}
+_LEGACY_ENTITY_KEYS = {
+    "agreement_view": "token",
+    "payment_page": "token",
+    "payment_pending_review": "token",
+    "payment_success": "token",
+    "case_timeline": "case_number",
+    "master_client_detail": "folder_id",
+}
+_ERROR_EVENT_TYPES = {"security_block", "auth_failed"}
+
+
+def split_meta(meta):
+    rest = dict(meta or {})
+    columns = {}
+    for key in PROMOTED_META_KEYS:
+        value = rest.pop(key, None)
+        if value in (None, ""):
+            continue
+        if key == "folder_id":
+            try:
+                columns[key] = int(value)
+            except (TypeError, ValueError):
+                rest["folder"] = value
+            continue
+        columns[key] = str(value)[: _PROMOTED_MAX_LEN[key]]
+    return columns, rest
+
+
+def parse_legacy_meta(event_type, text):
+    text = (text or "").strip()
+    if not text:
+        return {}
+
+    parts = _LEGACY_PAIR_RE.split(text)
+    if len(parts) > 1 and parts[0] == "":
+        return {_LEGACY_PAIR_KEYS[k]: v.strip() for k, v in zip(parts[1::2], parts[2::2])}
+
+    head, sep, rest = text.partition(":")
+    if sep and head in _LEGACY_ENTITY_KEYS:
+        return {"action": head, _LEGACY_ENTITY_KEYS[head]: rest.strip()}
+    if event_type in _ERROR_EVENT_TYPES and re.fullmatch(r"\w+", head):
+        return {"error_code": head, "detail": rest.strip()} if sep else {"error_code": head}
+    if re.fullmatch(r"\w+", text):
+        return {"action": text}
+    return {"text": text}
+
+
+def forwards(apps, schema_editor):
+    AuditEvent = apps.get_model("accounts", "AuditEvent")
+    fields = ["meta_json", "case_number", "token", "folder_id", "error_code"]
+    batch = []
+    rows = AuditEvent.objects.exclude(meta__isnull=True).exclude(meta="").only("id", "event_type", "meta")
+    for event in rows.iterator(chunk_size=BATCH_SIZE):
+        columns, rest = split_meta(parse_legacy_meta(event.event_type, event.meta))
+        event.meta_json = rest or None
+        for key, value in columns.items():
+            setattr(event, key, value)
+        batch.append(event)
+        if len(batch) >= BATCH_SIZE:
+            AuditEvent.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        AuditEvent.objects.bulk_update(batch, fields)
+
+
+def backwards(apps, schema_editor):
+    AuditEvent = apps.get_model("accounts", "AuditEvent")
+    batch = []
+    for event in AuditEvent.objects.only("id", "meta_json", "case_number", "token", "folder_id", "error_code").iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        data = dict(event.meta_json or {})
+        for key in ("case_number", "token", "folder_id", "error_code"):
+            if getattr(event, key) is not None:
+                data[key] = getattr(event, key)
+        event.meta = json.dumps(data, ensure_ascii=False) if data else None
+        batch.append(event)
+        if len(batch) >= BATCH_SIZE:
+            AuditEvent.objects.bulk_update(batch, ["meta"])
+            batch = []
+    if batch:
+        AuditEvent.objects.bulk_update(batch, ["meta"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_auditevent_count_last_seen_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditevent',
+            name='meta_json',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='auditevent',
+            name='case_number',
+            field=models.CharField(blank=True, max_length=50, null=True, verbose_name='رقم القضية'),
+        ),
+        migrations.AddField(
+            model_name='auditevent',
+            name='token',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='رمز الاتفاقية'),
+        ),
+        migrations.AddField(
+            model_name='auditevent',
+            name='folder_id',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='ملف العميل'),
+        ),
+        migrations.AddField(
+            model_name='auditevent',
+            name='error_code',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='رمز الخطأ'),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.RemoveField(
+            model_name='auditevent',
+            name='meta',
+        ),
+        migrations.RenameField(
+            model_name='auditevent',
+            old_name='meta_json',
+            new_name='meta',
+        ),
+        migrations.AlterField(
+            model_name='auditevent',
+            name='meta',
+            field=models.JSONField(blank=True, null=True, verbose_name='بيانات إضافية'),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['case_number', '-created_at'], name='audit_case_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['token', '-created_at'], name='audit_token_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['folder_id', '-created_at'], name='audit_folder_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['error_code', '-created_at'], name='audit_error_code_idx'),
+        ),
+    ]
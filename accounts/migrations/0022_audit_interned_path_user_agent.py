@@ -0,0 +1,121 @@
+# AuditEvent.path / user_agent: نص مكرر => FK لجداول قاموس (AuditPath / AuditUserAgent)
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Substr
+
+BATCH_SIZE = 2000
+
+
+def _intern_column(AuditEvent, Dictionary, column, ref):
+    # نفس القص (300) في القاموس وفي المطابقة => القيم الأطول تجد صفها أيضًا
+    truncated = Substr(column, 1, 300)
+    values = (
+        AuditEvent.objects.exclude(**{f"{column}__isnull": True})
+        .exclude(**{column: ""})
+        .annotate(value=truncated)
+        .values_list("value", flat=True)
+        .distinct()
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    batch = []
+    for value in values:
+        batch.append(Dictionary(value=value))
+        if len(batch) >= BATCH_SIZE:
+            Dictionary.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        Dictionary.objects.bulk_create(batch, ignore_conflicts=True)
+
+    # UPDATE واحد للعمود كله (subquery على value الفريد المفهرس) بدل UPDATE لكل قيمة
+    AuditEvent.objects.exclude(**{f"{column}__isnull": True}).exclude(**{column: ""}).update(
+        **{ref: Subquery(Dictionary.objects.filter(value=Substr(OuterRef(column), 1, 300)).values("id")[:1])}
+    )
+
+
+def forwards(apps, schema_editor):
+    AuditEvent = apps.get_model("accounts", "AuditEvent")
+    _intern_column(AuditEvent, apps.get_model("accounts", "AuditPath"), "path", "path_ref")
+    _intern_column(AuditEvent, apps.get_model("accounts", "AuditUserAgent"), "user_agent", "user_agent_ref")
+
+
+def backwards(apps, schema_editor):
+    AuditEvent = apps.get_model("accounts", "AuditEvent")
+    for Dictionary, column, ref in (
+        (apps.get_model("accounts", "AuditPath"), "path", "path_ref"),
+        (apps.get_model("accounts", "AuditUserAgent"), "user_agent", "user_agent_ref"),
+    ):
+        for pk, value in Dictionary.objects.values_list("id", "value").iterator(chunk_size=BATCH_SIZE):
+            AuditEvent.objects.filter(**{ref: pk}).update(**{column: value})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_auditevent_structured_meta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditPath',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(max_length=300, unique=True, verbose_name='المسار')),
+            ],
+            options={
+                'verbose_name': 'مسار (سجل)',
+                'verbose_name_plural': 'مسارات السجلات',
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditUserAgent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(max_length=300, unique=True, verbose_name='User-Agent')),
+            ],
+            options={
+                'verbose_name': 'User-Agent (سجل)',
+                'verbose_name_plural': 'User-Agents السجلات',
+            },
+        ),
+        migrations.AddField(
+            model_name='auditevent',
+            name='path_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.auditpath'),
+        ),
+        migrations.AddField(
+            model_name='auditevent',
+            name='user_agent_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.audituseragent'),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.RemoveField(
+            model_name='auditevent',
+            name='path',
+        ),
+        migrations.RemoveField(
+            model_name='auditevent',
+            name='user_agent',
+        ),
+        migrations.RenameField(
+            model_name='auditevent',
+            old_name='path_ref',
+            new_name='path',
+        ),
+        migrations.RenameField(
+            model_name='auditevent',
+            old_name='user_agent_ref',
+            new_name='user_agent',
+        ),
+        migrations.AlterField(
+            model_name='auditevent',
+            name='path',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.auditpath', verbose_name='المسار'),
+        ),
+        migrations.AlterField(
+            model_name='auditevent',
+            name='user_agent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.audituseragent', verbose_name='User-Agent'),
+        ),
+    ]
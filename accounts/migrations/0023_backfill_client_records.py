@@ -0,0 +1,39 @@
+# ملف العميل + ملف التواصل لكل عميل قديم (كانت تُنشأ عند فتح الصفحات، الآن عند التسجيل/الدخول)
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def _backfill(User, Model):
+    missing = (
+        User.objects.filter(is_staff=False)
+        .exclude(id__in=Model.objects.values("user_id"))
+        .values_list("id", flat=True)
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    batch = []
+    for user_id in missing:
+        batch.append(Model(user_id=user_id))
+        if len(batch) >= BATCH_SIZE:
+            Model.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        Model.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def forwards(apps, schema_editor):
+    User = apps.get_model("accounts", "User")
+    _backfill(User, apps.get_model("accounts", "UserProfile"))
+    _backfill(User, apps.get_model("accounts", "ClientMasterFolder"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0022_audit_interned_path_user_agent'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
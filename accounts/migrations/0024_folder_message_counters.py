@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:16
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def forwards(apps, schema_editor):
+    # نسخة مجمدة من messaging.refresh_counters وقت هذا الـ migration
+    Folder = apps.get_model("accounts", "ClientMasterFolder")
+    Message = apps.get_model("accounts", "ClientMasterMessage")
+    msgs = Message.objects.filter(folder=OuterRef("pk")).order_by().values("folder")
+
+    def unread(direction):
+        sub = msgs.filter(direction=direction, is_read=False).annotate(n=Count("id")).values("n")
+        return Coalesce(Subquery(sub), 0)
+
+    def last_at(direction):
+        return Subquery(msgs.filter(direction=direction).annotate(m=Max("created_at")).values("m"))
+
+    def first_client(after=None):
+        sub = msgs.filter(direction="client")
+        if after is not None:
+            sub = sub.filter(created_at__gt=after)
+        return Subquery(sub.annotate(m=Min("created_at")).values("m"))
+
+    folders = Folder.objects.all()
+    folders.update(
+        unread_from_client=unread("client"),
+        unread_from_lawyer=unread("lawyer"),
+        last_client_message_at=last_at("client"),
+        last_lawyer_message_at=last_at("lawyer"),
+    )
+    # UPDATE يقرأ القيم القديمة => awaiting في خطوة ثانية بعد last_lawyer_message_at
+    folders.filter(last_lawyer_message_at__isnull=True).update(awaiting_reply_since=first_client())
+    folders.filter(last_lawyer_message_at__isnull=False).update(
+        awaiting_reply_since=first_client(after=OuterRef("last_lawyer_message_at"))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_backfill_client_records'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientmasterfolder',
+            name='awaiting_reply_since',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='ينتظر الرد منذ'),
+        ),
+        migrations.AddField(
+            model_name='clientmasterfolder',
+            name='last_client_message_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='آخر رسالة من العميل'),
+        ),
+        migrations.AddField(
+            model_name='clientmasterfolder',
+            name='last_lawyer_message_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='آخر رد من المكتب'),
+        ),
+        migrations.AddField(
+            model_name='clientmasterfolder',
+            name='unread_from_client',
+            field=models.PositiveIntegerField(default=0, verbose_name='غير مقروءة من العميل'),
+        ),
+        migrations.AddField(
+            model_name='clientmasterfolder',
+            name='unread_from_lawyer',
+            field=models.PositiveIntegerField(default=0, verbose_name='غير مقروءة من المكتب'),
+        ),
+        migrations.AddIndex(
+            model_name='clientmasterfolder',
+            index=models.Index(fields=['awaiting_reply_since', '-created_at'], name='folder_awaiting_idx'),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0024_folder_message_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clientmastermessage',
+            index=models.Index(fields=['folder', 'created_at', 'id'], name='master_msg_thread_idx'),
+        ),
+    ]
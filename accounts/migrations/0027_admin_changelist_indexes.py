@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0026_audit_admin_action_event'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['created_at', 'id'], name='audit_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['event_type', 'created_at', 'id'], name='audit_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sentimentsnapshot',
+            index=models.Index(fields=['created_at', 'id'], name='sentiment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sentimentsnapshot',
+            index=models.Index(fields=['target', 'created_at', 'id'], name='sentiment_target_created_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:44
+
+import accounts.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0027_admin_changelist_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useragreement',
+            name='client_receipt_thumb',
+            field=models.ImageField(blank=True, null=True, upload_to=accounts.models.upload_client_receipt_image, verbose_name='مصغّر صورة الإيصال'),
+        ),
+    ]
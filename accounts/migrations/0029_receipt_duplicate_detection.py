@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Replace, Upper
+
+
+def forwards(apps, schema_editor):
+    # UPDATE واحد: security.validate_receipt_code يسمح بحروف/أرقام/شرطة فقط
+    # => نفس receipts.normalize_receipt_code (بصمات الصور: build_receipt_thumbnails)
+    UserAgreement = apps.get_model("accounts", "UserAgreement")
+    UserAgreement.objects.exclude(client_payment_receipt__isnull=True).exclude(client_payment_receipt="").update(
+        receipt_code_normalized=Upper(Replace(Replace("client_payment_receipt", Value("-"), Value("")), Value(" "), Value("")))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0028_receipt_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useragreement',
+            name='receipt_code_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, verbose_name='رقم إيصال العميل (موحّد)'),
+        ),
+        migrations.AddField(
+            model_name='useragreement',
+            name='receipt_duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.useragreement', verbose_name='إيصال مكرر محتمل'),
+        ),
+        migrations.AddField(
+            model_name='useragreement',
+            name='receipt_image_hash',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True, verbose_name='بصمة صورة الإيصال'),
+        ),
+        migrations.AddIndex(
+            model_name='useragreement',
+            index=models.Index(fields=['receipt_code_normalized'], name='agreement_receipt_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useragreement',
+            index=models.Index(fields=['client_receipt_image_uploaded_at'], name='agreement_receipt_upload_idx'),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
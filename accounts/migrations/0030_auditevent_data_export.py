@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0029_receipt_duplicate_detection'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditevent',
+            name='event_type',
+            field=models.CharField(choices=[('auth_login', 'دخول'), ('auth_logout', 'خروج'), ('auth_failed', 'محاولة دخول فاشلة'), ('profile_update', 'تحديث الملف الشخصي'), ('case_create', 'رفع قضية'), ('agreement_accept', 'موافقة اتفاقية'), ('agreement_sign', 'توقيع اتفاقية'), ('payment_submit', 'إرسال إيصال دفع'), ('master_message', 'رسالة ماستر'), ('admin_action', 'إجراء إداري'), ('security_block', 'حظر أمني'), ('data_export', 'تصدير بيانات'), ('view', 'تصفح صفحة')], max_length=40, verbose_name='نوع الحدث'),
+        ),
+        migrations.AlterField(
+            model_name='auditeventrollup',
+            name='event_type',
+            field=models.CharField(choices=[('auth_login', 'دخول'), ('auth_logout', 'خروج'), ('auth_failed', 'محاولة دخول فاشلة'), ('profile_update', 'تحديث الملف الشخصي'), ('case_create', 'رفع قضية'), ('agreement_accept', 'موافقة اتفاقية'), ('agreement_sign', 'توقيع اتفاقية'), ('payment_submit', 'إرسال إيصال دفع'), ('master_message', 'رسالة ماستر'), ('admin_action', 'إجراء إداري'), ('security_block', 'حظر أمني'), ('data_export', 'تصدير بيانات'), ('view', 'تصفح صفحة')], max_length=40, verbose_name='نوع الحدث'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0030_auditevent_data_export'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='clientmastermessage',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='تاريخ الإرسال'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0031_clientmastermessage_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clientmasterfolder',
+            index=models.Index(condition=models.Q(('unread_from_client__gt', 0)), fields=['unread_from_client'], name='folder_unread_client_idx'),
+        ),
+    ]
@@ -329,9 +329,48 @@ class ClientMasterFolder(models.Model):
         verbose_name="تاريخ الإنشاء"
     )
 
+    # ✅ عدادات الرسائل (تُحدّث عبر accounts/messaging.py بـ F-expressions)
+    unread_from_client = models.PositiveIntegerField(
+        default=0,
+        verbose_name="غير مقروءة من العميل"
+    )
+
+    unread_from_lawyer = models.PositiveIntegerField(
+        default=0,
+        verbose_name="غير مقروءة من المكتب"
+    )
+
+    last_client_message_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="آخر رسالة من العميل"
+    )
+
+    last_lawyer_message_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="آخر رد من المكتب"
+    )
+
+    # أول رسالة عميل بدون رد بعدها (NULL = لا ينتظر ردًا)
+    awaiting_reply_since = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="ينتظر الرد منذ"
+    )
+
     class Meta:
         verbose_name = "مجلد ماستر عميل"
         verbose_name_plural = "مجلدات الماستر للعملاء"
+        indexes = [
+            models.Index(fields=["awaiting_reply_since", "-created_at"], name="folder_awaiting_idx"),
+            # شارة الموظفين: SUM(unread_from_client) على الملفات غير المقروءة فقط (accounts/badges.py)
+            models.Index(
+                fields=["unread_from_client"],
+                condition=models.Q(unread_from_client__gt=0),
+                name="folder_unread_client_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"مجلد {self.user.username}"
@@ -373,8 +412,10 @@ class ClientMasterMessage(models.Model):
         verbose_name="مقروءة"
     )
 
+    # default بدل auto_now_add => الرسائل الجماعية تمرر وقت دفعة واحد (accounts/broadcast.py)
     created_at = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         verbose_name="تاريخ الإرسال"
     )
 
@@ -382,6 +423,10 @@ class ClientMasterMessage(models.Model):
         verbose_name = "رسالة ماستر"
         verbose_name_plural = "رسائل الماستر"
         ordering = ["-created_at"]
+        indexes = [
+            # صفحات المحادثة بمؤشر (created_at, id) — accounts/messaging.py: thread_page
+            models.Index(fields=["folder", "created_at", "id"], name="master_msg_thread_idx"),
+        ]
 
     def __str__(self):
         return f"رسالة - {self.folder.user.username}"
@@ -565,6 +610,15 @@ class UserAgreement(models.Model):
         null=True
     )
 
+    # للبحث عن إيصال مكرر (accounts/receipts.py: normalize_receipt_code)
+    receipt_code_normalized = models.CharField(
+        "رقم إيصال العميل (موحّد)",
+        max_length=64,
+        blank=True,
+        null=True,
+        editable=False
+    )
+
     client_paid_at = models.DateTimeField(
         "تاريخ إدخال الإيصال من العميل",
         blank=True,
@@ -578,12 +632,39 @@ class UserAgreement(models.Model):
         null=True
     )
 
+    # مصغّر لطابور مراجعة الدفع (accounts/receipts.py)
+    client_receipt_thumb = models.ImageField(
+        "مصغّر صورة الإيصال",
+        upload_to=upload_client_receipt_image,
+        blank=True,
+        null=True
+    )
+
     client_receipt_image_uploaded_at = models.DateTimeField(
         "تاريخ رفع صورة الإيصال",
         blank=True,
         null=True
     )
 
+    # بصمة dHash (64 bit hex) لصورة الإيصال (accounts/receipts.py)
+    receipt_image_hash = models.CharField(
+        "بصمة صورة الإيصال",
+        max_length=16,
+        blank=True,
+        null=True,
+        editable=False
+    )
+
+    # أول اتفاقية سابقة بنفس رقم الإيصال أو بصورة شبه مطابقة (وقت الإرسال)
+    receipt_duplicate_of = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        related_name="+",
+        blank=True,
+        null=True,
+        verbose_name="إيصال مكرر محتمل"
+    )
+
     receipt_number = models.CharField(
         "رقم إيصال المكتب",
         max_length=64,
@@ -643,6 +724,10 @@ class UserAgreement(models.Model):
         verbose_name = "اتفاقية"
         verbose_name_plural = "الاتفاقيات"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["receipt_code_normalized"], name="agreement_receipt_code_idx"),
+            models.Index(fields=["client_receipt_image_uploaded_at"], name="agreement_receipt_upload_idx"),
+        ]
 
     def __str__(self):
         return f"اتفاقية {self.user.username}"
@@ -672,6 +757,34 @@ class UserAgreement(models.Model):
 # ✅ AUDIT + TIMELINE + SENTIMENT (إضافة شاملة للأمان والتتبع)
 # ==================================================
 
+class AuditPath(models.Model):
+    """
+    قاموس المسارات المسجلة في AuditEvent (قيمة واحدة لكل مسار).
+    """
+    value = models.CharField(max_length=300, unique=True, verbose_name="المسار")
+
+    class Meta:
+        verbose_name = "مسار (سجل)"
+        verbose_name_plural = "مسارات السجلات"
+
+    def __str__(self):
+        return self.value
+
+
+class AuditUserAgent(models.Model):
+    """
+    قاموس User-Agent المسجلة في AuditEvent.
+    """
+    value = models.CharField(max_length=300, unique=True, verbose_name="User-Agent")
+
+    class Meta:
+        verbose_name = "User-Agent (سجل)"
+        verbose_name_plural = "User-Agents السجلات"
+
+    def __str__(self):
+        return self.value
+
+
 class AuditEvent(models.Model):
     """
     سجل مركزي للأحداث:
@@ -692,7 +805,9 @@ class AuditEvent(models.Model):
         ("agreement_sign", "توقيع اتفاقية"),
         ("payment_submit", "إرسال إيصال دفع"),
         ("master_message", "رسالة ماستر"),
+        ("admin_action", "إجراء إداري"),
         ("security_block", "حظر أمني"),
+        ("data_export", "تصدير بيانات"),
         ("view", "تصفح صفحة"),
     ]
 
@@ -711,10 +826,13 @@ class AuditEvent(models.Model):
         verbose_name="نوع الحدث"
     )
 
-    path = models.CharField(
-        max_length=300,
+    # قيم متكررة => جداول قاموس (accounts/interning.py)
+    path = models.ForeignKey(
+        "AuditPath",
+        on_delete=models.PROTECT,
         blank=True,
         null=True,
+        related_name="+",
         verbose_name="المسار"
     )
 
@@ -725,19 +843,39 @@ class AuditEvent(models.Model):
         verbose_name="IP"
     )
 
-    user_agent = models.CharField(
-        max_length=300,
+    user_agent = models.ForeignKey(
+        "AuditUserAgent",
+        on_delete=models.PROTECT,
         blank=True,
         null=True,
+        related_name="+",
         verbose_name="User-Agent"
     )
 
-    meta = models.TextField(
+    meta = models.JSONField(
         blank=True,
         null=True,
         verbose_name="بيانات إضافية"
     )
 
+    # مفاتيح meta الأكثر استعلامًا كأعمدة مفهرسة (accounts/audit.py: PROMOTED_META_KEYS)
+    case_number = models.CharField(max_length=50, blank=True, null=True, verbose_name="رقم القضية")
+    token = models.CharField(max_length=64, blank=True, null=True, verbose_name="رمز الاتفاقية")
+    folder_id = models.PositiveIntegerField(blank=True, null=True, verbose_name="ملف العميل")
+    error_code = models.CharField(max_length=64, blank=True, null=True, verbose_name="رمز الخطأ")
+
+    # تكرارات مدمجة في نفس الصف (coalesce) أو وزن العينة (sample) — accounts/audit.py
+    count = models.PositiveIntegerField(
+        default=1,
+        verbose_name="عدد التكرار"
+    )
+
+    last_seen_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="آخر تكرار"
+    )
+
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name="وقت الحدث"
@@ -747,11 +885,66 @@ class AuditEvent(models.Model):
         verbose_name = "سجل أمني"
         verbose_name_plural = "السجلات الأمنية"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["case_number", "-created_at"], name="audit_case_number_idx"),
+            models.Index(fields=["token", "-created_at"], name="audit_token_idx"),
+            models.Index(fields=["folder_id", "-created_at"], name="audit_folder_idx"),
+            models.Index(fields=["error_code", "-created_at"], name="audit_error_code_idx"),
+            # الأدمن: الترتيب/date_hierarchy/"التالي" بمؤشر + فلتر النوع (accounts/admin_paging.py)
+            models.Index(fields=["created_at", "id"], name="audit_created_idx"),
+            models.Index(fields=["event_type", "created_at", "id"], name="audit_type_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.get_event_type_display()} - {self.created_at}"
 
 
+class AuditEventRollup(models.Model):
+    """
+    تجميع يومي للسجلات القديمة (بعد حذف الصفوف الخام ونقلها للأرشيف):
+    عدد الأحداث لكل يوم / مستخدم / نوع / مسار.
+    """
+    day = models.DateField(verbose_name="اليوم")
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="audit_rollups",
+        verbose_name="المستخدم"
+    )
+
+    event_type = models.CharField(
+        max_length=40,
+        choices=AuditEvent.EVENT_TYPES,
+        verbose_name="نوع الحدث"
+    )
+
+    path = models.CharField(
+        max_length=300,
+        blank=True,
+        default="",
+        verbose_name="المسار"
+    )
+
+    count = models.PositiveIntegerField(default=0, verbose_name="العدد")
+
+    class Meta:
+        verbose_name = "تجميع سجلات يومي"
+        verbose_name_plural = "تجميعات السجلات اليومية"
+        ordering = ["-day"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "user", "event_type", "path"],
+                name="audit_rollup_unique_day_user_type_path",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.get_event_type_display()} ({self.count})"
+
+
 class CaseTimelineEvent(models.Model):
     """
     تسلسل القضية بشكل متتابع من:
@@ -883,6 +1076,10 @@ class SentimentSnapshot(models.Model):
         verbose_name = "تحليل مشاعر"
         verbose_name_plural = "تحليلات المشاعر"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="sentiment_created_idx"),
+            models.Index(fields=["target", "created_at", "id"], name="sentiment_target_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.get_target_display()} - {self.get_label_display()}"
@@ -0,0 +1,73 @@
+# accounts/payments.py
+"""
+تغيير حالة الاتفاقيات على مجموعة (أدمن + طابور مراجعة الدفع):
+UPDATE واحد لكل جدول داخل transaction واحدة (بدون save() لكل صف).
+
+UPDATE لا يرسل post_save => شارات الهيدر + أحداث "agreement" المباشرة تُرسل هنا صراحة.
+كل دالة ترجع (عدد الصفوف المحدثة، [(user_id, token)] للاتفاقيات التي تغيّرت حالتها)
+والمستدعي يسجل ملخص audit واحد (log_event "admin_action").
+الصفوف تُقفل قبل القراءة (select_for_update) => طلبان متزامنان على نفس الاتفاقية:
+الثاني ينتظر ثم يجدها بالحالة الجديدة (rows فارغة، لا حدث مكرر).
+"""
+from django.db import models, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+
+from . import badges, realtime
+from .models import User, UserAgreement
+
+
+def _notify(rows, status):
+    if not rows:
+        return
+    badges.invalidate()
+    items = [(realtime.user_channel(user_id), "agreement", {"token": token, "status": status}) for user_id, token in rows]
+    transaction.on_commit(lambda: realtime.hub.publish_many(items))
+
+
+def _changing(queryset, status):
+    # القفل على جدول الاتفاقيات بالـ pk: queryset الأدمن قد يحوي DISTINCT/joins (لا يقبل FOR UPDATE)
+    locked = UserAgreement.objects.select_for_update().filter(pk__in=queryset.values("pk"))
+    return list(locked.exclude(status=status).values_list("user_id", "token"))
+
+
+def send_agreements(queryset):
+    pending = queryset.exclude(status="sent")
+    with transaction.atomic():
+        rows = _changing(pending, "sent")
+        User.objects.filter(pk__in=pending.values("user_id"), account_status="active").update(
+            account_status="pending_agreement"
+        )
+        sent = pending.update(status="sent", sent_at=timezone.now())
+        _notify(rows, "sent")
+    return sent, rows
+
+
+def approve_payments(queryset):
+    now = timezone.now()
+    # رقم إيصال المكتب لمن ليس له رقم: OFFICE-<YYYYMMDD>-<id> داخل نفس الـ UPDATE
+    receipt_number = models.Case(
+        models.When(
+            Q(receipt_number__isnull=True) | Q(receipt_number=""),
+            then=Concat(Value(f"OFFICE-{now.strftime('%Y%m%d')}-"), Cast("id", models.CharField())),
+        ),
+        default=F("receipt_number"),
+    )
+    with transaction.atomic():
+        rows = _changing(queryset, "paid")
+        # المستخدمون قبل الاتفاقيات: queryset قد يكون مفلترًا بالحالة القديمة
+        User.objects.filter(pk__in=queryset.values("user_id")).exclude(account_status="active").update(
+            account_status="active"
+        )
+        approved = queryset.update(status="paid", paid_at=now, receipt_number=receipt_number)
+        _notify(rows, "paid")
+    return approved, rows
+
+
+def reject_payments(queryset):
+    with transaction.atomic():
+        rows = _changing(queryset, "payment_pending")
+        rejected = queryset.update(status="payment_pending")
+        _notify(rows, "payment_pending")
+    return rejected, rows
@@ -0,0 +1,232 @@
+# accounts/perf.py
+"""
+قياس أداء الطلبات لكل view (بدون مكتبات خارجية):
+- زمن الطلب الكامل
+- عدد استعلامات DB وزمنها
+- Cache hits / misses
+- حجم الاستجابة
+
+التخزين: histograms في الذاكرة (buckets ثابتة => ذاكرة ثابتة)
+ويتم تفريغها دوريًا إلى logger "perf".
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+perf_logger = logging.getLogger("perf")
+
+# حدود buckets بالملّي ثانية (تصاعد هندسي 1.25x من 0.25ms حتى ~ 5 دقائق)
+BUCKET_BOUNDS_MS = [round(0.25 * (1.25 ** i), 3) for i in range(64)]
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram"):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q: float) -> float:
+        """
+        يرجع الحد الأعلى للـ bucket الذي يقع فيه الـ percentile (تقريب محافظ).
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                if i < len(BUCKET_BOUNDS_MS):
+                    return min(BUCKET_BOUNDS_MS[i], self.max)
+                return self.max
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+@dataclass
+class RequestMetrics:
+    """
+    عدادات طلب واحد (تعيش داخل contextvar طوال الطلب).
+    """
+    started: float = field(default_factory=time.perf_counter)
+    db_queries: int = 0
+    db_time_ms: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+
+_current = contextvars.ContextVar("perf_request_metrics", default=None)
+
+
+def current_metrics():
+    return _current.get()
+
+
+def start_request() -> contextvars.Token:
+    return _current.set(RequestMetrics())
+
+
+def end_request(token: contextvars.Token):
+    _current.reset(token)
+
+
+def record_cache(hit: bool, n: int = 1):
+    m = _current.get()
+    if m is None:
+        return
+    if hit:
+        m.cache_hits += n
+    else:
+        m.cache_misses += n
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    """
+    connection.execute_wrapper: يحسب عدد وزمن الاستعلامات حتى بدون DEBUG.
+    """
+    m = _current.get()
+    if m is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        m.db_queries += 1
+        m.db_time_ms += (time.perf_counter() - t0) * 1000
+
+
+class ViewStats:
+    __slots__ = ("wall_ms", "db_queries", "db_time_ms", "cache_hits", "cache_misses", "response_bytes", "errors")
+
+    def __init__(self):
+        self.wall_ms = Histogram()
+        self.db_queries = Histogram()
+        self.db_time_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.response_bytes = 0
+        self.errors = 0
+
+    def merge(self, other: "ViewStats"):
+        self.wall_ms.merge(other.wall_ms)
+        self.db_queries.merge(other.db_queries)
+        self.db_time_ms += other.db_time_ms
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+        self.response_bytes += other.response_bytes
+        self.errors += other.errors
+
+
+class PerfRegistry:
+    """
+    نافذة حالية + آخر نافذة تم تفريغها.
+    العرض يدمج الاثنتين حتى لا تصبح الصفحة فاضية مباشرة بعد التفريغ.
+    """
+
+    def __init__(self, flush_interval: int = 300):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._current = {}
+        self._previous = {}
+        self._window_started = time.time()
+
+    def observe(self, view_name: str, wall_ms: float, metrics: RequestMetrics, response_bytes: int, status_code: int):
+        with self._lock:
+            stats = self._current.get(view_name)
+            if stats is None:
+                stats = self._current[view_name] = ViewStats()
+            stats.wall_ms.observe(wall_ms)
+            stats.db_queries.observe(metrics.db_queries)
+            stats.db_time_ms += metrics.db_time_ms
+            stats.cache_hits += metrics.cache_hits
+            stats.cache_misses += metrics.cache_misses
+            stats.response_bytes += response_bytes
+            if status_code >= 500:
+                stats.errors += 1
+
+            due = time.time() - self._window_started >= self.flush_interval
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            window, self._current = self._current, {}
+            self._previous = window
+            started, self._window_started = self._window_started, time.time()
+
+        for name, s in sorted(window.items()):
+            perf_logger.info(
+                "view=%s n=%d p50=%.1fms p95=%.1fms p99=%.1fms q_avg=%.1f db_ms=%.1f cache=%d/%d bytes_avg=%d window=%ds",
+                name,
+                s.wall_ms.count,
+                s.wall_ms.percentile(0.50),
+                s.wall_ms.percentile(0.95),
+                s.wall_ms.percentile(0.99),
+                s.db_queries.mean,
+                s.db_time_ms,
+                s.cache_hits,
+                s.cache_hits + s.cache_misses,
+                s.response_bytes // max(s.wall_ms.count, 1),
+                int(time.time() - started),
+            )
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            merged = {}
+            for source in (self._previous, self._current):
+                for name, s in source.items():
+                    merged.setdefault(name, ViewStats()).merge(s)
+
+        rows = []
+        for name, s in merged.items():
+            n = s.wall_ms.count
+            cache_total = s.cache_hits + s.cache_misses
+            rows.append({
+                "view": name,
+                "count": n,
+                "p50": s.wall_ms.percentile(0.50),
+                "p95": s.wall_ms.percentile(0.95),
+                "p99": s.wall_ms.percentile(0.99),
+                "max": s.wall_ms.max,
+                "avg_queries": s.db_queries.mean,
+                "max_queries": s.db_queries.max,
+                "avg_db_ms": s.db_time_ms / n if n else 0.0,
+                "cache_hit_ratio": (s.cache_hits / cache_total) if cache_total else None,
+                "avg_bytes": s.response_bytes // n if n else 0,
+                "errors": s.errors,
+            })
+        rows.sort(key=lambda r: r["p95"], reverse=True)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._current = {}
+            self._previous = {}
+            self._window_started = time.time()
+
+
+registry = PerfRegistry()
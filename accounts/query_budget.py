@@ -0,0 +1,129 @@
+# accounts/query_budget.py
+"""
+Query budget لكل view:
+
+    path("dashboard/", query_budget(12)(views.user_dashboard), name="user_dashboard")
+
+QueryBudgetMiddleware يعدّ استعلامات الطلب، وإذا تجاوز الحد:
+- QUERY_BUDGET_MODE = "raise"  => QueryBudgetExceeded (الاختبارات)
+- QUERY_BUDGET_MODE = "log"    => تحذير في logger "perf" (DEBUG)
+- QUERY_BUDGET_MODE = "off"    => لا شيء (الإنتاج)
+
+ويكشف N+1: نفس SQL يتكرر >= QUERY_BUDGET_DUPLICATE_THRESHOLD مرة
+مع سطر القالب (أو سطر Python) الذي سببه.
+"""
+import sys
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+
+_DJANGO_DIR = str(Path(sys.modules["django"].__file__).parent)
+_TEMPLATE_BASE = str(Path(_DJANGO_DIR) / "template" / "base.py")
+
+_exempt = ContextVar("query_budget_exempt", default=False)
+_collector = ContextVar("query_budget_collector", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries: int):
+    """
+    يسجل الحد على دالة الـ view نفسها (بدون wrapper => بدون تكلفة في الإنتاج).
+    """
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+@contextmanager
+def budget_exempt():
+    """
+    استعلامات warm-up لمرة واحدة في العملية (مثل بناء receipts.index)
+    أو عددها يتبع حجم البيانات عمدًا (دفعات broadcast) لا تُحسب على budget الطلب.
+    """
+    token = _exempt.set(True)
+    try:
+        yield
+    finally:
+        _exempt.reset(token)
+
+
+@contextmanager
+def collecting(collector):
+    token = _collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
+
+
+def current_collector():
+    """
+    QueryCollector الطلب الحالي (لاستعلامات threads إضافية مثل accounts/fanout.py).
+    """
+    return _collector.get()
+
+
+def get_budget(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None
+    return getattr(match.func, "query_budget", None)
+
+
+def _query_origin():
+    """
+    أقرب سطر قالب (Node.render_annotated) أو سطر من كود المشروع نفذ الاستعلام.
+    """
+    frame = sys._getframe(2)
+    app_line = None
+    base_dir = str(settings.BASE_DIR)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == "render_annotated" and code.co_filename == _TEMPLATE_BASE:
+            node = frame.f_locals.get("self")
+            origin = getattr(node, "origin", None)
+            token = getattr(node, "token", None)
+            if origin is not None and token is not None:
+                return f"{origin.template_name}:{token.lineno}"
+        if app_line is None and code.co_filename.startswith(base_dir) and "site-packages" not in code.co_filename:
+            if not code.co_filename.endswith(("query_budget.py", "middleware.py", "perf.py")):
+                app_line = f"{Path(code.co_filename).relative_to(base_dir)}:{frame.f_lineno}"
+        frame = frame.f_back
+    return app_line or "?"
+
+
+class QueryCollector:
+    """
+    connection.execute_wrapper يجمع SQL + مصدره لطلب واحد (قد يُستدعى من عدة threads).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.by_sql = Counter()
+        self.origins = defaultdict(set)
+
+    def __call__(self, execute, sql, params, many, context):
+        if _exempt.get():
+            return execute(sql, params, many, context)
+        origin = _query_origin()
+        with self._lock:
+            self.count += 1
+            self.by_sql[sql] += 1
+            self.origins[sql].add(origin)
+        return execute(sql, params, many, context)
+
+    def duplicates(self, threshold: int):
+        return [
+            (sql, n, sorted(self.origins[sql]))
+            for sql, n in self.by_sql.most_common()
+            if n >= threshold
+        ]
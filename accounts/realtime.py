@@ -0,0 +1,189 @@
+# accounts/realtime.py
+"""
+Pub/sub داخل العملية لتحديثات الصفحات المباشرة (بدل إعادة تحميل الصفحة):
+
+- "message"   : رسالة ماستر جديدة  -> folder:<id> (+ user:<id> لرسائل المكتب)
+- "agreement" : تغيّر UserAgreement.status -> user:<id>
+
+المشتركون:
+- SSE (ASGI، mashromoahmecom/asgi.py): Hub.subscribe => async generator، لا thread لكل اتصال
+- poll (بدون EventSource أو SSE مغلق):
+    * ASGI: long-poll بـ Hub.wait_async (انتظار على asyncio.Event، لا thread)
+    * WSGI: Hub.since فورًا + poll قصير بتباطؤ تدريجي في المتصفح
+      (الانتظار تحت WSGI يحجز worker كاملًا لكل تبويب مفتوح)
+
+كل حدث يأخذ id متزايد ويُحفظ في backlog محدود (REALTIME["BACKLOG"]) =>
+إعادة الاتصال بـ Last-Event-ID / ?since= لا تفقد ما حدث أثناء الانقطاع.
+النشر بعد commit فقط (on_commit).
+
+ملاحظة: داخل العملية فقط — مع أكثر من worker يجب توجيه المستخدم لنفس الـ worker
+أو استبدال Hub بـ Redis pub/sub بنفس الواجهة.
+"""
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from .models import ClientMasterFolder, ClientMasterMessage, UserAgreement
+
+DEFAULTS = {
+    "BACKLOG": 1000,
+    "KEEPALIVE": 15,          # ثواني بين تعليقات ": ping" في SSE
+    "LONGPOLL_TIMEOUT": 25,   # ثواني (ASGI فقط)
+    "RETRY_MS": 3000,         # إعادة اتصال EventSource
+    "POLL_INTERVAL_MS": 3000,       # WSGI: أول فترة بين طلبات poll
+    "POLL_MAX_INTERVAL_MS": 30000,  # WSGI: أقصى فترة (تتضاعف بدون أحداث)
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "REALTIME", {})}
+
+
+class Hub:
+    def __init__(self, backlog: int = 1000):
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._events = deque(maxlen=backlog)  # (id, channel, event, data)
+        self._waiters = {}                     # asyncio.Event -> (loop, channels)
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, channel, event, data):
+        self.publish_many([(channel, event, data)])
+
+    def publish_many(self, items):
+        """
+        items = [(channel, event, data)] تحت قفل واحد (accounts/broadcast.py).
+        """
+        with self._cond:
+            channels = set()
+            for channel, event, data in items:
+                self._last_id = next(self._ids)
+                self._events.append((self._last_id, channel, event, data))
+                channels.add(channel)
+            waiters = [(loop, ev) for ev, (loop, chs) in self._waiters.items() if not chs.isdisjoint(channels)]
+            self._cond.notify_all()
+        for loop, ev in waiters:
+            loop.call_soon_threadsafe(ev.set)
+
+    def since(self, channels, last_id):
+        """
+        أحداث القنوات بعد last_id. id أكبر من الموجود (بعد إعادة تشغيل) => لا شيء.
+        """
+        with self._cond:
+            return self._since_locked(channels, last_id)
+
+    def _since_locked(self, channels, last_id):
+        if last_id is None or last_id > self._last_id:
+            return []
+        return [(i, event, data) for i, ch, event, data in self._events if i > last_id and ch in channels]
+
+    async def wait_async(self, channels, last_id, timeout):
+        """
+        long-poll (ASGI): يرجع فور وجود أحداث، أو قائمة فارغة بعد timeout.
+        """
+        ev = asyncio.Event()
+        channels = frozenset(channels)
+        with self._cond:
+            items = self._since_locked(channels, last_id)
+            if items:
+                return items
+            self._waiters[ev] = (asyncio.get_running_loop(), channels)
+        try:
+            try:
+                await asyncio.wait_for(ev.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return self.since(channels, last_id)
+        finally:
+            with self._cond:
+                self._waiters.pop(ev, None)
+
+    async def subscribe(self, channels, last_id, keepalive):
+        """
+        async generator: (id, event, data) لكل حدث، أو None كل keepalive ثانية بدون أحداث.
+        """
+        ev = asyncio.Event()
+        channels = frozenset(channels)
+        with self._cond:
+            self._waiters[ev] = (asyncio.get_running_loop(), channels)
+            if last_id is None or last_id > self._last_id:
+                last_id = self._last_id
+        try:
+            while True:
+                ev.clear()
+                items = self.since(channels, last_id)
+                if items:
+                    last_id = items[-1][0]
+                    for item in items:
+                        yield item
+                    continue
+                try:
+                    await asyncio.wait_for(ev.wait(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._cond:
+                self._waiters.pop(ev, None)
+
+
+hub = Hub(get_config()["BACKLOG"])
+
+
+def publish_on_commit(channel, event, data):
+    transaction.on_commit(lambda: hub.publish(channel, event, data))
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+def folder_channel(folder_id):
+    return f"folder:{folder_id}"
+
+
+# --------------------------------------------------
+# Signals
+# --------------------------------------------------
+@receiver(post_save, sender=ClientMasterMessage)
+def _on_message_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    data = {
+        "id": instance.pk,
+        "direction": instance.direction,
+        "message": instance.message,
+        "created_at": instance.created_at.isoformat(),
+    }
+    publish_on_commit(folder_channel(instance.folder_id), "message", data)
+    if instance.direction == "lawyer":
+        if ClientMasterMessage.folder.is_cached(instance):
+            user_id = instance.folder.user_id
+        else:
+            user_id = ClientMasterFolder.objects.filter(pk=instance.folder_id).values_list("user_id", flat=True).first()
+        publish_on_commit(user_channel(user_id), "message", data)
+
+
+@receiver(post_init, sender=UserAgreement)
+def _remember_agreement_status(sender, instance, **kwargs):
+    # .only()/.defer() بدون status => لا قيمة (لا استعلام إضافي)
+    instance._loaded_status = instance.__dict__.get("status")
+
+
+@receiver(post_save, sender=UserAgreement)
+def _on_agreement_saved(sender, instance, created, **kwargs):
+    status = instance.__dict__.get("status")
+    if status is None or (not created and status == getattr(instance, "_loaded_status", None)):
+        return
+    instance._loaded_status = status
+    publish_on_commit(user_channel(instance.user_id), "agreement", {"token": instance.token, "status": status})
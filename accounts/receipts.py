@@ -0,0 +1,231 @@
+# accounts/receipts.py
+"""
+معالجة صورة إيصال العميل عند الرفع (payment_page) مرة واحدة:
+
+- مصغّر JPEG صغير (client_receipt_thumb) لطابور مراجعة الدفع => الطابور لا ينزّل الصور الأصلية
+  ولا يعالج صورًا أثناء الطلب.
+- بصمة مرئية dHash (64 bit، receipt_image_hash): نفس الصورة بعد ضغط/تصغير/لقطة شاشة
+  => فرق بتات (Hamming) صغير.
+
+كشف الإيصال المكرر عند الإرسال (find_duplicate):
+- رقم الإيصال بعد التطبيع (receipt_code_normalized، مفهرس) => استعلام = واحد
+- البصمة => HashIndex داخل العملية (بدون مسح الجدول)
+
+السجلات القديمة: python manage.py build_receipt_thumbnails
+"""
+import threading
+from datetime import timedelta
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .query_budget import budget_exempt
+
+THUMB_SIZE = (320, 320)
+THUMB_QUALITY = 70
+
+HASH_BITS = 64
+# أقصى فرق بتات بين بصمتين لاعتبارهما نفس الإيصال
+HASH_MAX_DISTANCE = 6
+# تداخل نافذة التحديث: صفوف commit متأخر بوقت رفع أقدم من آخر صف محمّل
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+
+# --------------------------------------------------
+# الصورة
+# --------------------------------------------------
+def _dhash(img):
+    # 9x8 رمادي: كل بت = هل البكسل أفتح من جاره الأيمن
+    pixels = list(img.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left, right = pixels[row * 9 + col], pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def process_image(image_file):
+    """
+    (ContentFile JPEG للمصغّر، بصمة int) أو (None, None) لو الصورة غير قابلة للقراءة.
+    فك ترميز واحد للاثنين: البصمة من المصغّر.
+    """
+    try:
+        image_file.seek(0)
+        with Image.open(image_file) as img:
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail(THUMB_SIZE)
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            fingerprint = _dhash(img)
+            out = BytesIO()
+            img.save(out, format="JPEG", quality=THUMB_QUALITY, optimize=True)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None, None
+    finally:
+        image_file.seek(0)
+    return ContentFile(out.getvalue()), fingerprint
+
+
+def thumbnail_name(image_name):
+    return f"{PurePosixPath(image_name).stem}_thumb.jpg"
+
+
+def hash_to_hex(value):
+    return f"{value:016x}"
+
+
+def attach_receipt_image(agreement, image_file):
+    """
+    يحفظ المصغّر والبصمة على agreement (بدون agreement.save()).
+    """
+    thumb, fingerprint = process_image(image_file)
+    if thumb is None:
+        agreement.client_receipt_thumb = None
+        agreement.receipt_image_hash = None
+        return False
+    agreement.client_receipt_thumb.save(thumbnail_name(image_file.name), thumb, save=False)
+    agreement.receipt_image_hash = hash_to_hex(fingerprint)
+    return True
+
+
+# --------------------------------------------------
+# رقم الإيصال
+# --------------------------------------------------
+def normalize_receipt_code(code):
+    """
+    "rcpt-00 12" و "RCPT0012" نفس الرقم (security.validate_receipt_code يسمح بحروف/أرقام/شرطة).
+    """
+    if not code:
+        return None
+    return "".join(ch for ch in code.upper() if ch.isalnum()) or None
+
+
+# --------------------------------------------------
+# HashIndex: أقرب بصمة بفرق بتات <= HASH_MAX_DISTANCE
+# --------------------------------------------------
+def _chunks(bits, parts):
+    base, extra = divmod(bits, parts)
+    out, shift = [], 0
+    for i in range(parts):
+        width = base + (1 if i < extra else 0)
+        out.append((shift, (1 << width) - 1))
+        shift += width
+    return out
+
+
+class HashIndex:
+    """
+    Multi-index hashing: البصمة تُقسم إلى HASH_MAX_DISTANCE + 1 جزءًا، وجدول لكل جزء.
+    بصمتان بفرق <= HASH_MAX_DISTANCE بت تتطابقان تمامًا في جزء واحد على الأقل (مبدأ برج الحمام)
+    => البحث يفحص صفوف 7 خانات فقط (~N/512 لكل خانة) بدل N، ونتيجته كاملة (بلا تقريب).
+
+    يُبنى عند أول بحث من الجدول، ثم يُحدَّث بالصفوف المرفوعة بعد آخر تحميل
+    (client_receipt_image_uploaded_at مفهرس) => رفعات الـ workers الأخرى تظهر أيضًا.
+    رفع صورة جديدة لنفس الاتفاقية يستبدل بصمتها (_current) والمدخل القديم يُتجاهل.
+    """
+
+    def __init__(self, max_distance=HASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._parts = _chunks(HASH_BITS, max_distance + 1)
+        self._lock = threading.Lock()
+        self._tables = None
+        self._current = {}        # agreement_id -> بصمة
+        self._watermark = None    # أحدث client_receipt_image_uploaded_at محمّل
+
+    def __len__(self):
+        return len(self._current)
+
+    def _add_locked(self, agreement_id, fingerprint):
+        if self._current.get(agreement_id) == fingerprint:
+            return
+        self._current[agreement_id] = fingerprint
+        entry = (fingerprint, agreement_id)
+        for table, (shift, mask) in zip(self._tables, self._parts):
+            table.setdefault((fingerprint >> shift) & mask, []).append(entry)
+
+    def _load_locked(self, rows):
+        for agreement_id, value, uploaded_at in rows:
+            self._add_locked(agreement_id, int(value, 16))
+            if uploaded_at and (self._watermark is None or uploaded_at > self._watermark):
+                self._watermark = uploaded_at
+
+    def _sync_locked(self):
+        from .models import UserAgreement
+
+        rows = UserAgreement.objects.filter(receipt_image_hash__isnull=False)
+        if self._tables is None:
+            self._tables = [{} for _ in self._parts]
+            rows = rows.values_list("id", "receipt_image_hash", "client_receipt_image_uploaded_at")
+            # البناء مرة واحدة في العملية => خارج query budget للطلب الأول
+            with budget_exempt():
+                self._load_locked(rows.iterator(chunk_size=5000))
+        else:
+            if self._watermark is None:
+                rows = rows.filter(client_receipt_image_uploaded_at__isnull=False)
+            else:
+                rows = rows.filter(client_receipt_image_uploaded_at__gt=self._watermark - REFRESH_OVERLAP)
+            self._load_locked(rows.values_list("id", "receipt_image_hash", "client_receipt_image_uploaded_at"))
+
+    def add(self, agreement_id, fingerprint):
+        with self._lock:
+            if self._tables is not None:
+                self._add_locked(agreement_id, fingerprint)
+
+    def search(self, fingerprint, exclude_id=None):
+        """
+        [(فرق البتات، agreement_id)] مرتبة من الأقرب.
+        """
+        with self._lock:
+            self._sync_locked()
+            found = {}
+            for table, (shift, mask) in zip(self._tables, self._parts):
+                for value, agreement_id in table.get((fingerprint >> shift) & mask, ()):
+                    if agreement_id == exclude_id or agreement_id in found:
+                        continue
+                    if self._current.get(agreement_id) != value:
+                        continue
+                    distance = (value ^ fingerprint).bit_count()
+                    if distance <= self.max_distance:
+                        found[agreement_id] = distance
+        return sorted((distance, agreement_id) for agreement_id, distance in found.items())
+
+    def reset(self):
+        with self._lock:
+            self._tables = None
+            self._current = {}
+            self._watermark = None
+
+
+index = HashIndex()
+
+
+def find_duplicate(agreement):
+    """
+    (agreement_id سابق، "code" | "image") أو None. يُستدعى قبل حفظ الإيصال الجديد.
+    """
+    from .models import UserAgreement
+
+    if agreement.receipt_code_normalized:
+        other = (
+            UserAgreement.objects.filter(receipt_code_normalized=agreement.receipt_code_normalized)
+            .exclude(pk=agreement.pk)
+            .values_list("id", flat=True)
+            .first()
+        )
+        if other:
+            return other, "code"
+    if agreement.receipt_image_hash:
+        matches = index.search(int(agreement.receipt_image_hash, 16), exclude_id=agreement.pk)
+        if matches:
+            return matches[0][1], "image"
+    return None
+
+
+def index_on_commit(agreement):
+    if agreement.receipt_image_hash:
+        fingerprint = int(agreement.receipt_image_hash, 16)
+        transaction.on_commit(lambda: index.add(agreement.pk, fingerprint))
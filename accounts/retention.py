@@ -0,0 +1,281 @@
+# accounts/retention.py
+"""
+Retention لسجل AuditEvent:
+
+1) الصفوف الأقدم من RAW_DAYS (أو RAW_DAYS_BY_TYPE لنوع معين) تُكتب في أرشيف يومي
+   ARCHIVE_DIR/audit-YYYY-MM-DD.ndjson.z  (NDJSON مضغوط zlib، صف لكل سطر)
+2) تُجمع في AuditEventRollup (يوم / مستخدم / نوع / مسار => مجموع count)
+3) تُحذف على دفعات BATCH_SIZE؛ كل دفعة (تجميع + حذف) في transaction قصيرة
+   => لا قفل طويل على الجدول، والتشغيل المتكرر بعد انقطاع لا يكرر العد.
+
+rehydrate_window يعيد صفوف فترة من الأرشيف ويطرحها من التجميع
+(التجميع + الخام = العدد الحقيقي دائمًا).
+
+التشغيل: python manage.py prune_audit_events / rehydrate_audit_events
+"""
+import json
+import os
+import time
+import zlib
+from datetime import date, datetime, time as dtime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import interning
+from .audit import parse_legacy_meta, split_meta
+from .models import AuditEvent, AuditEventRollup, User
+
+DEFAULTS = {
+    "RAW_DAYS": 180,
+    "RAW_DAYS_BY_TYPE": {},
+    "ARCHIVE_DIR": None,
+    "BATCH_SIZE": 5000,
+    "BATCH_SLEEP": 0.05,
+}
+
+ARCHIVE_FIELDS = (
+    "id", "created_at", "event_type", "user_id", "path", "ip", "user_agent",
+    "meta", "case_number", "token", "folder_id", "error_code", "count", "last_seen_at",
+)
+# الأرشيف يحفظ النص نفسه (مستقل عن ids جداول القاموس)
+_ARCHIVE_LOOKUPS = tuple(
+    {"path": "path__value", "user_agent": "user_agent__value"}.get(f, f) for f in ARCHIVE_FIELDS
+)
+
+
+def get_config():
+    config = {**DEFAULTS, **getattr(settings, "AUDIT_RETENTION", {})}
+    config["ARCHIVE_DIR"] = Path(config["ARCHIVE_DIR"] or Path(settings.BASE_DIR) / "audit_archive")
+    return config
+
+
+def expired_q(config, now=None):
+    """
+    شرط الصفوف المنتهية: لكل نوع حد خاص، والباقي RAW_DAYS.
+    """
+    now = now or timezone.now()
+    by_type = config["RAW_DAYS_BY_TYPE"]
+    q = Q(created_at__lt=now - timedelta(days=config["RAW_DAYS"])) & ~Q(event_type__in=list(by_type))
+    for event_type, days in by_type.items():
+        q |= Q(event_type=event_type, created_at__lt=now - timedelta(days=days))
+    return q
+
+
+def _day_bounds(day):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(day, dtime.min), tz)
+    return start, start + timedelta(days=1)
+
+
+def archive_path(config, day):
+    return config["ARCHIVE_DIR"] / f"audit-{day.isoformat()}.ndjson.z"
+
+
+# --------------------------------------------------
+# Archive files (zlib NDJSON)
+# --------------------------------------------------
+def iter_archive(path):
+    """
+    يقرأ ملف الأرشيف بشكل streaming (بدون فك الملف كاملًا في الذاكرة).
+    """
+    decomp = zlib.decompressobj()
+    pending = b""
+    with open(path, "rb") as fh:
+        while True:
+            chunk = fh.read(1 << 16)
+            data = decomp.decompress(chunk) if chunk else decomp.flush()
+            pending += data
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if line:
+                    yield json.loads(line)
+            if not chunk:
+                break
+    if pending.strip():
+        yield json.loads(pending)
+
+
+def _row_json(row):
+    record = dict(zip(ARCHIVE_FIELDS, row))
+    record["created_at"] = record["created_at"].isoformat()
+    if record["last_seen_at"] is not None:
+        record["last_seen_at"] = record["last_seen_at"].isoformat()
+    return json.dumps(record, ensure_ascii=False, default=str).encode() + b"\n"
+
+
+def write_archive(config, day, qs):
+    """
+    يكتب صفوف اليوم في الأرشيف. لو الملف موجود (تشغيل سابق/rehydrate) يُدمج
+    بدون تكرار حسب id. الكتابة في ملف مؤقت ثم os.replace => لا ملف نصف مكتوب.
+    يرجع عدد الصفوف الجديدة.
+    """
+    path = archive_path(config, day)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+
+    comp = zlib.compressobj(level=6)
+    seen = set()
+    written = 0
+    with open(tmp, "wb") as out:
+        if path.exists():
+            for record in iter_archive(path):
+                seen.add(record["id"])
+                out.write(comp.compress(json.dumps(record, ensure_ascii=False).encode() + b"\n"))
+        rows = qs.order_by("id").values_list(*_ARCHIVE_LOOKUPS).iterator(chunk_size=config["BATCH_SIZE"])
+        for row in rows:
+            if row[0] in seen:
+                continue
+            out.write(comp.compress(_row_json(row)))
+            written += 1
+        out.write(comp.flush())
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, path)
+    return written
+
+
+# --------------------------------------------------
+# Rollups
+# --------------------------------------------------
+def _apply_rollup(day, groups, sign=1):
+    """
+    groups: {(user_id, event_type, path): n}. يحدّث/ينشئ صفوف التجميع دفعة واحدة.
+    """
+    if not groups:
+        return
+    existing = {
+        (r.user_id, r.event_type, r.path): r
+        for r in AuditEventRollup.objects.filter(
+            day=day, event_type__in={k[1] for k in groups},
+        )
+    }
+    to_update, to_create, to_delete = [], [], []
+    for key, n in groups.items():
+        row = existing.get(key)
+        if row is not None:
+            row.count = max(0, row.count + sign * n)
+            (to_update if row.count else to_delete).append(row)
+        elif sign > 0:
+            to_create.append(AuditEventRollup(day=day, user_id=key[0], event_type=key[1], path=key[2], count=n))
+    AuditEventRollup.objects.bulk_update(to_update, ["count"])
+    AuditEventRollup.objects.bulk_create(to_create)
+    if to_delete:
+        AuditEventRollup.objects.filter(pk__in=[r.pk for r in to_delete]).delete()
+
+
+def _count_groups(qs):
+    return {
+        (r["user_id"], r["event_type"], r["path__value"] or ""): r["n"]
+        for r in qs.order_by().values("user_id", "event_type", "path__value").annotate(n=Sum("count"))
+    }
+
+
+# --------------------------------------------------
+# Prune / Rehydrate
+# --------------------------------------------------
+def prune(config=None, *, dry_run=False, log=print):
+    """
+    أرشفة + تجميع + حذف لكل يوم منتهي (الأقدم أولًا). يرجع عدد الصفوف المحذوفة.
+    """
+    config = config or get_config()
+    expired = AuditEvent.objects.filter(expired_q(config))
+    days = expired.dates("created_at", "day", order="ASC")
+    total = 0
+
+    for day in days:
+        start, end = _day_bounds(day)
+        day_qs = expired.filter(created_at__gte=start, created_at__lt=end)
+        if dry_run:
+            n = day_qs.count()
+            log(f"{day}: {n} صف")
+            total += n
+            continue
+
+        archived = write_archive(config, day, day_qs)
+
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                ids = list(day_qs.order_by("id").values_list("id", flat=True)[: config["BATCH_SIZE"]])
+                if not ids:
+                    break
+                batch = AuditEvent.objects.filter(id__in=ids)
+                _apply_rollup(day, _count_groups(batch))
+                deleted += batch.delete()[0]
+            if config["BATCH_SLEEP"]:
+                time.sleep(config["BATCH_SLEEP"])
+
+        log(f"{day}: أرشفة {archived} / حذف {deleted}")
+        total += deleted
+
+    return total
+
+
+def rehydrate_window(start_day: date, end_day: date, config=None, *, log=print):
+    """
+    يعيد صفوف الأيام [start_day, end_day] من الأرشيف (نفس id) ويطرحها من التجميع.
+    ملف الأرشيف يبقى كما هو => prune لاحقًا لا يكرر شيئًا.
+    """
+    config = config or get_config()
+    user_ids = None
+    restored_total = 0
+
+    day = start_day
+    while day <= end_day:
+        path = archive_path(config, day)
+        if path.exists():
+            if user_ids is None:
+                user_ids = set(User.objects.values_list("id", flat=True))
+            start, end = _day_bounds(day)
+            present = set(
+                AuditEvent.objects.filter(created_at__gte=start, created_at__lt=end).values_list("id", flat=True)
+            )
+            restored = 0
+            batch, groups = [], {}
+            for record in iter_archive(path):
+                if record["id"] in present:
+                    continue
+                record["created_at"] = parse_datetime(record["created_at"])
+                if record.get("last_seen_at"):
+                    record["last_seen_at"] = parse_datetime(record["last_seen_at"])
+                if isinstance(record.get("meta"), str):  # أرشيف قبل JSON meta
+                    columns, record["meta"] = split_meta(parse_legacy_meta(record["event_type"], record["meta"]))
+                    record.update(columns)
+
+                # مفتاح التجميع بنفس قيم وقت الحذف
+                key = (record["user_id"], record["event_type"], record.get("path") or "")
+                groups[key] = groups.get(key, 0) + record.get("count", 1)
+
+                record["path_id"] = interning.paths.id_for(record.pop("path", ""))
+                record["user_agent_id"] = interning.user_agents.id_for(record.pop("user_agent", ""))
+                if record["user_id"] not in user_ids:
+                    record["user_id"] = None
+                batch.append(AuditEvent(**record))
+                if len(batch) >= config["BATCH_SIZE"]:
+                    restored += _restore_batch(day, batch, groups)
+                    batch, groups = [], {}
+            if batch:
+                restored += _restore_batch(day, batch, groups)
+            log(f"{day}: استرجاع {restored}")
+            restored_total += restored
+        day += timedelta(days=1)
+
+    return restored_total
+
+
+def _restore_batch(day, events, groups):
+    # auto_now_add يستبدل created_at الأصلي في bulk_create => نعيده بـ bulk_update
+    # (بدون تعديل الحقل المشترك بين الـ threads)
+    created = [event.created_at for event in events]
+    with transaction.atomic():
+        AuditEvent.objects.bulk_create(events)
+        for event, value in zip(events, created):
+            event.created_at = value
+        AuditEvent.objects.bulk_update(events, ["created_at"], batch_size=500)
+        _apply_rollup(day, groups, sign=-1)
+    return len(events)
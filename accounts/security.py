@@ -13,7 +13,21 @@ _RECEIPT_RE = re.compile(r"^[A-Za-z0-9\-]{3,64}$")
 
 # نص آمن عام: عربي/إنجليزي/أرقام/مسافات وبعض العلامات البسيطة (بدون < > { } ; ` إلخ)
 # يسمح بـ . , - _ : / ( ) ؟ ! " ' + @ #
-_SAFE_TEXT_RE = re.compile(r"^[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FFA-Za-z0-9\s\.\,\-\_\:\(\)\/\?\!\u061F\"\'\+\@\#]{1,}$")
+# ================================
+# Single-pass scanner
+# ================================
+# أنماط خطرة (نفس القائمة القديمة: < > { } ` ; /* */ <? ?> javascript: onerror onload)
+# <? و ?> مغطاة بـ < و >. الكلمات case-insensitive (ASCII فقط = نفس نتيجة lower()).
+_DANGEROUS_KEYWORDS = r"(?ai:javascript:|onerror|onload)"
+_DANGEROUS_RE = re.compile(r"[<>{}`;]|/\*|\*/|" + _DANGEROUS_KEYWORDS)
+
+# الـ whitelist بدون j/o (بداية الكلمات الخطرة) => تمر عليها حلقة charset سريعة،
+# و j/o تُقبل فقط إذا لم تبدأ كلمة خطرة. الـ match يتوقف عند أول رمز مرفوض.
+# (\s تشمل الأسطر الجديدة => نفس المسح يخدم النص العادي ومتعدد الأسطر)
+_SAFE_SCAN_RE = re.compile(
+    r"(?:[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FFA-IK-NP-Za-ik-np-z0-9\s\.\,\-\_\:\(\)\/\?\!\u061F\"\'\+\@\#]++"
+    r"|(?!" + _DANGEROUS_KEYWORDS + r")[jJoO])*+"
+)
 
 
 def _strip(v: str) -> str:
@@ -67,23 +81,37 @@ def validate_receipt_code(value: str, field_name: str = "receipt") -> str:
     return v
 
 
-def validate_safe_text(value: str, field_name: str, *, max_len: int = 500, min_len: int = 1) -> str:
-    v = _strip(value)
+def _scan_safe(v: str, field_name: str) -> None:
+    """
+    مسح واحد O(n): يتوقف عند أول رمز/نمط مرفوض.
+    نفس أولوية الرسائل القديمة: وجود نمط خطر في أي مكان => "محتوى غير مسموح"،
+    غير ذلك => "يحتوي رموز غير مسموحة".
+    """
+    stop = _SAFE_SCAN_RE.match(v).end()
+    if stop == len(v):
+        return
+    # كل ما قبل stop - 1 سليم (حتى "/" قبل "*")، فنكمل البحث من هناك فقط
+    if _DANGEROUS_RE.search(v, max(0, stop - 1)):
+        raise ValidationError(f"{field_name}: محتوى غير مسموح.")
+    raise ValidationError(f"{field_name}: يحتوي رموز غير مسموحة.")
+
+
+def _check_length(v: str, field_name: str, max_len: int, min_len: int) -> bool:
     if not v:
         if min_len <= 0:
-            return ""
+            return False
         raise ValidationError(f"{field_name} مطلوب.")
     if len(v) < min_len:
         raise ValidationError(f"{field_name} قصير جدًا.")
     if len(v) > max_len:
         raise ValidationError(f"{field_name} طويل جدًا.")
-    # رفض واضح لأخطر الرموز/الأنماط
-    dangerous = ["<", ">", "{", "}", "`", ";", "/*", "*/", "<?", "?>", "javascript:", "onerror", "onload"]
-    low = v.lower()
-    if any(d in low for d in dangerous):
-        raise ValidationError(f"{field_name}: محتوى غير مسموح.")
-    if not _SAFE_TEXT_RE.match(v):
-        raise ValidationError(f"{field_name}: يحتوي رموز غير مسموحة.")
+    return True
+
+
+def validate_safe_text(value: str, field_name: str, *, max_len: int = 500, min_len: int = 1) -> str:
+    v = _strip(value)
+    if _check_length(v, field_name, max_len, min_len):
+        _scan_safe(v, field_name)
     return v
 
 
@@ -92,26 +120,6 @@ def validate_safe_multiline(value: str, field_name: str, *, max_len: int = 3000,
     نص متعدد الأسطر: نفس whitelist لكن يسمح بالأسطر الجديدة.
     """
     v = (value or "").strip()
-    if not v:
-        if min_len <= 0:
-            return ""
-        raise ValidationError(f"{field_name} مطلوب.")
-    if len(v) < min_len:
-        raise ValidationError(f"{field_name} قصير جدًا.")
-    if len(v) > max_len:
-        raise ValidationError(f"{field_name} طويل جدًا.")
-
-    # نفس رفض الأنماط الخطرة
-    dangerous = ["<", ">", "{", "}", "`", ";", "/*", "*/", "<?", "?>", "javascript:", "onerror", "onload"]
-    low = v.lower()
-    if any(d in low for d in dangerous):
-        raise ValidationError(f"{field_name}: محتوى غير مسموح.")
-
-    # تحقق كل سطر على حدة
-    for line in v.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        if not _SAFE_TEXT_RE.match(line):
-            raise ValidationError(f"{field_name}: يحتوي رموز غير مسموحة.")
+    if _check_length(v, field_name, max_len, min_len):
+        _scan_safe(v, field_name)
     return v
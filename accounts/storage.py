@@ -0,0 +1,72 @@
+# accounts/storage.py
+import gzip
+import re
+
+from functools import lru_cache
+
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+
+try:  # اختياري: لو مكتبة brotli مثبتة ننتج نسخة .br أيضًا
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+# ملفات نصية تستفيد من الضغط المسبق
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".json", ".txt", ".map", ".html")
+
+# اسم يحتوي hash المحتوى مثل app.3f2a9c1b7d4e.css
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.[A-Za-z0-9]+$")
+
+# ناتج build_assets (غير موجود في git)
+BUILT_CSS = "css/app.css"
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Manifest storage (أسماء ملفات بـ hash المحتوى) + نسخ مضغوطة مسبقًا (.gz / .br)
+    حتى يقدّمها الخادم مباشرة بدون ضغط في كل طلب.
+    """
+
+    manifest_strict = False
+    min_compress_size = 512
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        for name in list(self.hashed_files.values()):
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            with self.open(name) as fh:
+                content = fh.read()
+            if len(content) < self.min_compress_size:
+                continue
+            self._save_compressed(name + ".gz", gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                self._save_compressed(name + ".br", brotli.compress(content))
+
+    def _save_compressed(self, name, data):
+        if self.exists(name):
+            self.delete(name)
+        self._save(name, ContentFile(data))
+
+    def url(self, name, force=False):
+        # قبل تشغيل collectstatic (بيئة التطوير / الاختبارات) لا يوجد manifest
+        # فنرجع للرابط العادي بدل رفع ValueError.
+        try:
+            return super().url(name, force=force)
+        except ValueError:
+            return self._url(lambda n: n, name, force)
+
+
+@lru_cache(maxsize=None)
+def built_css_available():
+    """
+    BUILT_CSS موجود في STATIC_ROOT (بعد collectstatic) أو STATICFILES_DIRS (بعد build_assets)؟
+    يُفحص مرة واحدة لكل عملية؛ False => القوالب تستخدم Tailwind CDN.
+    """
+    return bool(staticfiles_storage.exists(BUILT_CSS) or finders.find(BUILT_CSS))
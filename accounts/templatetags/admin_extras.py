@@ -0,0 +1,18 @@
+# accounts/templatetags/admin_extras.py
+from django import template
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+
+from accounts.admin_paging import indexed_date_hierarchy
+
+register = template.Library()
+
+
+@register.tag(name="indexed_date_hierarchy")
+def indexed_date_hierarchy_tag(parser, token):
+    return InclusionAdminNode(
+        parser,
+        token,
+        func=indexed_date_hierarchy,
+        template_name="date_hierarchy.html",
+        takes_context=False,
+    )
@@ -0,0 +1,36 @@
+# accounts/templatetags/assets.py
+"""
+{% app_stylesheet %}: CSS المبني (build_assets) إن وُجد، وإلا Tailwind CDN (نسخة مثبتة)
+بنفس theme الموجود في tailwind.config.js (assets/tailwind-theme.json)
+=> الصفحات منسقة قبل أول بناء أيضًا.
+"""
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from accounts.storage import BUILT_CSS, built_css_available
+
+register = template.Library()
+
+
+@lru_cache(maxsize=None)
+def _tailwind_theme():
+    path = Path(settings.BASE_DIR) / "assets" / "tailwind-theme.json"
+    return json.dumps(json.loads(path.read_text(encoding="utf-8")), ensure_ascii=False)
+
+
+@register.simple_tag
+def app_stylesheet():
+    if built_css_available():
+        return format_html('<link rel="stylesheet" href="{}">', static(BUILT_CSS))
+    return format_html(
+        '<script src="{}"></script>\n  <script>tailwind.config = {{theme: {{extend: {}}}}};</script>',
+        settings.TAILWIND_CDN_URL,
+        mark_safe(_tailwind_theme()),
+    )
@@ -0,0 +1,91 @@
+"""
+Migrations البيانات على AuditEvent بصفوف قديمة:
+0021 (meta نص => JSON + أعمدة مفهرسة) و0022 (path / user_agent => FK لجداول القاموس).
+
+migrate للخلف حتى 0020 => صفوف بالشكل القديم => للأمام => فحص => للخلف.
+TransactionTestCase: الـ migrations تغيّر الـ schema (لا تعمل داخل transaction الاختبار).
+"""
+import json
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+BEFORE = [("accounts", "0020_auditevent_count_last_seen_at")]
+AFTER = [("accounts", "0022_audit_interned_path_user_agent")]
+
+LONG_PATH = "/accounts/agreement/" + "x" * 400
+
+
+class AuditDataMigrationTests(TransactionTestCase):
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        apps = self.migrate(BEFORE)
+        AuditEvent = apps.get_model("accounts", "AuditEvent")
+
+        def event(event_type, meta, path="/accounts/dashboard/", user_agent="Mozilla/5.0"):
+            return AuditEvent.objects.create(event_type=event_type, meta=meta, path=path, user_agent=user_agent).pk
+
+        self.pairs = event("agreement_accept", "token: tok-1 case: C-77 receipt: R-9")
+        self.entity = event("view", "master_client_detail:42", path=LONG_PATH + "-a")
+        self.bad_folder = event("view", "folder: abc", path=LONG_PATH + "-b")
+        self.error = event("auth_failed", "bad_password: 3 attempts", user_agent="curl/8" + "z" * 400)
+        self.text = event("view", "فتح الصفحة الرئيسية")
+        self.empty = event("view", None, path="", user_agent="")
+
+    def tearDown(self):
+        # باقي الاختبارات تفترض آخر migration
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_forwards_and_backwards(self):
+        apps = self.migrate(AFTER)
+        AuditEvent = apps.get_model("accounts", "AuditEvent")
+        AuditPath = apps.get_model("accounts", "AuditPath")
+        events = {e.pk: e for e in AuditEvent.objects.select_related("path", "user_agent")}
+
+        pairs = events[self.pairs]
+        self.assertEqual((pairs.token, pairs.case_number), ("tok-1", "C-77"))
+        self.assertEqual(pairs.meta, {"receipt": "R-9"})
+
+        entity = events[self.entity]
+        self.assertEqual((entity.folder_id, entity.meta), (42, {"action": "master_client_detail"}))
+        # folder غير رقمي => يبقى في meta
+        self.assertIsNone(events[self.bad_folder].folder_id)
+        self.assertEqual(events[self.bad_folder].meta, {"folder": "abc"})
+
+        error = events[self.error]
+        self.assertEqual((error.error_code, error.meta), ("bad_password", {"detail": "3 attempts"}))
+        self.assertEqual(events[self.text].meta, {"text": "فتح الصفحة الرئيسية"})
+        self.assertIsNone(events[self.empty].meta)
+
+        # مسارات أطول من 300 بنفس أول 300 حرف => صف قاموس واحد مقصوص
+        self.assertEqual(entity.path_id, events[self.bad_folder].path_id)
+        self.assertEqual(entity.path.value, LONG_PATH[:300])
+        self.assertEqual(pairs.path.value, "/accounts/dashboard/")
+        self.assertEqual(pairs.path_id, events[self.text].path_id)
+        self.assertEqual(AuditPath.objects.count(), 2)
+        self.assertEqual(error.user_agent.value, ("curl/8" + "z" * 400)[:300])
+        self.assertEqual(pairs.user_agent.value, "Mozilla/5.0")
+        self.assertIsNone(events[self.empty].path_id)
+        self.assertIsNone(events[self.empty].user_agent_id)
+
+        apps = self.migrate(BEFORE)
+        AuditEvent = apps.get_model("accounts", "AuditEvent")
+        events = {e.pk: e for e in AuditEvent.objects.all()}
+
+        self.assertEqual(
+            json.loads(events[self.pairs].meta), {"receipt": "R-9", "token": "tok-1", "case_number": "C-77"}
+        )
+        self.assertEqual(json.loads(events[self.entity].meta), {"action": "master_client_detail", "folder_id": 42})
+        self.assertEqual(json.loads(events[self.error].meta), {"detail": "3 attempts", "error_code": "bad_password"})
+        self.assertIsNone(events[self.empty].meta)
+        self.assertEqual(events[self.entity].path, LONG_PATH[:300])
+        self.assertEqual(events[self.pairs].path, "/accounts/dashboard/")
+        self.assertEqual(events[self.pairs].user_agent, "Mozilla/5.0")
@@ -0,0 +1,305 @@
+"""
+كل مسار عليه query_budget (accounts/urls.py + client_send_message) بطلب عادي:
+QUERY_BUDGET_MODE = "raise" => أي تجاوز يفشل الاختبار بـ QueryBudgetExceeded.
+
+البيانات فيها عدة صفوف لكل قائمة حتى يظهر أي N+1 كتجاوز للحد.
+الحدود في urls.py = العدد المقاس هنا (داخل TestCase: SAVEPOINT/RELEASE بدل BEGIN/COMMIT).
+"""
+import io
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .models import (
+    AuditEvent,
+    Case,
+    CaseTimelineEvent,
+    ClientMasterFolder,
+    ClientMasterMessage,
+    User,
+    UserAgreement,
+    UserProfile,
+)
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def _receipt_image():
+    buf = io.BytesIO()
+    Image.new("RGB", (400, 300), (200, 30, 30)).save(buf, "JPEG")
+    return SimpleUploadedFile("receipt.jpg", buf.getvalue(), "image/jpeg")
+
+
+@override_settings(
+    QUERY_BUDGET_MODE="raise",
+    MEDIA_ROOT=MEDIA_ROOT,
+)
+class QueryBudgetRouteTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff1", "staff1@example.com", "pass12345", is_staff=True)
+        cls.client_user = User.objects.create_user(
+            "client1", "client1@example.com", "pass12345", is_client=True, account_status="active"
+        )
+        UserProfile.objects.create(user=cls.client_user, full_name="عميل", national_id="1234567890")
+        cls.folder = ClientMasterFolder.objects.create(user=cls.client_user)
+        for i in range(6):
+            ClientMasterMessage.objects.create(
+                folder=cls.folder,
+                sender=cls.client_user if i % 2 else cls.staff,
+                direction="client" if i % 2 else "lawyer",
+                message=f"رسالة {i}",
+            )
+
+        cls.case = Case.objects.create(
+            user=cls.client_user, case_number="CASE-1", case_type="civil", title="قضية", description="وصف القضية"
+        )
+        for i in range(3):
+            CaseTimelineEvent.objects.create(case=cls.case, title=f"مرحلة {i}", description="...")
+
+        def agreement(token, status, user=None, **extra):
+            return UserAgreement.objects.create(
+                user=user or cls.client_user, token=token, status=status, agreement_text="نص", **extra
+            )
+
+        cls.sent = agreement("tok-sent", "sent")
+        cls.pending = agreement("tok-pending", "payment_pending")
+        cls.review = agreement(
+            "tok-review", "under_review", client_payment_receipt="R-1", client_receipt_image=_receipt_image()
+        )
+        cls.paid = agreement("tok-paid", "paid")
+
+        # طابور مراجعة الدفع: عدة عملاء
+        cls.queue = []
+        for i in range(4):
+            other = User.objects.create_user(f"payer{i}", f"payer{i}@example.com", "pass12345", is_client=True)
+            cls.queue.append(agreement(f"tok-q{i}", "under_review", user=other, client_payment_receipt=f"Q-{i}"))
+
+        for i in range(5):
+            AuditEvent.objects.create(user=cls.client_user, event_type="view", meta={"action": f"a{i}"})
+
+    def setUp(self):
+        # طلب واحد لكل اختبار: المسار و User-Agent جديدان على interning (rollback بين الاختبارات)
+        # => استعلامات القاموس محسوبة: أسوأ حالة للطلب
+        self.client.defaults["HTTP_USER_AGENT"] = "Mozilla/5.0 (budget-tests)"
+
+    def login_client(self):
+        self.client.force_login(self.client_user)
+
+    def login_staff(self):
+        self.client.force_login(self.staff)
+
+    # ----------------------------------
+    # Auth
+    # ----------------------------------
+    def test_register_get(self):
+        self.assertEqual(self.client.get(reverse("register")).status_code, 200)
+
+    def test_register_post(self):
+        response = self.client.post(reverse("register"), {
+            "username": "newclient",
+            "email": "newclient@example.com",
+            "phone_number": "0551234567",
+            "password1": "pass12345",
+            "password2": "pass12345",
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(User.objects.filter(username="newclient").exists())
+
+    def test_login_get(self):
+        self.assertEqual(self.client.get(reverse("login")).status_code, 200)
+
+    def test_login_post(self):
+        response = self.client.post(reverse("login"), {"username": "client1", "password": "pass12345"})
+        self.assertEqual(response.status_code, 302)
+
+    def test_login_post_provisions_client(self):
+        # حساب من admin/shell بدون ملف عميل: أول دخول ينشئ الملفين (_provision_client)
+        User.objects.create_user("bare1", "bare1@example.com", "pass12345", is_client=True)
+        response = self.client.post(reverse("login"), {"username": "bare1", "password": "pass12345"})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(ClientMasterFolder.objects.filter(user__username="bare1").exists())
+
+    def test_login_failure(self):
+        response = self.client.post(reverse("login"), {"username": "client1", "password": "wrong-password"})
+        self.assertEqual(response.status_code, 302)
+
+    def test_logout(self):
+        self.login_client()
+        self.assertEqual(self.client.post(reverse("logout")).status_code, 302)
+
+    # ----------------------------------
+    # User area
+    # ----------------------------------
+    def test_dashboard(self):
+        self.login_client()
+        self.assertEqual(self.client.get(reverse("user_dashboard")).status_code, 200)
+
+    def test_client_message_thread(self):
+        self.login_client()
+        self.assertEqual(self.client.get(reverse("client_message_thread")).status_code, 200)
+
+    def test_client_mark_messages_read(self):
+        self.login_client()
+        last = self.folder.messages.order_by("-id").first()
+        response = self.client.post(reverse("client_mark_messages_read"), {"up_to": last.id})
+        self.assertEqual(response.json()["updated"], 3)
+
+    def test_client_send_message(self):
+        self.login_client()
+        response = self.client.post(reverse("client_send_message"), {"message": "سؤال عن القضية"})
+        self.assertEqual(response.status_code, 302)
+
+    def test_events_stream(self):
+        self.login_client()
+        self.assertEqual(self.client.get(reverse("events_stream")).status_code, 204)  # WSGI
+
+    def test_events_poll(self):
+        self.login_client()
+        self.assertEqual(self.client.get(reverse("events_poll")).status_code, 200)
+
+    def test_profile_get(self):
+        self.login_client()
+        self.assertEqual(self.client.get(reverse("profile_update")).status_code, 200)
+
+    def test_profile_post(self):
+        self.login_client()
+        response = self.client.post(reverse("profile_update"), {
+            "full_name": "عميل جديد",
+            "national_id": "1234567890",
+            "address": "الرياض",
+        })
+        self.assertEqual(response.status_code, 302)
+
+    def test_case_create_get(self):
+        self.login_client()
+        self.assertEqual(self.client.get(reverse("case_create")).status_code, 200)
+
+    def test_case_create_post(self):
+        self.login_client()
+        response = self.client.post(reverse("case_create"), {
+            "title": "قضية عمالية",
+            "description": "تفاصيل القضية",
+            "case_type": "labor",
+        })
+        self.assertEqual(response.status_code, 302)
+
+    def test_case_timeline(self):
+        self.login_client()
+        self.assertEqual(self.client.get(reverse("case_timeline_view", args=[self.case.id])).status_code, 200)
+
+    def test_account_suspended(self):
+        self.login_client()
+        self.assertEqual(self.client.get(reverse("account_suspended")).status_code, 200)
+
+    # ----------------------------------
+    # Agreements / payments
+    # ----------------------------------
+    def test_agreement_get(self):
+        self.login_client()
+        self.assertEqual(self.client.get(reverse("agreement_view", args=[self.sent.token])).status_code, 200)
+
+    def test_agreement_post(self):
+        self.login_client()
+        response = self.client.post(reverse("agreement_view", args=[self.sent.token]), {"accept_checkbox": "on"})
+        self.assertRedirects(response, reverse("payment_page", args=[self.sent.token]), fetch_redirect_response=False)
+
+    def test_payment_page_get(self):
+        self.login_client()
+        self.assertEqual(self.client.get(reverse("payment_page", args=[self.pending.token])).status_code, 200)
+
+    def test_payment_page_post(self):
+        self.login_client()
+        response = self.client.post(
+            reverse("payment_page", args=[self.pending.token]),
+            {"client_payment_receipt": "RCPT-77", "client_receipt_image": _receipt_image()},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.pending.refresh_from_db()
+        self.assertEqual(self.pending.status, "under_review")
+
+    def test_payment_pending_review(self):
+        self.login_client()
+        self.assertEqual(self.client.get(reverse("payment_pending_review", args=[self.review.token])).status_code, 200)
+
+    def test_payment_success(self):
+        self.login_client()
+        self.assertEqual(self.client.get(reverse("payment_success", args=[self.paid.token])).status_code, 200)
+
+    # ----------------------------------
+    # Master
+    # ----------------------------------
+    def test_master_clients_list(self):
+        self.login_staff()
+        self.assertEqual(self.client.get(reverse("master_clients_list")).status_code, 200)
+
+    def test_master_client_detail(self):
+        self.login_staff()
+        self.assertEqual(self.client.get(reverse("master_client_detail", args=[self.folder.id])).status_code, 200)
+
+    def test_master_message_thread(self):
+        self.login_staff()
+        self.assertEqual(self.client.get(reverse("master_message_thread", args=[self.folder.id])).status_code, 200)
+
+    def test_master_mark_messages_read(self):
+        self.login_staff()
+        last = self.folder.messages.order_by("-id").first()
+        response = self.client.post(reverse("master_mark_messages_read", args=[self.folder.id]), {"up_to": last.id})
+        self.assertEqual(response.json()["updated"], 3)
+
+    def test_master_send_message(self):
+        self.login_staff()
+        response = self.client.post(reverse("master_send_message", args=[self.folder.id]), {"message": "تم الاستلام"})
+        self.assertEqual(response.status_code, 302)
+
+    def test_master_broadcast_get(self):
+        self.login_staff()
+        self.assertEqual(self.client.get(reverse("master_broadcast"), {"audience": "all"}).status_code, 200)
+
+    def test_master_broadcast_post(self):
+        self.login_staff()
+        response = self.client.post(reverse("master_broadcast"), {"audience": "all", "message": "تنبيه عام"})
+        self.assertEqual(response.status_code, 302)
+
+    def test_master_events_dashboard(self):
+        self.login_staff()
+        self.assertEqual(self.client.get(reverse("master_events_dashboard")).status_code, 200)
+
+    def test_master_events_export(self):
+        self.login_staff()
+        response = self.client.get(reverse("master_events_export"))
+        self.assertEqual(response.status_code, 200)
+        b"".join(response.streaming_content)
+
+    def test_master_perf_dashboard(self):
+        self.login_staff()
+        self.assertEqual(self.client.get(reverse("master_perf_dashboard")).status_code, 200)
+
+    def test_master_payments_queue(self):
+        self.login_staff()
+        self.assertEqual(self.client.get(reverse("master_payments_queue")).status_code, 200)
+
+    def test_master_payment_approve(self):
+        self.login_staff()
+        response = self.client.post(reverse("master_payment_approve", args=[self.queue[0].id]))
+        self.assertEqual(response.json()["updated"], 1)
+
+    def test_master_payment_reject(self):
+        self.login_staff()
+        response = self.client.post(reverse("master_payment_reject", args=[self.queue[1].id]))
+        self.assertEqual(response.json()["updated"], 1)
+
+    def test_master_payments_export(self):
+        self.login_staff()
+        response = self.client.get(reverse("master_payments_export"))
+        self.assertEqual(response.status_code, 200)
+        b"".join(response.streaming_content)
@@ -1,3 +1,1014 @@
-from django.test import TestCase
+import datetime
+import io
+import random
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+from PIL import Image
+
+from . import admin_paging, audit, badges, broadcast, interning, messaging, payments, realtime, receipts, retention, throttle, views
+from .admin import SentimentSnapshotAdmin
+from .checks import built_assets_check, coalesce_cache_check
+from .middleware import SecurityHeadersMiddleware
+from .models import (
+    AuditEvent, AuditEventRollup, ClientMasterFolder, ClientMasterMessage, SentimentSnapshot, User, UserAgreement,
+)
+from .security import validate_safe_multiline, validate_safe_text
+from .storage import built_css_available
+
+
+# --------------------------------------------------
+# ✅ رسائل المكتب (accounts/messaging.py)
+# --------------------------------------------------
+@override_settings(QUERY_BUDGET_MODE="raise")
+class MasterSendMessageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff1", "staff1@example.com", "pass12345", is_staff=True)
+        cls.client_user = User.objects.create_user("client1", "client1@example.com", "pass12345", is_client=True)
+        cls.folder = ClientMasterFolder.objects.create(user=cls.client_user)
+
+    def test_reply_within_query_budget(self):
+        self.client.force_login(self.staff)
+        url = reverse("master_send_message", args=[self.folder.id])
+
+        # QueryBudgetExceeded يُرفع من الـ middleware لو تجاوز الحد
+        response = self.client.post(url, {"message": "تم استلام مستنداتك"})
+
+        self.assertRedirects(response, reverse("master_client_detail", args=[self.folder.id]), fetch_redirect_response=False)
+        self.folder.refresh_from_db()
+        self.assertEqual(self.folder.unread_from_lawyer, 1)
+        self.assertEqual(self.folder.messages.count(), 1)
+
+
+# --------------------------------------------------
+# ✅ شارات الهيدر (accounts/badges.py)
+# --------------------------------------------------
+class StaffBadgeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff1", "staff1@example.com", "pass12345", is_staff=True)
+        cls.folders = [
+            ClientMasterFolder.objects.create(
+                user=User.objects.create_user(f"client{i}", f"client{i}@example.com", "pass12345", is_client=True),
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unread_from_clients_summed_and_invalidated(self):
+        self.assertEqual(badges.badge_counts(self.staff)["unread_messages"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for folder in self.folders[:2]:
+                messaging.send_message(folder, folder.user, "client", "سؤال")
+            messaging.send_message(self.folders[0], self.folders[0].user, "client", "سؤال آخر")
+        self.assertEqual(badges.badge_counts(self.staff)["unread_messages"], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            messaging.mark_read(self.folders[0], "client", self.folders[0].messages.latest("id").pk)
+        self.assertEqual(badges.badge_counts(self.staff)["unread_messages"], 1)
+
+    def test_unread_sum_uses_partial_index(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("خطة الاستعلام بصيغة SQLite")
+        plan = ClientMasterFolder.objects.filter(unread_from_client__gt=0).explain()
+        self.assertIn("folder_unread_client_idx", plan)
+
+
+# --------------------------------------------------
+# ✅ رسالة جماعية (accounts/broadcast.py)
+# --------------------------------------------------
+class BroadcastTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff1", "staff1@example.com", "pass12345", is_staff=True)
+        cls.folders = [
+            ClientMasterFolder.objects.create(
+                user=User.objects.create_user(f"client{i}", f"client{i}@example.com", "pass12345", is_client=True),
+            )
+            for i in range(5)
+        ]
+        cls.outsider = ClientMasterFolder.objects.create(
+            user=User.objects.create_user("outsider", "outsider@example.com", "pass12345", is_client=True),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def send(self, body="موعد الجلسة تم تأكيده"):
+        folders = ClientMasterFolder.objects.filter(pk__in=[f.pk for f in self.folders])
+        with self.captureOnCommitCallbacks(execute=True):
+            return broadcast.send_broadcast(self.staff, body, folders)
+
+    def test_batches_cover_every_folder_once(self):
+        with mock.patch.object(broadcast, "BATCH_SIZE", 2), \
+                mock.patch.object(broadcast, "_send_batch", wraps=broadcast._send_batch) as send_batch:
+            self.assertEqual(self.send(), 5)
+
+        self.assertEqual([len(c.args[2]) for c in send_batch.call_args_list], [2, 2, 1])
+        counts = dict(
+            ClientMasterMessage.objects.values_list("folder_id").annotate(n=Count("id")).values_list("folder_id", "n")
+        )
+        self.assertEqual(counts, {f.pk: 1 for f in self.folders})
+
+    def test_counters_match_send_message(self):
+        waiting = self.folders[0]
+        messaging.send_message(waiting, waiting.user, "client", "عندي سؤال")
+        single = messaging.send_message(self.outsider, self.staff, "lawyer", "رد فردي")
+
+        self.send()
+
+        waiting.refresh_from_db()
+        self.outsider.refresh_from_db()
+        msg = waiting.messages.get(direction="lawyer")
+        # نفس تغييرات send_message لرسالة من المكتب
+        self.assertEqual(self.outsider.last_lawyer_message_at, single.created_at)
+        self.assertEqual(waiting.last_lawyer_message_at, msg.created_at)
+        self.assertEqual(waiting.unread_from_lawyer, 1)
+        self.assertEqual(waiting.unread_from_client, 1)
+        self.assertIsNone(waiting.awaiting_reply_since)
+        # وقت دفعة واحد لكل الرسائل
+        batch = ClientMasterMessage.objects.filter(sender=self.staff).exclude(pk=single.pk)
+        self.assertEqual(set(batch.values_list("created_at", flat=True)), {msg.created_at})
+
+    def test_invalidates_recipient_badges_only(self):
+        keys = [badges.client_key(f.user_id) for f in self.folders]
+        untouched = [badges.client_key(self.outsider.user_id), badges.STAFF_KEY]
+        cache.set_many({key: {"unread_messages": 0} for key in keys + untouched})
+
+        self.send()
+
+        self.assertEqual(cache.get_many(keys), {})
+        self.assertEqual(set(cache.get_many(untouched)), set(untouched))
+
+    def test_publishes_on_user_and_folder_channels(self):
+        since = realtime.hub.last_id
+        self.send("تحديث")
+
+        for folder in self.folders:
+            channels = [realtime.user_channel(folder.user_id), realtime.folder_channel(folder.pk)]
+            events = realtime.hub.since(channels, since)
+            self.assertEqual(len(events), 2)
+            self.assertEqual({(e, d["message"], d["direction"]) for _, e, d in events}, {("message", "تحديث", "lawyer")})
+        outsider = [realtime.user_channel(self.outsider.user_id), realtime.folder_channel(self.outsider.pk)]
+        self.assertEqual(realtime.hub.since(outsider, since), [])
+
+    def test_one_sentiment_snapshot_per_broadcast(self):
+        with mock.patch.object(broadcast, "BATCH_SIZE", 2):
+            self.send()
+
+        snapshot = SentimentSnapshot.objects.get()
+        self.assertEqual((snapshot.user, snapshot.target, snapshot.case), (self.staff, "lawyer", None))
+
+
+# --------------------------------------------------
+# ✅ Live events poll (accounts/realtime.py)
+# --------------------------------------------------
+class EventsPollTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user("client1", "client1@example.com", "pass12345", is_client=True)
+
+    def test_wsgi_poll_returns_without_waiting(self):
+        self.client.force_login(self.client_user)
+        realtime.hub.publish(realtime.user_channel(self.client_user.pk), "agreement", {"status": "paid"})
+        since = realtime.hub.last_id
+
+        # لا أحداث جديدة: تحت WSGI يرجع فورًا (بدون LONGPOLL_TIMEOUT) مع فترة الانتظار للمتصفح
+        response = self.client.get(reverse("events_poll"), {"since": since})
+        data = response.json()
+        self.assertEqual(data["events"], [])
+        self.assertEqual(data["last_id"], since)
+        self.assertGreater(data["retry_ms"], 0)
+
+        response = self.client.get(reverse("events_poll"), {"since": since - 1})
+        self.assertEqual([e["data"] for e in response.json()["events"]], [{"status": "paid"}])
+
+
+# --------------------------------------------------
+# ✅ Login lockout (accounts/throttle.py)
+# --------------------------------------------------
+@override_settings(
+    LOGIN_THROTTLE={"CACHE": "default", "IP_USER_THRESHOLD": 3, "BASE_SECONDS": 30, "MAX_SECONDS": 100},
+)
+class LoginLockoutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user("client1", "client1@example.com", "pass12345", is_client=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def fail_login(self, ip="10.0.0.1"):
+        return self.client.post(reverse("login"), {"username": "client1", "password": "wrong"}, REMOTE_ADDR=ip)
+
+    def test_locks_at_threshold(self):
+        for _ in range(2):
+            self.assertEqual(self.fail_login().status_code, 302)
+        self.assertEqual(throttle.lockout_remaining("10.0.0.1", "client1"), 0)
+
+        self.fail_login()
+        self.assertAlmostEqual(throttle.lockout_remaining("10.0.0.1", "client1"), 30, delta=1)
+
+        # حتى كلمة المرور الصحيحة مرفوضة قبل authenticate
+        response = self.client.post(
+            reverse("login"), {"username": "client1", "password": "pass12345"}, REMOTE_ADDR="10.0.0.1"
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), 0)
+
+    def test_backoff_doubles_up_to_max(self):
+        for failures, expected in ((3, 30), (4, 60), (5, 100), (6, 100)):
+            while cache.get("login:ipuser:10.0.0.1:client1:fail", 0) < failures:
+                throttle.register_login_failure("10.0.0.1", "client1")
+            self.assertAlmostEqual(throttle.lockout_remaining("10.0.0.1", "client1"), expected, delta=1)
+
+    def test_other_ip_not_locked(self):
+        for _ in range(3):
+            self.fail_login()
+        response = self.client.post(
+            reverse("login"), {"username": "client1", "password": "pass12345"}, REMOTE_ADDR="10.0.0.2"
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(int(self.client.session["_auth_user_id"]), self.client_user.pk)
+
+    def test_success_clears_failures(self):
+        for _ in range(2):
+            self.fail_login()
+        self.client.post(reverse("login"), {"username": "client1", "password": "pass12345"}, REMOTE_ADDR="10.0.0.1")
+        self.client.logout()
+        for _ in range(2):
+            self.fail_login()
+        self.assertEqual(throttle.lockout_remaining("10.0.0.1", "client1"), 0)
+
+
+class ClientIpTests(SimpleTestCase):
+    def request(self, xff):
+        return RequestFactory().get("/", REMOTE_ADDR="10.0.0.9", HTTP_X_FORWARDED_FOR=xff)
+
+    def test_forwarded_for_ignored_without_proxy(self):
+        self.assertEqual(throttle.client_ip(self.request("1.2.3.4")), "10.0.0.9")
+
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_address_added_by_trusted_proxy(self):
+        # العميل يرسل "1.2.3.4" والـ proxy يضيف عنوانه الفعلي في آخر القائمة
+        self.assertEqual(throttle.client_ip(self.request("1.2.3.4, 203.0.113.7")), "203.0.113.7")
+
+    @override_settings(TRUSTED_PROXY_COUNT=2)
+    def test_short_header_falls_back_to_remote_addr(self):
+        self.assertEqual(throttle.client_ip(self.request("203.0.113.7")), "10.0.0.9")
+
+
+# --------------------------------------------------
+# ✅ Audit: كتابة مؤجلة لطلبات GET (accounts/audit.py)
+# --------------------------------------------------
+@override_settings(AUDIT_DEFERRED={"ENABLED": True, "FLUSH_INTERVAL": 60, "MAX_BUFFER": 500})
+class DeferredAuditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user("client1", "client1@example.com", "pass12345", is_client=True)
+
+    def setUp(self):
+        patcher = mock.patch.object(audit.deferred_writer, "add")
+        self.deferred = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_logout_recorded_immediately(self):
+        self.client.force_login(self.client_user)
+        self.client.get(reverse("logout"))
+
+        self.assertTrue(AuditEvent.objects.filter(event_type="auth_logout", user=self.client_user).exists())
+        self.assertNotIn("auth_logout", [c.args[0]["event_type"] for c in self.deferred.call_args_list])
+
+    def test_view_event_deferred(self):
+        self.client.force_login(self.client_user)
+        self.client.get(reverse("user_dashboard"))
+
+        self.assertIn("view", [c.args[0]["event_type"] for c in self.deferred.call_args_list])
+        self.assertFalse(AuditEvent.objects.filter(event_type="view").exists())
+
+
+@override_settings(AUDIT_EVENT_POLICIES={"view": {"mode": "coalesce", "window": 300, "flush_every": 20}})
+class CoalesceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user("client1", "client1@example.com", "pass12345", is_client=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def view(self):
+        return audit.record(user=self.client_user, event_type="view", path="/accounts/dashboard/", meta={"action": "d"})
+
+    def test_repeats_counted_on_one_row(self):
+        first = self.view()
+        for _ in range(44):
+            self.assertIsNone(self.view())
+
+        # دفعتان (20 + 20) أُضيفتا، و4 ما زالت في الـ cache
+        first.refresh_from_db()
+        self.assertEqual(first.count, 41)
+        self.assertEqual(AuditEvent.objects.filter(event_type="view").count(), 1)
+
+        # نافذة جديدة => الباقي يُضاف للصف السابق قبل إنشاء صف جديد
+        cache.delete(audit._coalesce_key(audit._prepare({
+            "user": self.client_user, "event_type": "view", "path": "/accounts/dashboard/", "meta": {"action": "d"},
+        })) + ":open")
+        second = self.view()
+        self.assertNotEqual(second.pk, first.pk)
+        first.refresh_from_db()
+        self.assertEqual(first.count, 45)
+
+    @override_settings(AUDIT_EVENT_POLICIES={"data_export": {"mode": "sample", "rate": 0.0}})
+    def test_exports_always_recorded(self):
+        staff = User.objects.create_user("staff1", "staff1@example.com", "pass12345", is_staff=True)
+        self.client.force_login(staff)
+        for name in ("master_events_export", "master_payments_export"):
+            b"".join(self.client.get(reverse(name)).streaming_content)
+
+        actions = set(AuditEvent.objects.filter(event_type="data_export").values_list("meta__action", flat=True))
+        self.assertEqual(actions, {"master_events_export", "master_payments_export"})
+
+    def test_deploy_check_warns_on_process_local_cache(self):
+        # LocMemCache (settings الافتراضي) => نافذة لكل worker
+        self.assertEqual([w.id for w in coalesce_cache_check(None)], ["accounts.W002"])
+
+        shared = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "/tmp/x"}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(coalesce_cache_check(None), [])
+        with override_settings(AUDIT_EVENT_POLICIES={}):
+            self.assertEqual(coalesce_cache_check(None), [])
+
+
+# --------------------------------------------------
+# ✅ Audit retention (accounts/retention.py)
+# --------------------------------------------------
+class RetentionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user("client1", "client1@example.com", "pass12345", is_client=True)
+        old = timezone.now() - timedelta(days=40)
+        for i, (event_type, meta) in enumerate((
+            ("view", {"action": "user_dashboard"}),
+            ("view", {"action": "user_dashboard"}),
+            ("agreement_accept", {"token": "tok-1", "receipt": "R-1"}),
+            ("security_block", {"error_code": "signature_invalid", "detail": "x"}),
+        )):
+            event = audit.record(
+                user=cls.client_user, event_type=event_type, path=f"/accounts/p{i % 2}/",
+                ip="10.0.0.1", user_agent="Mozilla/5.0", meta=meta,
+            )
+            # created_at = auto_now_add
+            AuditEvent.objects.filter(pk=event.pk).update(created_at=old + timedelta(minutes=i), count=i + 1)
+        audit.record(user=cls.client_user, event_type="view", path="/accounts/recent/", meta={"action": "recent"})
+
+    def setUp(self):
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir, ignore_errors=True)
+        self.config = {**retention.get_config(), "ARCHIVE_DIR": Path(archive_dir), "RAW_DAYS": 30,
+                       "RAW_DAYS_BY_TYPE": {}, "BATCH_SIZE": 3, "BATCH_SLEEP": 0}
+
+    def snapshot(self):
+        return sorted(AuditEvent.objects.values_list(*retention._ARCHIVE_LOOKUPS))
+
+    def test_prune_then_rehydrate_restores_rows(self):
+        before = self.snapshot()
+        day = timezone.localdate(AuditEvent.objects.order_by("created_at").first().created_at)
+
+        self.assertEqual(retention.prune(self.config, log=lambda msg: None), 4)
+        self.assertEqual(AuditEvent.objects.count(), 1)
+        self.assertEqual(sum(AuditEventRollup.objects.filter(day=day).values_list("count", flat=True)), 1 + 2 + 3 + 4)
+
+        restored = retention.rehydrate_window(day, day, self.config, log=lambda msg: None)
+        self.assertEqual(restored, 4)
+        # نفس id و created_at الأصلي (لا auto_now_add) ونفس باقي الحقول
+        self.assertEqual(self.snapshot(), before)
+        self.assertFalse(AuditEventRollup.objects.filter(day=day).exists())
+        self.assertTrue(AuditEvent._meta.get_field("created_at").auto_now_add)
+
+
+# --------------------------------------------------
+# ✅ CSS مبني أو Tailwind CDN (accounts/storage.py + templatetags/assets.py)
+# --------------------------------------------------
+class StylesheetTests(SimpleTestCase):
+    def setUp(self):
+        self.static_dir = Path(tempfile.mkdtemp())
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_dir, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.static_root, ignore_errors=True)
+        overrides = self.settings(STATICFILES_DIRS=[self.static_dir], STATIC_ROOT=self.static_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        built_css_available.cache_clear()
+        self.addCleanup(built_css_available.cache_clear)
+
+    def collect(self):
+        call_command("collectstatic", interactive=False, verbosity=0, stderr=io.StringIO())
+        built_css_available.cache_clear()
+
+    def csp(self):
+        response = SecurityHeadersMiddleware(lambda r: HttpResponse()).process_response(
+            RequestFactory().get("/"), HttpResponse()
+        )
+        return response["Content-Security-Policy"]
+
+    def test_cdn_fallback_before_build(self):
+        self.collect()  # بدون CSS مبني: لا يفشل
+        html = Template("{% load assets %}{% app_stylesheet %}").render(Context())
+        self.assertIn(f'<script src="{settings.TAILWIND_CDN_URL}">', html)
+        self.assertIn('"gold": "#D4AF37"', html)
+        self.assertIn("https://cdn.tailwindcss.com", self.csp())
+        self.assertEqual([w.id for w in built_assets_check(None)], ["accounts.W001"])
+
+    def test_built_css_collected_and_linked(self):
+        (self.static_dir / "css").mkdir()
+        (self.static_dir / "css" / "app.css").write_text("body{margin:0}")
+        self.collect()
+
+        hashed = [p.name for p in Path(self.static_root, "css").glob("app.*.css")]
+        self.assertEqual(len(hashed), 1)
+        html = Template("{% load assets %}{% app_stylesheet %}").render(Context())
+        self.assertEqual(html, f'<link rel="stylesheet" href="/static/css/{hashed[0]}">')
+        self.assertNotIn("cdn.tailwindcss.com", self.csp())
+        self.assertEqual(built_assets_check(None), [])
+
+
+# --------------------------------------------------
+# ✅ Validators: مسح واحد بزمن خطي (accounts/security.py)
+# --------------------------------------------------
+class SafeTextValidatorTests(SimpleTestCase):
+    def assertRejected(self, value, message):
+        with self.assertRaisesMessage(ValidationError, message):
+            validate_safe_multiline(value, "نص", max_len=10**6)
+
+    def test_accepts_arabic_english_and_jo_words(self):
+        text = "تم رفع القضية (رقم 12) يوم الأحد؟ John joined online: ok! @office #1 + 'quoted'"
+        self.assertEqual(validate_safe_text(text, "نص"), text)
+        self.assertEqual(validate_safe_multiline("سطر أول\nJohn\noO jJ", "نص"), "سطر أول\nJohn\noO jJ")
+
+    def test_rejects_dangerous_patterns(self):
+        for value in ("<b>", "a > b", "{x}", "`x`", "a; b", "/* c */", "c */", "JavaScript:alert(1)",
+                      "img ONERROR=x", "body onload", "ononerror", "jjavascript:"):
+            with self.subTest(value=value):
+                self.assertRejected(value, "محتوى غير مسموح")
+
+    def test_disallowed_symbol_message(self):
+        self.assertRejected("price $5", "يحتوي رموز غير مسموحة")
+        # نمط خطر بعد الرمز المرفوض => رسالة المحتوى (نفس أولوية النسخة القديمة)
+        self.assertRejected("price $5 <script>", "محتوى غير مسموح")
+
+    def test_pathological_inputs_run_in_linear_time(self):
+        n = 200_000
+        cases = {
+            "j": "j" * n,
+            "o": "o" * n,
+            "on": "on" * (n // 2),
+            "javascript": "javascript" * (n // 10),
+            "slashes": "/" * n,
+            "tail_symbol": "ا" * n + "$",
+            "tail_danger": "o" * n + "onerror",
+        }
+        for name, value in cases.items():
+            with self.subTest(name=name):
+                t0 = time.perf_counter()
+                try:
+                    validate_safe_multiline(value, "نص", max_len=10**6)
+                except ValidationError:
+                    pass
+                # خطي: بضعة ms؛ backtracking تربيعي على 200k حرف = دقائق
+                self.assertLess(time.perf_counter() - t0, 0.5)
+
+
+# --------------------------------------------------
+# ✅ صفحات المحادثة بمؤشر (accounts/messaging.py)
+# --------------------------------------------------
+class ThreadCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user("client1", "client1@example.com", "pass12345", is_client=True)
+        cls.folder = ClientMasterFolder.objects.create(user=cls.client_user)
+        base = timezone.now().replace(microsecond=123456) - timedelta(hours=1)
+        for i in range(25):
+            msg = ClientMasterMessage.objects.create(
+                folder=cls.folder, sender=cls.client_user, direction="client", message=f"m{i}",
+            )
+            # مجموعات بنفس created_at => الترتيب يعتمد على id
+            ClientMasterMessage.objects.filter(pk=msg.pk).update(created_at=base + timedelta(seconds=i // 5))
+
+    def add_messages(self, n):
+        for i in range(n):
+            messaging.send_message(self.folder, self.client_user, "client", f"new{i}")
+
+    def cursor(self, row):
+        return messaging.encode_cursor(row["created_at"], row["id"])
+
+    def test_cursor_round_trip(self):
+        row = ClientMasterMessage.objects.filter(folder=self.folder).values("created_at", "id").first()
+        self.assertEqual(messaging.decode_cursor(self.cursor(row)), (row["created_at"], row["id"]))
+        for bad in ("", "abc", "1-x", "-1-2", "99999999999999999999999-1"):
+            with self.subTest(bad=bad), self.assertRaises(messaging.InvalidCursor):
+                messaging.decode_cursor(bad)
+
+    def test_backward_pages_stable_across_inserts(self):
+        expected = list(
+            ClientMasterMessage.objects.filter(folder=self.folder).order_by("created_at", "id").values_list("id", flat=True)
+        )
+        rows, has_more = messaging.thread_page(self.folder.id, limit=10)
+        seen = [r["id"] for r in rows]
+        newest = self.cursor(rows[-1])
+        while has_more:
+            # رسائل جديدة بين الصفحات لا تزيح الصفحات الأقدم (لا تكرار ولا فقد)
+            self.add_messages(3)
+            rows, has_more = messaging.thread_page(self.folder.id, before=self.cursor(rows[0]), limit=10)
+            seen = [r["id"] for r in rows] + seen
+        self.assertEqual(seen, expected)
+
+        # after = ما الجديد منذ آخر صفحة معروضة: كل الرسائل المضافة بالترتيب
+        rows, has_more = messaging.thread_page(self.folder.id, after=newest, limit=100)
+        self.assertFalse(has_more)
+        self.assertEqual([r["message"] for r in rows], [f"new{i}" for i in range(3)] * 2)
+
+    def test_invalid_cursor_is_bad_request(self):
+        self.client.force_login(self.client_user)
+        response = self.client.get(reverse("client_message_thread"), {"before": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+
+# --------------------------------------------------
+# ✅ إيصال مكرر: رقم مطبّع + بصمة dHash (accounts/receipts.py)
+# --------------------------------------------------
+def _flip(value, bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+class ReceiptDuplicateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user("client1", "client1@example.com", "pass12345", is_client=True)
+        rng = random.Random(5)
+        cls.hashes = {}
+        for i in range(200):
+            value = rng.getrandbits(receipts.HASH_BITS)
+            agreement = UserAgreement.objects.create(
+                user=cls.client_user, token=f"tok-{i}", status="under_review", agreement_text="نص",
+                client_payment_receipt=f"R-{i}", receipt_code_normalized=f"R{i}",
+                receipt_image_hash=receipts.hash_to_hex(value), client_receipt_image_uploaded_at=timezone.now(),
+            )
+            cls.hashes[agreement.pk] = value
+
+    def setUp(self):
+        receipts.index.reset()
+        self.addCleanup(receipts.index.reset)
+
+    def test_normalize_receipt_code(self):
+        self.assertEqual(receipts.normalize_receipt_code("rcpt-00 12"), "RCPT0012")
+        self.assertEqual(receipts.normalize_receipt_code("RCPT0012"), "RCPT0012")
+        self.assertIsNone(receipts.normalize_receipt_code("--"))
+        self.assertIsNone(receipts.normalize_receipt_code(None))
+
+    def test_distance_threshold(self):
+        index = receipts.HashIndex()
+        pk, value = next(iter(self.hashes.items()))
+        # 6 بتات موزعة على كل الأجزاء => مطابق؛ 7 => لا
+        spread = [0, 11, 22, 33, 44, 55]
+        self.assertIn((6, pk), index.search(_flip(value, spread)))
+        self.assertNotIn(pk, [p for _, p in index.search(_flip(value, spread + [63]))])
+        self.assertNotIn(pk, [p for _, p in index.search(value, exclude_id=pk)])
+
+    def test_matches_linear_scan(self):
+        index = receipts.HashIndex()
+        rng = random.Random(9)
+        values = list(self.hashes.values())
+        for _ in range(100):
+            base = rng.choice(values)
+            probe = _flip(base, rng.sample(range(receipts.HASH_BITS), rng.randrange(0, 10)))
+            expected = sorted(
+                ((probe ^ v).bit_count(), pk) for pk, v in self.hashes.items()
+                if (probe ^ v).bit_count() <= receipts.HASH_MAX_DISTANCE
+            )
+            self.assertEqual(index.search(probe), expected)
+
+    def test_replaced_fingerprint_ignored(self):
+        index = receipts.HashIndex()
+        pk, value = next(iter(self.hashes.items()))
+        self.assertIn((0, pk), index.search(value))
+
+        # صورة جديدة مختلفة تمامًا لنفس الاتفاقية (الحفظ ثم index_on_commit)
+        replaced = value ^ ((1 << receipts.HASH_BITS) - 1)
+        UserAgreement.objects.filter(pk=pk).update(
+            receipt_image_hash=receipts.hash_to_hex(replaced), client_receipt_image_uploaded_at=timezone.now(),
+        )
+        index.add(pk, replaced)
+        self.assertNotIn(pk, [p for _, p in index.search(value)])
+        self.assertIn((0, pk), index.search(replaced))
+
+    def test_find_duplicate(self):
+        pk, value = next(iter(self.hashes.items()))
+        original = UserAgreement.objects.get(pk=pk)
+        new = UserAgreement(user=self.client_user, token="tok-new", receipt_code_normalized=original.receipt_code_normalized)
+        self.assertEqual(receipts.find_duplicate(new), (pk, "code"))
+
+        new.receipt_code_normalized = "UNSEEN1"
+        new.receipt_image_hash = receipts.hash_to_hex(_flip(value, [1, 2]))
+        self.assertEqual(receipts.find_duplicate(new), (pk, "image"))
+
+        new.receipt_image_hash = receipts.hash_to_hex(~value & ((1 << 64) - 1))
+        self.assertIsNone(receipts.find_duplicate(new))
+
+    def test_recompressed_image_is_close(self):
+        # إيصال: خلفية فاتحة + أسطر داكنة، ثم لقطة أصغر بجودة JPEG منخفضة
+        img = Image.new("RGB", (600, 800), (245, 245, 240))
+        rng = random.Random(3)
+        for row in range(40, 760, 40):
+            width = rng.randrange(150, 520)
+            img.paste((30, 30, 30), (40, row, 40 + width, row + 14))
+        img.paste((200, 30, 30), (380, 600, 560, 760))
+        original, smaller = io.BytesIO(), io.BytesIO()
+        img.save(original, "PNG")
+        img.resize((300, 400)).save(smaller, "JPEG", quality=40)
+
+        _, a = receipts.process_image(original)
+        _, b = receipts.process_image(smaller)
+        self.assertLessEqual((a ^ b).bit_count(), receipts.HASH_MAX_DISTANCE)
+
+
+# --------------------------------------------------
+# ✅ تغيير حالة الاتفاقيات على مجموعة (accounts/payments.py + إجراءات الأدمن)
+# --------------------------------------------------
+class BulkPaymentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser("admin1", "admin1@example.com", "pass12345")
+        cls.users = {
+            status: User.objects.create_user(
+                f"c-{status}", f"{status}@example.com", "pass12345", is_client=True, account_status=status,
+            )
+            for status in ("active", "pending_agreement", "payment_pending")
+        }
+
+        def agreement(token, status, user="payment_pending", **extra):
+            return UserAgreement.objects.create(
+                user=cls.users[user], token=token, status=status, agreement_text="نص", **extra
+            )
+
+        cls.blank = agreement("tok-blank", "under_review", receipt_number="")
+        cls.null = agreement("tok-null", "under_review")
+        cls.numbered = agreement("tok-bank", "under_review", receipt_number="BANK-77")
+        cls.paid = agreement("tok-paid", "paid", user="active", receipt_number="OLD-1")
+        cls.signed = agreement("tok-signed", "signed", user="active")
+        cls.sent = agreement("tok-sent", "sent", user="pending_agreement")
+
+    def setUp(self):
+        cache.clear()
+        interning.paths.clear()
+        interning.user_agents.clear()
+
+    def agreements(self, *objs):
+        return UserAgreement.objects.filter(pk__in=[a.pk for a in objs])
+
+    def test_office_receipt_number_only_when_empty(self):
+        now = timezone.now()
+        with mock.patch.object(payments.timezone, "now", return_value=now):
+            approved, _ = payments.approve_payments(self.agreements(self.blank, self.null, self.numbered, self.paid))
+
+        self.assertEqual(approved, 4)
+        numbers = dict(UserAgreement.objects.values_list("pk", "receipt_number"))
+        day = now.strftime("%Y%m%d")
+        self.assertEqual(numbers[self.blank.pk], f"OFFICE-{day}-{self.blank.pk}")
+        self.assertEqual(numbers[self.null.pk], f"OFFICE-{day}-{self.null.pk}")
+        self.assertEqual(numbers[self.numbered.pk], "BANK-77")
+        self.assertEqual(numbers[self.paid.pk], "OLD-1")
+
+    def test_users_activated_before_status_filter_changes(self):
+        # queryset مفلتر بالحالة القديمة: بعد UPDATE الاتفاقيات لا يطابق شيئًا
+        queryset = UserAgreement.objects.filter(status="under_review")
+        approved, rows = payments.approve_payments(queryset)
+
+        self.assertEqual(approved, 3)
+        self.assertEqual(len(rows), 3)
+        self.users["payment_pending"].refresh_from_db()
+        self.assertEqual(self.users["payment_pending"].account_status, "active")
+
+    def test_send_agreements_moves_active_users_only(self):
+        sent, rows = payments.send_agreements(self.agreements(self.signed, self.sent))
+
+        self.assertEqual((sent, rows), (1, [(self.users["active"].pk, "tok-signed")]))
+        statuses = dict(User.objects.values_list("pk", "account_status"))
+        self.assertEqual(statuses[self.users["active"].pk], "pending_agreement")
+        self.assertEqual(statuses[self.users["pending_agreement"].pk], "pending_agreement")
+
+    def test_rows_exclude_target_status(self):
+        _, rows = payments.approve_payments(self.agreements(self.blank, self.paid))
+        self.assertEqual([token for _, token in rows], ["tok-blank"])
+
+        rejected, rows = payments.reject_payments(self.agreements(self.numbered, self.blank))
+        self.assertEqual(rejected, 2)
+        self.assertEqual(sorted(token for _, token in rows), ["tok-bank", "tok-blank"])
+
+        _, rows = payments.reject_payments(self.agreements(self.numbered))
+        self.assertEqual(rows, [])
+
+    def test_notify_on_commit_only(self):
+        channel = realtime.user_channel(self.users["payment_pending"].pk)
+        cache.set(badges.STAFF_KEY, {"pending_payments": 3})
+        since = realtime.hub.last_id
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            payments.approve_payments(self.agreements(self.blank))
+            self.assertEqual(realtime.hub.since([channel], since), [])
+            self.assertIsNotNone(cache.get(badges.STAFF_KEY))
+        for callback in callbacks:
+            callback()
+
+        events = realtime.hub.since([channel], since)
+        self.assertEqual([(e, d) for _, e, d in events], [("agreement", {"token": "tok-blank", "status": "paid"})])
+        self.assertIsNone(cache.get(badges.STAFF_KEY))
+
+    def test_notify_skipped_on_rollback(self):
+        channel = realtime.user_channel(self.users["payment_pending"].pk)
+        since = realtime.hub.last_id
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                payments.approve_payments(self.agreements(self.blank))
+                raise RuntimeError
+
+        self.assertEqual(realtime.hub.since([channel], since), [])
+        self.blank.refresh_from_db()
+        self.assertEqual(self.blank.status, "under_review")
+
+    def run_action(self, action, *objs):
+        self.client.force_login(self.admin_user)
+        return self.client.post(
+            reverse("admin:accounts_useragreement_changelist"),
+            {"action": action, "_selected_action": [a.pk for a in objs]},
+        )
+
+    def test_admin_action_logs_one_audit_row(self):
+        response = self.run_action("approve_payment", self.blank, self.null, self.paid)
+
+        self.assertEqual(response.status_code, 302)
+        event = AuditEvent.objects.get(event_type="admin_action")
+        self.assertEqual(event.user, self.admin_user)
+        self.assertEqual(event.meta, {"action": "approve_payment", "count": 2, "status": "paid"})
+
+    def test_admin_action_without_changes_logs_nothing(self):
+        self.run_action("reject_payment", UserAgreement.objects.create(
+            user=self.users["active"], token="tok-pp", status="payment_pending", agreement_text="نص",
+        ))
+        self.assertFalse(AuditEvent.objects.filter(event_type="admin_action").exists())
+
+
+# --------------------------------------------------
+# ✅ طابور مراجعة الدفع (views.master_payments_queue + approve/reject)
+# --------------------------------------------------
+class PaymentReviewQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff1", "staff1@example.com", "pass12345", is_staff=True)
+        cls.client_user = User.objects.create_user(
+            "client1", "client1@example.com", "pass12345", is_client=True, account_status="payment_pending",
+        )
+        now = timezone.now()
+
+        def agreement(token, status, paid_at=None, **extra):
+            return UserAgreement.objects.create(
+                user=cls.client_user, token=token, status=status, agreement_text="نص", client_paid_at=paid_at, **extra
+            )
+
+        cls.newer = agreement("tok-newer", "under_review", now, client_payment_receipt="R-2")
+        cls.older = agreement("tok-older", "under_review", now - timedelta(days=1), client_payment_receipt="R-1")
+        cls.undated = agreement("tok-undated", "under_review")
+        cls.paid = agreement("tok-paid", "paid", now - timedelta(days=2))
+
+    def setUp(self):
+        # ids المسارات في cache العملية تبقى بعد rollback الاختبار السابق (نفس المسار)
+        interning.paths.clear()
+        interning.user_agents.clear()
+        self.client.force_login(self.staff)
+
+    def review(self, action, agreement):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse(f"master_payment_{action}", args=[agreement.pk]))
+
+    def audit_rows(self):
+        return AuditEvent.objects.filter(event_type="admin_action")
+
+    def test_queue_lists_under_review_oldest_first(self):
+        response = self.client.get(reverse("master_payments_queue"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [a.token for a in response.context["agreements"]], ["tok-undated", "tok-older", "tok-newer"]
+        )
+        self.assertFalse(response.context["truncated"])
+        self.assertContains(response, reverse("master_payment_approve", args=[self.older.pk]))
+
+    def test_queue_truncated_at_limit(self):
+        with mock.patch.object(views, "PAYMENT_QUEUE_LIMIT", 2):
+            response = self.client.get(reverse("master_payments_queue"))
+
+        self.assertEqual(len(response.context["agreements"]), 2)
+        self.assertTrue(response.context["truncated"])
+
+    def test_queue_requires_staff(self):
+        self.client.force_login(self.client_user)
+        self.assertEqual(self.client.get(reverse("master_payments_queue")).status_code, 302)
+        self.assertEqual(self.client.post(reverse("master_payment_approve", args=[self.older.pk])).status_code, 302)
+        self.older.refresh_from_db()
+        self.assertEqual(self.older.status, "under_review")
+
+    def test_approve(self):
+        since = realtime.hub.last_id
+        response = self.review("approve", self.older)
+
+        self.assertEqual(response.json(), {"updated": 1, "status": "paid"})
+        self.older.refresh_from_db()
+        self.client_user.refresh_from_db()
+        self.assertEqual(self.older.status, "paid")
+        self.assertEqual(self.client_user.account_status, "active")
+        self.assertEqual(self.audit_rows().get().meta, {
+            "action": "approve_payment", "count": 1, "status": "paid", "agreement_id": self.older.pk,
+        })
+        events = realtime.hub.since([realtime.user_channel(self.client_user.pk)], since)
+        self.assertEqual([d for _, _, d in events], [{"token": "tok-older", "status": "paid"}])
+
+    def test_reject(self):
+        response = self.review("reject", self.newer)
+
+        self.assertEqual(response.json(), {"updated": 1, "status": "payment_pending"})
+        self.newer.refresh_from_db()
+        self.assertEqual(self.newer.status, "payment_pending")
+        self.assertEqual(self.audit_rows().get().meta["action"], "reject_payment")
+
+    def test_second_review_is_noop(self):
+        self.review("approve", self.older)
+        since = realtime.hub.last_id
+
+        for action in ("approve", "reject"):
+            self.assertEqual(self.review(action, self.older).json(), {"updated": 0, "status": None})
+        self.assertEqual(self.review("approve", self.paid).json(), {"updated": 0, "status": None})
+
+        self.assertEqual(self.audit_rows().count(), 1)
+        self.assertEqual(realtime.hub.since([realtime.user_channel(self.client_user.pk)], since), [])
+        self.older.refresh_from_db()
+        self.assertEqual(self.older.status, "paid")
+
+    def test_lost_race_logs_nothing(self):
+        # قراءة rows سبقت UPDATE طلب آخر: updated = 0 => لا audit
+        stale = (0, [(self.client_user.pk, self.older.token)])
+        with mock.patch.object(payments, "approve_payments", return_value=stale):
+            response = self.review("approve", self.older)
+
+        self.assertEqual(response.json(), {"updated": 0, "status": None})
+        self.assertFalse(self.audit_rows().exists())
+
+    def test_requires_post(self):
+        self.assertEqual(self.client.get(reverse("master_payment_approve", args=[self.older.pk])).status_code, 405)
+
+
+# --------------------------------------------------
+# ✅ Changelist الجداول الكبيرة (accounts/admin_paging.py)
+# --------------------------------------------------
+@mock.patch.object(SentimentSnapshotAdmin, "list_per_page", 2)
+class AdminPagingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser("admin1", "admin1@example.com", "pass12345")
+        days = [(2024, 3, 10), (2024, 3, 10), (2024, 3, 21), (2024, 5, 2), (2025, 1, 15)]
+        for target, day in zip(["lawyer", "client", "client", "client", "lawyer"], days):
+            snapshot = SentimentSnapshot.objects.create(target=target, label="neutral", score=0, source_text="نص")
+            when = timezone.make_aware(datetime.datetime(*day, 12))
+            SentimentSnapshot.objects.filter(pk=snapshot.pk).update(created_at=when)
+        # الأحدث أولًا، pk تنازليًا عند تساوي created_at
+        cls.ordered = list(SentimentSnapshot.objects.order_by("-created_at", "-pk").values_list("pk", flat=True))
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def changelist(self, query=""):
+        url = reverse("admin:accounts_sentimentsnapshot_changelist")
+        return self.client.get(url + query if query.startswith("?") else f"{url}?{query}")
+
+    def pks(self, response):
+        return [obj.pk for obj in response.context["cl"].result_list]
+
+    def test_next_cursor_walks_all_rows(self):
+        response = self.changelist()
+        seen = self.pks(response)
+        cl = response.context["cl"]
+        self.assertEqual(cl.keyset_first_url, "")
+        while cl.keyset_next_url:
+            response = self.changelist(cl.keyset_next_url)
+            cl = response.context["cl"]
+            self.assertTrue(cl.keyset_first_url)
+            self.assertFalse(cl.multi_page)
+            seen += self.pks(response)
+        self.assertEqual(seen, self.ordered)
+
+    def test_cursor_keeps_filters(self):
+        response = self.changelist("target__exact=client")
+        next_url = response.context["cl"].keyset_next_url
+        self.assertIn("target__exact=client", next_url)
+
+        clients = [pk for pk in self.ordered if SentimentSnapshot.objects.get(pk=pk).target == "client"]
+        self.assertEqual(self.pks(response) + self.pks(self.changelist(next_url)), clients)
+
+    def test_bad_cursor_redirects_with_error(self):
+        response = self.changelist(urlencode({"after": "not-a-cursor"}))
+        self.assertRedirects(
+            response, reverse("admin:accounts_sentimentsnapshot_changelist") + "?e=1", fetch_redirect_response=False
+        )
+
+    def test_explicit_ordering_disables_keyset(self):
+        cursor = admin_paging.encode_cursor(timezone.now(), 1)
+        response = self.changelist(urlencode({"o": "3", "after": cursor}))
+
+        cl = response.context["cl"]
+        self.assertFalse(cl.keyset_enabled)
+        self.assertEqual(cl.keyset_next_url, "")
+        # المؤشر مُتجاهل: الصفحة الأولى بترتيب ?o= مع ترقيم الصفحات العادي
+        self.assertEqual(len(self.pks(response)), 2)
+        self.assertTrue(cl.multi_page)
+
+    def hierarchy(self, query=""):
+        return admin_paging.indexed_date_hierarchy(self.changelist(query).context["cl"])
+
+    def test_date_hierarchy_drill_down(self):
+        years = self.hierarchy()
+        self.assertIsNone(years["back"])
+        self.assertEqual([c["title"] for c in years["choices"]], ["2024", "2025"])
+        self.assertIn("created_at__year=2024", years["choices"][0]["link"])
+
+        months = self.hierarchy("created_at__year=2024")
+        self.assertEqual(len(months["choices"]), 2)
+        self.assertIn("created_at__month=3", months["choices"][0]["link"])
+        self.assertIn("created_at__month=5", months["choices"][1]["link"])
+
+        days = self.hierarchy("created_at__year=2024&created_at__month=3")
+        self.assertIn("created_at__year=2024", days["back"]["link"])
+        self.assertEqual(
+            [c["link"].rsplit("created_at__day=", 1)[1][:2] for c in days["choices"]], ["10", "21"]
+        )
+
+        day = self.hierarchy("created_at__year=2024&created_at__month=3&created_at__day=10")
+        self.assertEqual(len(day["choices"]), 1)
+        self.assertNotIn("link", day["choices"][0])
+
+    def test_date_hierarchy_single_year_starts_at_months(self):
+        months = self.hierarchy("target__exact=client")
+        self.assertEqual(len(months["choices"]), 2)
+        self.assertIn("created_at__month=3", months["choices"][0]["link"])
+
+    def test_distinct_periods(self):
+        qs = SentimentSnapshot.objects.all()
+        self.assertEqual(
+            admin_paging.distinct_periods(qs, "created_at", "month"),
+            [datetime.date(2024, 3, 1), datetime.date(2024, 5, 1), datetime.date(2025, 1, 1)],
+        )
+
+    def test_unfiltered_count_is_estimated(self):
+        # SQLite: MAX(pk) - MIN(pk) + 1 => الفجوات تُحسب
+        SentimentSnapshot.objects.filter(pk=self.ordered[2]).delete()
+        paginator = admin_paging.EstimatedCountPaginator(SentimentSnapshot.objects.order_by("-pk"), 2)
+
+        self.assertEqual(paginator.count, max(self.ordered) - min(self.ordered) + 1)
+        self.assertEqual(paginator.count_kind, "estimated")
+
+    def test_filtered_count_exact_or_capped(self):
+        clients = SentimentSnapshot.objects.filter(target="client")
+        paginator = admin_paging.EstimatedCountPaginator(clients, 2)
+        self.assertEqual((paginator.count, paginator.count_kind), (3, ""))
+
+        with mock.patch.object(admin_paging, "COUNT_CAP", 2):
+            paginator = admin_paging.EstimatedCountPaginator(clients, 2)
+            self.assertEqual((paginator.count, paginator.count_kind), (2, "capped"))
+
+        paginator = admin_paging.EstimatedCountPaginator(SentimentSnapshot.objects.distinct(), 2)
+        self.assertEqual((paginator.count, paginator.count_kind), (5, ""))
+
+    def test_pagination_shows_count_kind(self):
+        self.assertContains(self.changelist(), "~5")
+        with mock.patch.object(admin_paging, "COUNT_CAP", 2):
+            self.assertContains(self.changelist("target__exact=client"), "2+")
@@ -0,0 +1,100 @@
+# accounts/throttle.py
+"""
+Lockout تصاعدي لمحاولات تسجيل الدخول.
+
+- login_view يسجل كل فشل (register_login_failure) ويمسح العداد عند النجاح.
+- LoginLockoutMiddleware (قبل SessionMiddleware) يرفض POST على حساب مقفول
+  بقراءة cache واحدة => بدون session / CSRF / DB / PBKDF2.
+
+نطاق القفل: IP + اسم المستخدم فقط. لا قفل على اسم المستخدم وحده:
+أي أحد يستطيع قفل حساب غيره بمحاولات خاطئة من عدة IPs.
+
+مدة القفل = BASE_SECONDS * 2^(عدد الفشل - العتبة) بحد أقصى MAX_SECONDS.
+الحالة في cache مشتركة (LOGIN_THROTTLE["CACHE"]) => مع عدة workers يجب أن تكون Redis/Memcached.
+"""
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+_USERNAME_RE = re.compile(r"^[A-Za-z0-9_]{4,30}$")
+
+DEFAULTS = {
+    "CACHE": "default",
+    "IP_USER_THRESHOLD": 5,
+    "BASE_SECONDS": 30,
+    "MAX_SECONDS": 3600,
+    "FAILURE_TTL": 86400,
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, "LOGIN_THROTTLE", {})}
+
+
+def client_ip(request):
+    """
+    REMOTE_ADDR، أو خلف reverse proxy: العنوان الذي أضافه أول proxy موثوق
+    (TRUSTED_PROXY_COUNT من يمين X-Forwarded-For). ما قبله يرسله العميل كما يشاء.
+    """
+    remote = request.META.get("REMOTE_ADDR", "unknown")
+    hops = getattr(settings, "TRUSTED_PROXY_COUNT", 0)
+    if hops <= 0:
+        return remote
+    xff = [part.strip() for part in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if part.strip()]
+    if len(xff) < hops:
+        return remote
+    return xff[-hops]
+
+
+def normalize_username(value):
+    """
+    أسماء غير صالحة ترفضها login_view قبل authenticate أصلًا => لا تحتاج قفل
+    (وهذا يضمن أن مفاتيح الـ cache آمنة لـ memcached).
+    """
+    v = (value or "").strip().lower()
+    return v if _USERNAME_RE.match(v) else ""
+
+
+def _scopes(ip, username, config):
+    return (
+        (f"login:ipuser:{ip}:{username}", config["IP_USER_THRESHOLD"]),
+    )
+
+
+def lockout_remaining(ip, username):
+    """
+    ثواني متبقية على القفل (0 = مسموح). قراءة واحدة get_many.
+    """
+    config = _config()
+    cache = caches[config["CACHE"]]
+    lock_keys = [f"{key}:lock" for key, _ in _scopes(ip, username, config)]
+    until = max(cache.get_many(lock_keys).values(), default=0)
+    return max(0, int(until - time.time()))
+
+
+def register_login_failure(ip, username):
+    config = _config()
+    cache = caches[config["CACHE"]]
+    now = time.time()
+    for key, threshold in _scopes(ip, username, config):
+        fail_key = f"{key}:fail"
+        cache.add(fail_key, 0, timeout=config["FAILURE_TTL"])
+        try:
+            failures = cache.incr(fail_key)
+        except ValueError:  # انتهى بين add و incr
+            cache.set(fail_key, 1, timeout=config["FAILURE_TTL"])
+            failures = 1
+        if failures >= threshold:
+            duration = min(config["MAX_SECONDS"], config["BASE_SECONDS"] * 2 ** (failures - threshold))
+            cache.set(f"{key}:lock", now + duration, timeout=duration)
+
+
+def clear_login_failures(ip, username):
+    config = _config()
+    cache = caches[config["CACHE"]]
+    keys = []
+    for key, _ in _scopes(ip, username, config):
+        keys += [f"{key}:fail", f"{key}:lock"]
+    cache.delete_many(keys)
@@ -1,49 +1,75 @@
 # accounts/urls.py
+from django.conf import settings
 from django.urls import path
 from . import views
+from .query_budget import query_budget
+
+# query_budget(n): أقصى عدد استعلامات مسموح للـ view (QueryBudgetMiddleware)
+# n = العدد المقاس في accounts/test_query_budgets.py (أول زيارة للمسار: interning محسوب)
+
+# ASYNC_VIEWS (ASGI): نفس الصفحات بقراءات متوازية (accounts/fanout.py)
+if settings.ASYNC_VIEWS:
+    dashboard_view = views.user_dashboard_async
+    client_detail_view = views.master_client_detail_async
+else:
+    dashboard_view = views.user_dashboard
+    client_detail_view = views.master_client_detail
 
 urlpatterns = [
     # ----------------------------------
     # Auth
     # ----------------------------------
-    path("register/", views.register_view, name="register"),
-    path("login/", views.login_view, name="login"),
-    path("logout/", views.logout_view, name="logout"),
+    path("register/", query_budget(31)(views.register_view), name="register"),
+    path("login/", query_budget(35)(views.login_view), name="login"),
+    path("logout/", query_budget(13)(views.logout_view), name="logout"),
 
     # ----------------------------------
     # User Area
     # ----------------------------------
-    path("dashboard/", views.user_dashboard, name="user_dashboard"),
-    path("profile/", views.profile_update_view, name="profile_update"),
-    path("case/create/", views.case_create, name="case_create"),
-    path("case/<int:case_id>/timeline/", views.case_timeline_view, name="case_timeline_view"),
+    path("dashboard/", query_budget(20)(dashboard_view), name="user_dashboard"),
+    path("messages/thread/", query_budget(4)(views.client_message_thread), name="client_message_thread"),
+    path("messages/read/", query_budget(7)(views.client_mark_messages_read), name="client_mark_messages_read"),
+    path("events/stream/", query_budget(2)(views.events_stream), name="events_stream"),
+    path("events/poll/", query_budget(2)(views.events_poll), name="events_poll"),
+    path("profile/", query_budget(13)(views.profile_update_view), name="profile_update"),
+    path("case/create/", query_budget(18)(views.case_create), name="case_create"),
+    path("case/<int:case_id>/timeline/", query_budget(14)(views.case_timeline_view), name="case_timeline_view"),
 
     # ----------------------------------
     # Account Status
     # ----------------------------------
-    path("suspended/", views.account_suspended, name="account_suspended"),
+    path("suspended/", query_budget(13)(views.account_suspended), name="account_suspended"),
 
     # ----------------------------------
     # Agreements
     # ----------------------------------
-    path("agreement/<str:token>/", views.agreement_view, name="agreement_view"),
+    path("agreement/<str:token>/", query_budget(14)(views.agreement_view), name="agreement_view"),
 
     # ----------------------------------
     # Payments
     # ----------------------------------
-    path("payment/<str:token>/", views.payment_page, name="payment_page"),
-    path("payment/<str:token>/pending/", views.payment_pending_review, name="payment_pending_review"),
-    path("payment/<str:token>/success/", views.payment_success, name="payment_success"),
+    path("payment/<str:token>/", query_budget(15)(views.payment_page), name="payment_page"),
+    path("payment/<str:token>/pending/", query_budget(12)(views.payment_pending_review), name="payment_pending_review"),
+    path("payment/<str:token>/success/", query_budget(12)(views.payment_success), name="payment_success"),
 
     # ==================================================
     # 🟦 Master (Lawyer / Admin Dashboard)
     # ==================================================
-    path("master/clients/", views.master_clients_list, name="master_clients_list"),
-    path("master/clients/<int:folder_id>/", views.master_client_detail, name="master_client_detail"),
-    path("master/clients/<int:folder_id>/send-message/", views.master_send_message, name="master_send_message"),
+    path("master/clients/", query_budget(13)(views.master_clients_list), name="master_clients_list"),
+    path("master/broadcast/", query_budget(12)(views.master_broadcast), name="master_broadcast"),
+    path("master/clients/<int:folder_id>/", query_budget(18)(client_detail_view), name="master_client_detail"),
+    path("master/clients/<int:folder_id>/send-message/", query_budget(18)(views.master_send_message), name="master_send_message"),
+    path("master/clients/<int:folder_id>/thread/", query_budget(4)(views.master_message_thread), name="master_message_thread"),
+    path("master/clients/<int:folder_id>/read/", query_budget(7)(views.master_mark_messages_read), name="master_mark_messages_read"),
 
     # ==================================================
     # 🟦 Master Events Dashboard (Fix missing attribute)
     # ==================================================
-    path("master/events/", views.master_events_dashboard, name="master_events_dashboard"),
+    path("master/events/", query_budget(12)(views.master_events_dashboard), name="master_events_dashboard"),
+    path("master/events/export/", query_budget(11)(views.master_events_export), name="master_events_export"),
+    path("master/payments/", query_budget(12)(views.master_payments_queue), name="master_payments_queue"),
+    path("master/payments/<int:agreement_id>/approve/", query_budget(16)(views.master_payment_approve), name="master_payment_approve"),
+    path("master/payments/<int:agreement_id>/reject/", query_budget(15)(views.master_payment_reject), name="master_payment_reject"),
+    path("master/payments/export/", query_budget(11)(views.master_payments_export), name="master_payments_export"),
+    path("master/perf/", query_budget(2)(views.master_perf_dashboard), name="master_perf_dashboard"),
 ]
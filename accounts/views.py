@@ -1,5 +1,6 @@
 # accounts/views.py
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth import get_user_model
@@ -8,17 +9,21 @@ from django.contrib.auth.decorators import login_required
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from django.http import HttpResponseForbidden
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.views.decorators.csrf import csrf_protect
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q, Prefetch
 from django.contrib.admin.views.decorators import staff_member_required
 
 import uuid
 import base64
+import json
 import logging
 from urllib.parse import quote
 from django.core.files.base import ContentFile
+from asgiref.sync import sync_to_async
 
 from .models import (
     UserProfile,
@@ -26,7 +31,6 @@ from .models import (
     CaseReply,
     UserAgreement,
     ClientMasterFolder,
-    ClientMasterMessage,
     ClientMasterDocument,
     AuditEvent,
     CaseTimelineEvent,
@@ -44,6 +48,9 @@ from .security import (
 )
 
 from .sentiment import analyze_sentiment
+from .exports import AUDIT_EVENT_COLUMNS, PAYMENT_COLUMNS, filter_audit_events, stream_export
+from . import broadcast, fanout, messaging, metrics, payments, perf, realtime, receipts, throttle
+from .audit import log_event
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -53,27 +60,6 @@ security_logger = logging.getLogger("security")
 # --------------------------------------------------
 # Helpers
 # --------------------------------------------------
-def _get_ip(request):
-    xff = request.META.get("HTTP_X_FORWARDED_FOR")
-    if xff:
-        return xff.split(",")[0].strip()
-    return request.META.get("REMOTE_ADDR", "unknown")
-
-
-def log_event(request, event_type: str, meta: str = ""):
-    try:
-        AuditEvent.objects.create(
-            user=request.user if getattr(request, "user", None) and request.user.is_authenticated else None,
-            event_type=event_type,
-            path=request.path[:300] if request.path else "",
-            ip=_get_ip(request),
-            user_agent=(request.META.get("HTTP_USER_AGENT") or "")[:300],
-            meta=(meta or "")[:5000],
-        )
-    except Exception:
-        pass
-
-
 def _get_latest_agreement(user):
     if not user.is_authenticated:
         return None
@@ -104,6 +90,35 @@ def _ensure_master_folder_for_user(user: User):
         ClientMasterFolder.objects.get_or_create(user=user)
 
 
+def _provision_client(user: User):
+    """
+    ملف العميل + ملف التواصل يُنشآن عند التسجيل/الدخول (POST) فقط،
+    وصفحات العرض (GET) تقرأ فقط. (حسابات أُنشئت من admin/shell)
+    """
+    if not user or user.is_staff:
+        return
+    # استعلام واحد في الحالة المعتادة (الملفان موجودان)
+    existing = User.objects.filter(pk=user.pk).values("profile__id", "master_folder__id").first() or {}
+    missing = [
+        model for model, key in ((UserProfile, "profile__id"), (ClientMasterFolder, "master_folder__id"))
+        if not existing.get(key)
+    ]
+    if missing:
+        with transaction.atomic():
+            for model in missing:
+                model.objects.get_or_create(user=user)
+
+
+def _unread_up_to(page_obj, direction):
+    """
+    أحدث رسالة غير مقروءة في الصفحة المعروضة (من بيانات الصفحة، بدون استعلام).
+    """
+    if not page_obj:
+        return None
+    ids = [m.id for m in page_obj if m.direction == direction and not m.is_read]
+    return max(ids) if ids else None
+
+
 def _case_timeline_seed(case: Case):
     if not case:
         return
@@ -143,6 +158,7 @@ def _save_sentiment(user: User, case: Case, target: str, text: str):
             score=res.score,
             source_text=(text or "")[:2000],
         )
+        metrics.inc_sentiment_job(target, res.label)
     except Exception:
         pass
 
@@ -183,17 +199,21 @@ def register_view(request):
 
         except ValidationError as e:
             messages.error(request, str(e))
-            log_event(request, "security_block", meta=f"register_validation:{str(e)}")
+            log_event(request, "security_block", error_code="register_validation", detail=str(e)[:500])
             return redirect("register")
 
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            password=password1,
-            phone_number=phone_number,
-            is_client=True,
-            account_status="active",
-        )
+        # الحساب + ملف العميل + ملف التواصل معًا (صفحات العرض لا تنشئ شيئًا لاحقًا)
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username=username,
+                email=email,
+                password=password1,
+                phone_number=phone_number,
+                is_client=True,
+                account_status="active",
+            )
+            UserProfile.objects.create(user=user)
+            ClientMasterFolder.objects.create(user=user)
 
         login(request, user)
         try:
@@ -201,10 +221,9 @@ def register_view(request):
         except Exception:
             pass
 
-        _ensure_master_folder_for_user(user)
-        log_event(request, "auth_login", meta="register_login")
+        log_event(request, "auth_login", action="register_login")
 
-        return redirect("index")
+        return redirect("home")
 
     return render(request, "accounts-templates/register.html")
 
@@ -223,27 +242,30 @@ def login_view(request):
 
         except ValidationError:
             messages.error(request, "بيانات الدخول غير صحيحة")
-            log_event(request, "auth_failed", meta="login_validation_failed")
+            log_event(request, "auth_failed", error_code="login_validation_failed")
             return redirect("login")
 
+        ip = throttle.client_ip(request)
         user = authenticate(request, username=username, password=password)
         if user:
+            throttle.clear_login_failures(ip, throttle.normalize_username(username))
             login(request, user)
             try:
                 request.session.cycle_key()
             except Exception:
                 pass
 
-            _ensure_master_folder_for_user(user)
-            log_event(request, "auth_login", meta="login_success")
+            _provision_client(user)
+            log_event(request, "auth_login", action="login_success")
 
             if user.account_status in ("pending_agreement", "payment_pending"):
                 return redirect("user_dashboard")
 
-            return redirect("index")
+            return redirect("home")
 
+        throttle.register_login_failure(ip, throttle.normalize_username(username))
         messages.error(request, "بيانات الدخول غير صحيحة")
-        log_event(request, "auth_failed", meta="login_auth_failed")
+        log_event(request, "auth_failed", error_code="login_auth_failed")
         return redirect("login")
 
     return render(request, "accounts-templates/login.html")
@@ -254,7 +276,7 @@ def login_view(request):
 # --------------------------------------------------
 @require_http_methods(["GET", "POST"])
 def logout_view(request):
-    log_event(request, "auth_logout", meta="logout")
+    log_event(request, "auth_logout", action="logout")
     try:
         logout(request)
         request.session.flush()
@@ -269,7 +291,7 @@ def logout_view(request):
 @login_required
 def account_suspended(request):
     latest = _get_latest_agreement(request.user)
-    log_event(request, "view", meta="account_suspended")
+    log_event(request, "view", action="account_suspended")
     return render(request, "accounts/account_suspended.html", {"agreement": latest})
 
 
@@ -277,88 +299,134 @@ def account_suspended(request):
 # Dashboard (✅ تم توسيعه لعرض كل معاملات المستخدم ومساراته + التقدم + المشاعر)
 # + ✅ (NEW) عرض رسائل الماستر للعميل + إرسال رسالة للمكتب
 # --------------------------------------------------
+def _dashboard_loaders(user, mmsg_page):
+    """
+    قراءات الداشبورد المستقلة (كل واحدة مكتملة التحميل) => متتابعة في user_dashboard
+    ومتوازية في user_dashboard_async (accounts/fanout.py).
+    """
+
+    def load_profile():
+        return UserProfile.objects.filter(user_id=user.pk).first()
+
+    def load_cases():
+        cases = list(
+            Case.objects.filter(user_id=user.pk)
+            .order_by("-created_at")
+            .prefetch_related(
+                "replies",
+                "timeline",
+                Prefetch(
+                    "sentiments",
+                    queryset=SentimentSnapshot.objects.filter(target="client").order_by("-created_at"),
+                    to_attr="client_sentiments",
+                ),
+            )
+        )
+
+        # تجهيز تقدم كل قضية (stages + latest + outcome)
+        # من البيانات المجلوبة مسبقًا (prefetch) بدل استعلامات لكل قضية
+        case_progress = {}
+        case_sentiments = {}
+        for c in cases:
+            timeline = list(c.timeline.all())  # مرتبة حسب created_at
+
+            stages = list(dict.fromkeys(ev.stage for ev in timeline))
+            if "registered" not in stages:
+                stages = ["registered"] + stages
+
+            latest = timeline[-1] if timeline else None
+            latest_stage = latest.stage if latest else "case_submitted"
+            latest_outcome = latest.outcome if latest else "pending"
+
+            judgments = [ev for ev in timeline if ev.stage == "judgment"]
+            judgment_outcome = judgments[-1].outcome if judgments else ""
+
+            case_progress[c.id] = {
+                "stages": stages,
+                "latest_stage": latest_stage,
+                "latest_outcome": latest_outcome,
+                "judgment_outcome": judgment_outcome,
+            }
+
+            s = c.client_sentiments[0] if c.client_sentiments else None
+            if s:
+                case_sentiments[c.id] = {
+                    "label": s.label,
+                    "score": s.score,
+                    "created_at": s.created_at,
+                }
+        return cases, case_progress, case_sentiments
+
+    def load_master_messages():
+        # الملف يُنشأ عند التسجيل/الدخول، والتعليم كمقروء عبر client_mark_messages_read
+        folder = ClientMasterFolder.objects.filter(user_id=user.pk).only("id").first()
+        if not folder:
+            return None
+        master_messages_qs = folder.messages.select_related("sender").all().order_by("-created_at")
+        page_obj = Paginator(master_messages_qs, 12).get_page(mmsg_page)
+        page_obj.object_list = list(page_obj.object_list)
+        return page_obj
+
+    def load_agreement():
+        return UserAgreement.objects.filter(user_id=user.pk).order_by("-created_at").first()
+
+    return {
+        "profile": load_profile,
+        "cases": load_cases,
+        "master_msg_page_obj": load_master_messages,
+        "agreement": load_agreement,
+    }
+
+
+def _dashboard_context(request, user, data):
+    cases, case_progress, case_sentiments = data["cases"]
+    return {
+        "profile": data["profile"],
+        "cases": cases,
+        # غير مستخدمة في القالب حاليًا (querysets كسولة => بدون استعلام)
+        "documents": user.documents.all().order_by("-uploaded_at"),
+        "now": timezone.now(),
+        "agreement": data["agreement"],
+        "audit_events": AuditEvent.objects.filter(user_id=user.pk).order_by("-created_at")[:60],
+        "case_progress": case_progress,
+        "case_sentiments": case_sentiments,
+
+        # ✅ NEW context for dashboard messaging section
+        "master_msg_page_obj": data["master_msg_page_obj"],
+        "mark_read_up_to": _unread_up_to(data["master_msg_page_obj"], "lawyer"),
+        # هذا متغير اختياري لو تبغى تعرض رسائل Django في مربع مستقل بالتمبلت
+        "master_flash_messages": messages.get_messages(request),
+    }
+
+
 @login_required
 def user_dashboard(request):
     redir = _redirect_if_suspended(request, allow_dashboard=True)
     if redir:
         return redir
 
-    profile = getattr(request.user, "profile", None)
-    cases = request.user.account_cases.all().order_by("-created_at")
-
-    # مستندات المستخدم
-    documents = request.user.documents.all().order_by("-uploaded_at")
-
-    # سجل المستخدم (آخر 60)
-    audit_events = AuditEvent.objects.filter(user=request.user).order_by("-created_at")[:60]
-
-    # تجهيز تقدم كل قضية (stages + latest + outcome)
-    case_progress = {}
-    case_sentiments = {}
-    for c in cases:
-        stages = list(c.timeline.values_list("stage", flat=True).distinct())
-        if "registered" not in stages:
-            stages = ["registered"] + stages
-
-        latest = c.timeline.order_by("-created_at").first()
-        latest_stage = latest.stage if latest else "case_submitted"
-        latest_outcome = latest.outcome if latest else "pending"
-
-        latest_judgment = c.timeline.filter(stage="judgment").order_by("-created_at").first()
-        judgment_outcome = latest_judgment.outcome if latest_judgment else ""
-
-        case_progress[c.id] = {
-            "stages": stages,
-            "latest_stage": latest_stage,
-            "latest_outcome": latest_outcome,
-            "judgment_outcome": judgment_outcome,
-        }
-
-        s = c.sentiments.filter(target="client").order_by("-created_at").first()
-        if s:
-            case_sentiments[c.id] = {
-                "label": s.label,
-                "score": s.score,
-                "created_at": s.created_at,
-            }
+    loaders = _dashboard_loaders(request.user, request.GET.get("mmsg"))
+    data = {name: load() for name, load in loaders.items()}
 
-    # --------------------------------------------------
-    # ✅ NEW: رسائل الماستر للعميل + Pagination + Mark read
-    # --------------------------------------------------
-    _ensure_master_folder_for_user(request.user)
-    folder = getattr(request.user, "master_folder", None)
+    log_event(request, "view", action="user_dashboard")
+    return render(request, "accounts/dashboard.html", _dashboard_context(request, request.user, data))
 
-    master_msg_page_obj = None
-    if folder:
-        master_messages_qs = folder.messages.select_related("sender").all().order_by("-created_at")
-        master_msg_paginator = Paginator(master_messages_qs, 12)
-        mmsg_page = request.GET.get("mmsg")
-        master_msg_page_obj = master_msg_paginator.get_page(mmsg_page)
 
-        # تعليم رسائل المكتب كمقروءة عند فتح الداشبورد
-        folder.messages.filter(direction="lawyer", is_read=False).update(is_read=True)
+@login_required
+async def user_dashboard_async(request):
+    """
+    نفس user_dashboard، والقراءات المستقلة متوازية (ASGI: ASYNC_VIEWS).
+    """
+    user = await request.auser()
+    redir = await sync_to_async(_redirect_if_suspended)(request, allow_dashboard=True)
+    if redir:
+        return redir
 
-    log_event(request, "view", meta="user_dashboard")
+    data = await fanout.gather_reads(_dashboard_loaders(user, request.GET.get("mmsg")))
 
-    return render(
-        request,
-        "accounts/dashboard.html",
-        {
-            "profile": profile,
-            "cases": cases,
-            "documents": documents,
-            "now": timezone.now(),
-            "agreement": _get_latest_agreement(request.user),
-            "audit_events": audit_events,
-            "case_progress": case_progress,
-            "case_sentiments": case_sentiments,
-
-            # ✅ NEW context for dashboard messaging section
-            "master_msg_page_obj": master_msg_page_obj,
-            # هذا متغير اختياري لو تبغى تعرض رسائل Django في مربع مستقل بالتمبلت
-            "master_flash_messages": messages.get_messages(request),
-        },
-    )
+    await sync_to_async(log_event)(request, "view", action="user_dashboard")
+    # render متزامن (session / context processors / lazy querysets)
+    return await sync_to_async(render)(request, "accounts/dashboard.html", _dashboard_context(request, user, data))
 
 
 # --------------------------------------------------
@@ -376,7 +444,7 @@ def client_send_message(request):
     folder = getattr(request.user, "master_folder", None)
     if not folder:
         messages.error(request, "تعذر فتح ملف التواصل. حاول مرة أخرى.")
-        log_event(request, "security_block", meta="client_send_message:no_folder")
+        log_event(request, "security_block", error_code="client_send_message_no_folder")
         return redirect("user_dashboard")
 
     body = (request.POST.get("message") or "").strip()
@@ -384,16 +452,11 @@ def client_send_message(request):
         body = validate_safe_multiline(body, "client_message", max_len=1500, min_len=1)
     except ValidationError as e:
         messages.error(request, str(e))
-        log_event(request, "security_block", meta=f"client_message_invalid:{str(e)}")
+        log_event(request, "security_block", error_code="client_message_invalid", detail=str(e)[:500])
         return redirect("user_dashboard")
 
-    ClientMasterMessage.objects.create(
-        folder=folder,
-        sender=request.user,
-        direction="client",
-        message=body,
-        is_read=False,  # المكتب ما قرأها بعد
-    )
+    # المكتب ما قرأها بعد (+ عدادات الملف)
+    messaging.send_message(folder, request.user, "client", body)
 
     # ربط تحليل مشاعر برسالة العميل على آخر قضية (لو موجودة)
     try:
@@ -403,11 +466,93 @@ def client_send_message(request):
     except Exception:
         pass
 
-    log_event(request, "client_message", meta=f"folder:{folder.id}")
+    log_event(request, "client_message", folder_id=folder.id)
     messages.success(request, "تم إرسال رسالتك للمكتب.")
     return redirect("user_dashboard")
 
 
+# --------------------------------------------------
+# ✅ Read receipts (POST صريح بدل الكتابة عند فتح الصفحة)
+# up_to = أحدث رسالة معروضة => الرسائل التي وصلت بعد العرض تبقى غير مقروءة
+# --------------------------------------------------
+def _mark_read(folder, direction, up_to):
+    try:
+        up_to = int(up_to)
+    except (TypeError, ValueError):
+        return 0
+    return messaging.mark_read(folder, direction, up_to)
+
+
+@login_required
+@require_POST
+@csrf_protect
+def client_mark_messages_read(request):
+    folder = getattr(request.user, "master_folder", None)
+    if not folder:
+        return JsonResponse({"updated": 0})
+    return JsonResponse({"updated": _mark_read(folder, "lawyer", request.POST.get("up_to"))})
+
+
+# --------------------------------------------------
+# ✅ Message thread API (accounts/messaging.py: thread_page)
+# ?before=<cursor> رسائل أقدم | ?after=<cursor> رسائل أحدث (polling) | ?limit= (حتى 100)
+# --------------------------------------------------
+THREAD_PAGE_SIZE = 30
+THREAD_MAX_PAGE_SIZE = 100
+
+
+def _thread_response(request, folder_id):
+    try:
+        limit = min(max(int(request.GET.get("limit") or THREAD_PAGE_SIZE), 1), THREAD_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = THREAD_PAGE_SIZE
+    before = request.GET.get("before") or None
+    after = request.GET.get("after") or None
+
+    try:
+        rows, has_more = messaging.thread_page(folder_id, before=before, after=after, limit=limit)
+    except messaging.InvalidCursor:
+        return JsonResponse({"error": "invalid cursor"}, status=400)
+
+    first = messaging.encode_cursor(rows[0]["created_at"], rows[0]["id"]) if rows else None
+    last = messaging.encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if rows else None
+    if after is not None:
+        prev_cursor, next_cursor, has_newer = None, last or after, has_more
+    else:
+        prev_cursor, next_cursor, has_newer = (first if has_more else None), last or before, False
+
+    return JsonResponse({
+        "messages": [
+            {
+                "id": r["id"],
+                "direction": r["direction"],
+                "message": r["message"],
+                "is_read": r["is_read"],
+                "created_at": r["created_at"].isoformat(),
+            }
+            for r in rows
+        ],
+        "prev": prev_cursor,      # ?before= للصفحة الأقدم (None = لا يوجد أقدم)
+        "next": next_cursor,      # ?after= للجديد بعد هذه الصفحة
+        "has_newer": has_newer,   # after: يوجد المزيد فورًا بدون انتظار
+    })
+
+
+@login_required
+def client_message_thread(request):
+    folder_id = ClientMasterFolder.objects.filter(user_id=request.user.pk).values_list("id", flat=True).first()
+    if folder_id is None:
+        return JsonResponse({"messages": [], "prev": None, "next": None, "has_newer": False})
+    return _thread_response(request, folder_id)
+
+
+@staff_member_required
+def master_message_thread(request, folder_id):
+    if not ClientMasterFolder.objects.filter(pk=folder_id).exists():
+        raise Http404("No ClientMasterFolder matches the given query.")
+    return _thread_response(request, folder_id)
+
+
 # --------------------------------------------------
 # Profile Update
 # --------------------------------------------------
@@ -417,7 +562,8 @@ def profile_update_view(request):
     if redir:
         return redir
 
-    profile, _ = UserProfile.objects.get_or_create(user=request.user)
+    # GET يقرأ فقط؛ الإنشاء (لحساب قديم بدون ملف) عند الحفظ
+    profile = UserProfile.objects.filter(user=request.user).first()
 
     if request.method == "POST":
         try:
@@ -430,22 +576,25 @@ def profile_update_view(request):
 
         except ValidationError as e:
             messages.error(request, str(e))
-            log_event(request, "security_block", meta=f"profile_validation:{str(e)}")
+            log_event(request, "security_block", error_code="profile_validation", detail=str(e)[:500])
             return redirect("profile_update")
 
+        if profile is None:
+            profile = UserProfile(user=request.user)
         profile.full_name = full_name
         profile.national_id = national_id
         profile.address = address
 
         if "id_card_image" in request.FILES:
             profile.id_card_image = request.FILES["id_card_image"]
+            metrics.observe_upload("id_card_image", profile.id_card_image.size)
 
         profile.save()
-        log_event(request, "profile_update", meta="profile_updated")
+        log_event(request, "profile_update", action="profile_updated")
         messages.success(request, "تم حفظ البيانات بنجاح")
         return redirect("user_dashboard")
 
-    log_event(request, "view", meta="profile_update")
+    log_event(request, "view", action="profile_update")
     return render(request, "accounts/profile_form.html", {"profile": profile})
 
 
@@ -469,7 +618,7 @@ def case_create(request):
 
         except ValidationError as e:
             messages.error(request, str(e))
-            log_event(request, "security_block", meta=f"case_validation:{str(e)}")
+            log_event(request, "security_block", error_code="case_validation", detail=str(e)[:500])
             return redirect("case_create")
 
         case_number = f"CASE-{timezone.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:6].upper()}"
@@ -487,11 +636,11 @@ def case_create(request):
 
         _save_sentiment(request.user, case, "client", f"{title}\n{description}")
 
-        log_event(request, "case_create", meta=f"case:{case.case_number}")
+        log_event(request, "case_create", case_number=case.case_number)
         messages.success(request, f"تم رفع القضية بنجاح (رقمها: {case_number})")
         return redirect("user_dashboard")
 
-    log_event(request, "view", meta="case_create")
+    log_event(request, "view", action="case_create")
     return render(request, "accounts/case_form.html")
 
 
@@ -508,7 +657,7 @@ def case_timeline_view(request, case_id):
     timeline = case.timeline.all().order_by("created_at")
     sentiments = case.sentiments.filter(target="client").order_by("-created_at")[:5]
 
-    log_event(request, "view", meta=f"case_timeline:{case.case_number}")
+    log_event(request, "view", action="case_timeline", case_number=case.case_number)
 
     return render(
         request,
@@ -533,7 +682,7 @@ def agreement_view(request, token):
         return HttpResponseForbidden("غير مصرح لك بالوصول لهذه الاتفاقية.")
 
     if agreement.status == "under_review":
-        log_event(request, "view", meta="agreement_locked")
+        log_event(request, "view", action="agreement_locked")
         return render(request, "accounts/agreement_locked.html", {"agreement": agreement})
 
     if agreement.is_completed:
@@ -557,7 +706,7 @@ def agreement_view(request, token):
                 validate_safe_text(cleaned, "signature_base64", max_len=200000, min_len=20)
             except ValidationError:
                 messages.error(request, "بيانات التوقيع غير صالحة.")
-                log_event(request, "security_block", meta="signature_invalid")
+                log_event(request, "security_block", error_code="signature_invalid")
                 return redirect("agreement_view", token=agreement.token)
 
         if not accept_checkbox and not signature_data:
@@ -568,7 +717,7 @@ def agreement_view(request, token):
             agreement.accepted_checkbox = True
             agreement.accepted_at = timezone.now()
             agreement.status = "accepted"
-            log_event(request, "agreement_accept", meta=f"token:{agreement.token}")
+            log_event(request, "agreement_accept", token=agreement.token)
 
         if signature_data:
             try:
@@ -578,14 +727,15 @@ def agreement_view(request, token):
                     b64 = signature_data
 
                 decoded = base64.b64decode(b64)
+                metrics.observe_upload("signature", len(decoded))
                 filename = f"signature_{agreement.user.username}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.png"
                 agreement.signature_image.save(filename, ContentFile(decoded), save=False)
                 agreement.signed_at = timezone.now()
                 agreement.status = "signed"
-                log_event(request, "agreement_sign", meta=f"token:{agreement.token}")
+                log_event(request, "agreement_sign", token=agreement.token)
             except Exception:
                 messages.error(request, "تعذر حفظ التوقيع. جرّب مرة أخرى.")
-                log_event(request, "security_block", meta="signature_save_failed")
+                log_event(request, "security_block", error_code="signature_save_failed")
                 return redirect("agreement_view", token=agreement.token)
 
         if agreement.payment_required:
@@ -602,7 +752,7 @@ def agreement_view(request, token):
         messages.success(request, "تم حفظ الموافقة/التوقيع بنجاح.")
         return redirect("user_dashboard")
 
-    log_event(request, "view", meta=f"agreement_view:{agreement.token}")
+    log_event(request, "view", action="agreement_view", token=agreement.token)
     return render(request, "accounts/agreement.html", {"agreement": agreement})
 
 
@@ -651,7 +801,7 @@ def payment_page(request, token):
             client_receipt = validate_receipt_code(client_receipt, "client_payment_receipt")
         except ValidationError as e:
             messages.error(request, str(e))
-            log_event(request, "security_block", meta=f"payment_receipt_invalid:{str(e)}")
+            log_event(request, "security_block", error_code="payment_receipt_invalid", detail=str(e)[:500])
             return redirect("payment_page", token=agreement.token)
 
         if not receipt_image:
@@ -669,19 +819,37 @@ def payment_page(request, token):
             messages.error(request, f"حجم الصورة كبير. الحد الأقصى {max_size_mb}MB.")
             return redirect("payment_page", token=agreement.token)
 
+        metrics.observe_upload("receipt_image", receipt_image.size)
+
+        now = timezone.now()
         agreement.client_payment_receipt = client_receipt
-        agreement.client_paid_at = timezone.now()
+        agreement.receipt_code_normalized = receipts.normalize_receipt_code(client_receipt)
+        agreement.client_paid_at = now
         agreement.client_receipt_image = receipt_image
+        agreement.client_receipt_image_uploaded_at = now
+        receipts.attach_receipt_image(agreement, receipt_image)
+
+        # لا يمنع الإرسال: يظهر للمكتب في طابور مراجعة الدفع
+        duplicate = receipts.find_duplicate(agreement)
+        agreement.receipt_duplicate_of_id, duplicate_reason = duplicate or (None, "")
         agreement.status = "under_review"
         agreement.save()
-
-        log_event(request, "payment_submit", meta=f"token:{agreement.token} receipt:{client_receipt}")
+        receipts.index_on_commit(agreement)
+
+        log_event(
+            request,
+            "payment_submit",
+            token=agreement.token,
+            receipt=client_receipt,
+            duplicate_of=agreement.receipt_duplicate_of_id,
+            duplicate_reason=duplicate_reason,
+        )
         messages.success(request, "تم إرسال رقم الإيصال وصورته بنجاح. بانتظار موافقة المكتب.")
         return redirect("payment_pending_review", token=agreement.token)
 
     office_invoice_number = agreement.office_invoice_number or agreement.sadad_bill_number or "—"
 
-    log_event(request, "view", meta=f"payment_page:{agreement.token}")
+    log_event(request, "view", action="payment_page", token=agreement.token)
 
     return render(
         request,
@@ -712,7 +880,7 @@ def payment_pending_review(request, token):
     if not agreement.client_payment_receipt or not agreement.client_receipt_image:
         return redirect("payment_page", token=agreement.token)
 
-    log_event(request, "view", meta=f"payment_pending_review:{agreement.token}")
+    log_event(request, "view", action="payment_pending_review", token=agreement.token)
 
     return render(
         request,
@@ -734,7 +902,7 @@ def payment_success(request, token):
     if agreement.status != "paid":
         return redirect("payment_page", token=agreement.token)
 
-    log_event(request, "view", meta=f"payment_success:{agreement.token}")
+    log_event(request, "view", action="payment_success", token=agreement.token)
 
     return render(request, "accounts/payment_success.html", {"agreement": agreement})
 
@@ -746,7 +914,8 @@ def payment_success(request, token):
 def master_clients_list(request):
     q = (request.GET.get("q") or "").strip()
 
-    folders_qs = ClientMasterFolder.objects.select_related("user").all().order_by("-created_at")
+    # المنتظرون ردًا أولًا (عدادات مخزنة على الملف + folder_awaiting_idx)
+    folders_qs = ClientMasterFolder.objects.select_related("user", "user__profile").order_by(*messaging.waiting_order())
     if q:
         try:
             q_safe = validate_safe_text(q, "master_search", max_len=100, min_len=1)
@@ -764,7 +933,7 @@ def master_clients_list(request):
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
-    log_event(request, "view", meta="master_clients_list")
+    log_event(request, "view", action="master_clients_list")
 
     return render(
         request,
@@ -773,6 +942,53 @@ def master_clients_list(request):
     )
 
 
+def _client_detail_loaders(folder, mpage, epage):
+    """
+    قراءات صفحة العميل المستقلة بعد جلب الملف (انظر _dashboard_loaders).
+    """
+
+    def load_messages():
+        messages_qs = folder.messages.select_related("sender").all().order_by("-created_at")
+        page_obj = Paginator(messages_qs, 15).get_page(mpage)
+        page_obj.object_list = list(page_obj.object_list)
+        return page_obj
+
+    def load_docs():
+        return list(folder.documents.select_related("uploaded_by").all().order_by("-created_at"))
+
+    def load_profile():
+        return UserProfile.objects.filter(user_id=folder.user_id).first()
+
+    def load_client_events():
+        # ✅ NEW: عرض أحداث العميل داخل صفحة الماستر
+        client_events_qs = AuditEvent.objects.filter(user_id=folder.user_id).order_by("-created_at")
+        page_obj = Paginator(client_events_qs, 30).get_page(epage)
+        page_obj.object_list = list(page_obj.object_list)
+        return page_obj
+
+    return {
+        "msg_page_obj": load_messages,
+        "docs": load_docs,
+        "profile": load_profile,
+        "client_audit_page_obj": load_client_events,
+    }
+
+
+def _client_detail_context(folder, data):
+    return {
+        "folder": folder,
+        "profile": data["profile"],
+        "msg_page_obj": data["msg_page_obj"],
+        "docs": data["docs"],
+        "cases": folder.user.account_cases.all().order_by("-created_at"),
+        "agreements": folder.user.agreements.all().order_by("-created_at"),
+
+        # ✅ NEW context
+        "client_audit_page_obj": data["client_audit_page_obj"],
+        "mark_read_up_to": _unread_up_to(data["msg_page_obj"], "client"),
+    }
+
+
 @staff_member_required
 def master_client_detail(request, folder_id):
     folder = get_object_or_404(
@@ -780,63 +996,152 @@ def master_client_detail(request, folder_id):
         id=folder_id
     )
 
-    messages_qs = folder.messages.select_related("sender").all().order_by("-created_at")
-    docs_qs = folder.documents.select_related("uploaded_by").all().order_by("-created_at")
+    loaders = _client_detail_loaders(folder, request.GET.get("mpage"), request.GET.get("epage"))
+    data = {name: load() for name, load in loaders.items()}
+
+    log_event(request, "view", action="master_client_detail", folder_id=folder.id)
+
+    return render(request, "accounts/master/client_detail.html", _client_detail_context(folder, data))
+
 
-    msg_paginator = Paginator(messages_qs, 15)
-    msg_page = request.GET.get("mpage")
-    msg_page_obj = msg_paginator.get_page(msg_page)
+@staff_member_required
+async def master_client_detail_async(request, folder_id):
+    """
+    نفس master_client_detail، والقراءات المستقلة متوازية (ASGI: ASYNC_VIEWS).
+    """
+    try:
+        folder = await ClientMasterFolder.objects.select_related("user").aget(id=folder_id)
+    except ClientMasterFolder.DoesNotExist:
+        raise Http404("No ClientMasterFolder matches the given query.")
 
-    folder.messages.filter(direction="client", is_read=False).update(is_read=True)
+    data = await fanout.gather_reads(
+        _client_detail_loaders(folder, request.GET.get("mpage"), request.GET.get("epage"))
+    )
 
-    profile = UserProfile.objects.filter(user=folder.user).first()
+    await sync_to_async(log_event)(request, "view", action="master_client_detail", folder_id=folder.id)
 
-    # ✅ NEW: عرض أحداث العميل داخل صفحة الماستر
-    client_events_qs = AuditEvent.objects.filter(user=folder.user).order_by("-created_at")
-    client_events_paginator = Paginator(client_events_qs, 30)
-    ev_page = request.GET.get("epage")
-    client_audit_page_obj = client_events_paginator.get_page(ev_page)
+    return await sync_to_async(render)(request, "accounts/master/client_detail.html", _client_detail_context(folder, data))
 
-    log_event(request, "view", meta=f"master_client_detail:{folder.id}")
 
-    return render(
-        request,
-        "accounts/master/client_detail.html",
-        {
-            "folder": folder,
-            "profile": profile,
-            "msg_page_obj": msg_page_obj,
-            "docs": docs_qs,
-            "cases": folder.user.account_cases.all().order_by("-created_at"),
-            "agreements": folder.user.agreements.all().order_by("-created_at"),
-
-            # ✅ NEW context
-            "client_audit_page_obj": client_audit_page_obj,
-        },
+@staff_member_required
+@require_POST
+@csrf_protect
+def master_mark_messages_read(request, folder_id):
+    folder = get_object_or_404(ClientMasterFolder.objects.only("id"), id=folder_id)
+    return JsonResponse({"updated": _mark_read(folder, "client", request.POST.get("up_to"))})
+
+
+# --------------------------------------------------
+# ✅ Live updates (accounts/realtime.py)
+# SSE تحت ASGI، و poll قصير تحت WSGI (EventSource يتوقف عند 204 => الصفحة تنتقل للـ poll)
+# --------------------------------------------------
+def _event_channels(user, folder_id):
+    """
+    الموظف: قناة ملف عميل (?folder=). العميل: قناته فقط. None => غير مصرح.
+    """
+    if folder_id:
+        if not user.is_staff:
+            return None
+        try:
+            folder_id = int(folder_id)
+        except (TypeError, ValueError):
+            return None
+        if not ClientMasterFolder.objects.filter(pk=folder_id).exists():
+            return None
+        return [realtime.folder_channel(folder_id)]
+    return [realtime.user_channel(user.pk)]
+
+
+def _event_cursor(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def _sse_stream(channels, last_id, config):
+    yield f"retry: {config['RETRY_MS']}\n\n"
+    async for item in realtime.hub.subscribe(channels, last_id, config["KEEPALIVE"]):
+        if item is None:
+            yield ": ping\n\n"
+            continue
+        event_id, event, data = item
+        yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@login_required
+async def events_stream(request):
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)  # WSGI: لا نحجز thread لكل متصفح => poll
+
+    user = await request.auser()
+    channels = await sync_to_async(_event_channels)(user, request.GET.get("folder"))
+    if channels is None:
+        return HttpResponseForbidden("غير مصرح لك بالوصول.")
+
+    last_id = _event_cursor(request.headers.get("Last-Event-ID") or request.GET.get("since"))
+    if last_id is None:
+        last_id = realtime.hub.last_id  # من لحظة الطلب (لا نفقد ما يُنشر قبل أول قراءة)
+    # الاتصال قد يبقى مفتوحًا دقائق => لا نمسك اتصال DB طوال البث
+    await sync_to_async(close_old_connections)()
+
+    response = StreamingHttpResponse(
+        _sse_stream(channels, last_id, realtime.get_config()),
+        content_type="text/event-stream; charset=utf-8",
     )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: بدون تخزين مؤقت للبث
+    return response
+
+
+@login_required
+async def events_poll(request):
+    """
+    ?since=<آخر id>. بدون since => يرجع المؤشر الحالي فورًا.
+    ASGI: long-poll. WSGI: بدون انتظار + retry_ms (لا نحجز worker لكل تبويب مفتوح).
+    """
+    user = await request.auser()
+    channels = await sync_to_async(_event_channels)(user, request.GET.get("folder"))
+    if channels is None:
+        return HttpResponseForbidden("غير مصرح لك بالوصول.")
+
+    config = realtime.get_config()
+    long_poll = isinstance(request, ASGIRequest)
+    since = _event_cursor(request.GET.get("since"))
+    if since is None or since > realtime.hub.last_id:
+        items, since = [], realtime.hub.last_id
+    elif long_poll:
+        await sync_to_async(close_old_connections)()
+        items = await realtime.hub.wait_async(channels, since, config["LONGPOLL_TIMEOUT"])
+    else:
+        items = realtime.hub.since(channels, since)
+
+    return JsonResponse({
+        "last_id": items[-1][0] if items else since,
+        "events": [{"id": i, "event": event, "data": data} for i, event, data in items],
+        # المتصفح ينتظر retry_ms قبل الطلب التالي ويضاعفها حتى retry_max_ms بدون أحداث
+        "retry_ms": 0 if long_poll else config["POLL_INTERVAL_MS"],
+        "retry_max_ms": 0 if long_poll else config["POLL_MAX_INTERVAL_MS"],
+    })
 
 
 @staff_member_required
 @require_POST
 @csrf_protect
 def master_send_message(request, folder_id):
-    folder = get_object_or_404(ClientMasterFolder, id=folder_id)
+    # folder.user يُستخدم لاحقًا (آخر قضية) => نفس الاستعلام
+    folder = get_object_or_404(ClientMasterFolder.objects.select_related("user"), id=folder_id)
 
     body = (request.POST.get("message") or "").strip()
     try:
         body = validate_safe_multiline(body, "master_message", max_len=1500, min_len=1)
     except ValidationError as e:
         messages.error(request, str(e))
-        log_event(request, "security_block", meta=f"master_message_invalid:{str(e)}")
+        log_event(request, "security_block", error_code="master_message_invalid", detail=str(e)[:500])
         return redirect("master_client_detail", folder_id=folder.id)
 
-    ClientMasterMessage.objects.create(
-        folder=folder,
-        sender=request.user,
-        direction="lawyer",
-        message=body,
-        is_read=True,
-    )
+    # العميل ما قرأها بعد (تُعلّم عبر client_mark_messages_read)
+    messaging.send_message(folder, request.user, "lawyer", body)
 
     try:
         last_case = folder.user.account_cases.order_by("-created_at").first()
@@ -844,11 +1149,51 @@ def master_send_message(request, folder_id):
     except Exception:
         pass
 
-    log_event(request, "master_message", meta=f"folder:{folder.id}")
+    log_event(request, "master_message", folder_id=folder.id)
     messages.success(request, "تم إرسال الرسالة للعميل.")
     return redirect("master_client_detail", folder_id=folder.id)
 
 
+# --------------------------------------------------
+# ✅ Broadcast: رسالة واحدة لمجموعة عملاء (accounts/broadcast.py)
+# --------------------------------------------------
+@staff_member_required
+@csrf_protect
+def master_broadcast(request):
+    audience = request.POST.get("audience") or request.GET.get("audience") or ""
+    if audience not in broadcast.AUDIENCES:
+        audience = ""
+
+    if request.method == "POST":
+        body = (request.POST.get("message") or "").strip()
+        try:
+            body = validate_safe_multiline(body, "master_message", max_len=1500, min_len=1)
+        except ValidationError as e:
+            messages.error(request, str(e))
+            log_event(request, "security_block", error_code="master_broadcast_invalid", detail=str(e)[:500])
+            return redirect(f"{reverse('master_broadcast')}?audience={audience}")
+
+        if not audience:
+            messages.error(request, "اختر فئة المستلمين.")
+            return redirect("master_broadcast")
+
+        sent = broadcast.send_broadcast(request.user, body, broadcast.audience_folders(audience))
+        log_event(request, "master_message", broadcast=audience, recipients=sent)
+        messages.success(request, f"تم إرسال الرسالة إلى {sent} عميل.")
+        return redirect("master_clients_list")
+
+    recipients = broadcast.audience_folders(audience).count() if audience else None
+    return render(
+        request,
+        "accounts/master/broadcast.html",
+        {
+            "audiences": [(key, label) for key, (label, _) in broadcast.AUDIENCES.items()],
+            "audience": audience,
+            "recipients": recipients,
+        },
+    )
+
+
 # --------------------------------------------------
 # ✅ NEW: Master uploads document for the client (secure)
 # --------------------------------------------------
@@ -865,7 +1210,7 @@ def master_upload_document(request, folder_id):
         title = validate_safe_text(title or "مرفق", "doc_title", max_len=120, min_len=1)
     except ValidationError as e:
         messages.error(request, str(e))
-        log_event(request, "security_block", meta=f"master_doc_title_invalid:{str(e)}")
+        log_event(request, "security_block", error_code="master_doc_title_invalid", detail=str(e)[:500])
         return redirect("master_client_detail", folder_id=folder.id)
 
     if not file_obj:
@@ -881,15 +1226,17 @@ def master_upload_document(request, folder_id):
     content_type = getattr(file_obj, "content_type", "") or ""
     if content_type not in allowed_content_types:
         messages.error(request, "نوع الملف غير مدعوم. المسموح: PDF / JPG / PNG / WEBP.")
-        log_event(request, "security_block", meta=f"master_doc_blocked_type:{content_type}")
+        log_event(request, "security_block", error_code="master_doc_blocked_type", detail=content_type)
         return redirect("master_client_detail", folder_id=folder.id)
 
     max_size_mb = 12
     if file_obj.size > max_size_mb * 1024 * 1024:
         messages.error(request, f"حجم الملف كبير. الحد الأقصى {max_size_mb}MB.")
-        log_event(request, "security_block", meta=f"master_doc_too_large:{file_obj.size}")
+        log_event(request, "security_block", error_code="master_doc_too_large", detail=file_obj.size)
         return redirect("master_client_detail", folder_id=folder.id)
 
+    metrics.observe_upload("master_document", file_obj.size)
+
     ClientMasterDocument.objects.create(
         folder=folder,
         title=title,
@@ -897,40 +1244,21 @@ def master_upload_document(request, folder_id):
         uploaded_by=request.user,
     )
 
-    log_event(request, "master_document_upload", meta=f"folder:{folder.id} title:{title}")
+    log_event(request, "master_document_upload", folder_id=folder.id, title=title)
     messages.success(request, "تم رفع المرفق للعميل بنجاح.")
     return redirect("master_client_detail", folder_id=folder.id)
 
 
 @staff_member_required
 def master_events_dashboard(request):
-    q = (request.GET.get("q") or "").strip()
-    et = (request.GET.get("type") or "").strip()
-
     qs = AuditEvent.objects.select_related("user").all().order_by("-created_at")
-
-    if et:
-        allowed = {c[0] for c in AuditEvent.EVENT_TYPES}
-        if et in allowed:
-            qs = qs.filter(event_type=et)
-
-    if q:
-        try:
-            q_safe = validate_safe_text(q, "events_search", max_len=80, min_len=1)
-        except ValidationError:
-            q_safe = ""
-        if q_safe:
-            qs = qs.filter(
-                Q(user__username__icontains=q_safe) |
-                Q(path__icontains=q_safe) |
-                Q(ip__icontains=q_safe)
-            )
+    qs, q, et = filter_audit_events(qs, request.GET)
 
     paginator = Paginator(qs, 30)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
-    log_event(request, "view", meta="master_events_dashboard")
+    log_event(request, "view", action="master_events_dashboard")
 
     return render(
         request,
@@ -942,3 +1270,119 @@ def master_events_dashboard(request):
             "types": AuditEvent.EVENT_TYPES,
         },
     )
+
+
+@staff_member_required
+def master_events_export(request):
+    """
+    تصدير السجلات (CSV / NDJSON) بنفس فلاتر master_events_dashboard.
+    """
+    qs = AuditEvent.objects.order_by("-created_at")
+    qs, _, _ = filter_audit_events(qs, request.GET)
+    log_event(request, "data_export", action="master_events_export")
+    return stream_export(qs, AUDIT_EVENT_COLUMNS, request.GET.get("format", "csv"), "audit_events")
+
+
+@staff_member_required
+def master_payments_export(request):
+    """
+    بيانات الدفع للاتفاقيات (للمحاسب). ?status= اختياري.
+    """
+    qs = UserAgreement.objects.order_by("-created_at")
+    status = (request.GET.get("status") or "").strip()
+    if status in {c[0] for c in UserAgreement.STATUS}:
+        qs = qs.filter(status=status)
+    log_event(request, "data_export", action="master_payments_export")
+    return stream_export(qs, PAYMENT_COLUMNS, request.GET.get("format", "csv"), "payments")
+
+
+# --------------------------------------------------
+# ✅ Payment review queue (كل اتفاقيات under_review في صفحة واحدة)
+# اعتماد/رفض عبر fetch (accounts/payments.py) بدون إعادة تحميل
+# --------------------------------------------------
+PAYMENT_QUEUE_LIMIT = 500
+PAYMENT_QUEUE_FIELDS = (
+    "id",
+    "token",
+    "title",
+    "payment_amount",
+    "client_payment_receipt",
+    "client_paid_at",
+    "client_receipt_image",
+    "client_receipt_thumb",
+    "receipt_code_normalized",
+    "receipt_duplicate_of__id",
+    "receipt_duplicate_of__token",
+    "receipt_duplicate_of__status",
+    "receipt_duplicate_of__receipt_code_normalized",
+    "receipt_duplicate_of__user__username",
+    "user__username",
+    "user__first_name",
+    "user__last_name",
+    "user__email",
+    "user__phone_number",
+)
+
+
+@staff_member_required
+def master_payments_queue(request):
+    # استعلام واحد مهما كان العدد (بدون نص الاتفاقية/التوقيع)، الأقدم أولًا
+    rows = list(
+        UserAgreement.objects.filter(status="under_review")
+        .select_related("user", "receipt_duplicate_of__user")
+        .only(*PAYMENT_QUEUE_FIELDS)
+        .order_by(F("client_paid_at").asc(nulls_first=True), "id")[:PAYMENT_QUEUE_LIMIT + 1]
+    )
+
+    log_event(request, "view", action="master_payments_queue")
+
+    return render(
+        request,
+        "accounts/master/payments_queue.html",
+        {
+            "agreements": rows[:PAYMENT_QUEUE_LIMIT],
+            "truncated": len(rows) > PAYMENT_QUEUE_LIMIT,
+            "limit": PAYMENT_QUEUE_LIMIT,
+        },
+    )
+
+
+def _review_payment(request, agreement_id, action):
+    # under_review فقط: ضغطتان أو موظفان على نفس الإيصال => الثانية updated = 0
+    qs = UserAgreement.objects.filter(pk=agreement_id, status="under_review")
+    if action == "approve":
+        updated, rows = payments.approve_payments(qs)
+        status = "paid"
+    else:
+        updated, rows = payments.reject_payments(qs)
+        status = "payment_pending"
+    # الصف مقفل داخل payments => updated = 0 يعني أن طلبًا آخر سبق (لا audit ولا حدث)
+    if updated:
+        log_event(request, "admin_action", action=f"{action}_payment", count=len(rows), status=status, agreement_id=agreement_id)
+    return JsonResponse({"updated": updated, "status": status if updated else None})
+
+
+@staff_member_required
+@require_POST
+@csrf_protect
+def master_payment_approve(request, agreement_id):
+    return _review_payment(request, agreement_id, "approve")
+
+
+@staff_member_required
+@require_POST
+@csrf_protect
+def master_payment_reject(request, agreement_id):
+    return _review_payment(request, agreement_id, "reject")
+
+
+@staff_member_required
+def master_perf_dashboard(request):
+    return render(
+        request,
+        "accounts/master/perf_dashboard.html",
+        {
+            "rows": perf.registry.snapshot(),
+            "flush_interval": perf.registry.flush_interval,
+        },
+    )
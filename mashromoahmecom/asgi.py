@@ -3,6 +3,21 @@ ASGI config for mashromoahmecom project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Live updates (accounts/realtime.py) use Server-Sent Events only when served
+through this entry point, e.g.:
+
+    uvicorn mashromoahmecom.asgi:application --workers 1
+
+Each open stream is a coroutine, not a thread. Under WSGI the same pages fall
+back to short-polling /accounts/events/poll/.
+
+ASYNC_VIEWS is off by default. ASYNC_VIEWS=1 switches the dashboard and client
+detail pages to async variants that run independent reads concurrently
+(accounts/fanout.py), with one extra DB connection per read. On SQLite,
+``python manage.py run_benchmarks --concurrency N`` measures them about 2x
+slower than the sync views. Enable it only after that benchmark shows a gain
+on the production database.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
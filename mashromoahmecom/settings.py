@@ -48,7 +48,16 @@ AUTH_USER_MODEL = 'accounts.User'
 # MIDDLEWARE
 # --------------------------------------------------
 MIDDLEWARE = [
+    # ✅ قياس الأداء لكل view (أولًا حتى يشمل زمن باقي الطبقات)
+    'accounts.middleware.PerformanceMiddleware',
+    'accounts.middleware.QueryBudgetMiddleware',
+
     'django.middleware.security.SecurityMiddleware',
+    'accounts.middleware.StaticCacheControlMiddleware',
+
+    # ✅ رفض مبكر (قبل Session/CSRF/Auth): rate limit بالـ IP + قفل الحسابات
+    'accounts.middleware.SimpleRateLimitMiddleware',
+    'accounts.middleware.LoginLockoutMiddleware',
 
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -62,7 +71,6 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
     # ✅ Security hardening
-    'accounts.middleware.SimpleRateLimitMiddleware',
     'accounts.middleware.SecurityHeadersMiddleware',
 ]
 
@@ -84,6 +92,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'accounts.context_processors.header_badges',
             ],
         },
     },
@@ -135,6 +144,27 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
+# ✅ أسماء ملفات بـ hash المحتوى + نسخ .gz/.br (accounts/storage.py)
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "accounts.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+
+# ✅ بناء CSS محلي بدل Tailwind CDN: python manage.py build_assets
+# قبل البناء ({% app_stylesheet %}) القوالب تستخدم TAILWIND_CDN_URL (نسخة مثبتة)
+TAILWIND_CLI = os.environ.get("TAILWIND_CLI", "tailwindcss")
+TAILWIND_CDN_URL = "https://cdn.tailwindcss.com/3.4.17"
+ASSETS_CSS_INPUT = BASE_DIR / 'assets' / 'css' / 'app.css'
+ASSETS_CSS_OUTPUT = BASE_DIR / 'static' / 'css' / 'app.css'
+
+# Cache-Control للملفات الثابتة (hashed = سنة كاملة immutable)
+STATIC_HASHED_MAX_AGE = 60 * 60 * 24 * 365
+STATIC_DEFAULT_MAX_AGE = 60 * 60
+
 # --------------------------------------------------
 # MEDIA FILES
 # --------------------------------------------------
@@ -170,7 +200,10 @@ SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 # --------------------------------------------------
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        # LocMemCache + عدّ hits/misses لقياس الأداء (accounts/cache.py)
+        # لكل عملية cache خاص => مع أكثر من worker: Redis / Memcached
+        # (coalesce في AUDIT_EVENT_POLICIES + حدود الطلبات والدخول تفترض cache مشتركًا)
+        "BACKEND": "accounts.cache.InstrumentedLocMemCache",
         "LOCATION": "security-cache",
     }
 }
@@ -189,5 +222,90 @@ LOGGING = {
     },
     "loggers": {
         "security": {"handlers": ["console"], "level": "WARNING", "propagate": False},
+        "perf": {"handlers": ["console"], "level": "INFO", "propagate": False},
     },
 }
+
+# --------------------------------------------------
+# ✅ LOGIN LOCKOUT (accounts/throttle.py)
+# --------------------------------------------------
+# القفل = BASE_SECONDS * 2^(الفشل - العتبة) بحد أقصى MAX_SECONDS.
+# عدد الـ reverse proxies أمام التطبيق (كل واحد يضيف عنوانًا إلى X-Forwarded-For).
+# 0 = REMOTE_ADDR فقط (X-Forwarded-For يتحكم فيه العميل).
+TRUSTED_PROXY_COUNT = int(os.environ.get("TRUSTED_PROXY_COUNT", "0"))
+# CACHE يجب أن يكون مشتركًا بين الـ workers في الإنتاج (Redis/Memcached).
+LOGIN_THROTTLE = {
+    "CACHE": "default",
+    "IP_USER_THRESHOLD": 5,    # فشل من نفس IP لنفس الحساب
+    "BASE_SECONDS": 30,
+    "MAX_SECONDS": 3600,
+    "FAILURE_TTL": 86400,
+}
+
+# --------------------------------------------------
+# ✅ HEADER BADGES (accounts/badges.py) — عدادات الهيدر من cache
+# --------------------------------------------------
+HEADER_BADGES = {
+    "CACHE": "default",
+    "TTL": 300,  # ثواني (شبكة أمان؛ الـ signals تحذف القيمة عند التغيير)
+}
+
+# --------------------------------------------------
+# ✅ REALTIME (accounts/realtime.py) — SSE / long-poll تحت ASGI، poll قصير تحت WSGI
+# --------------------------------------------------
+REALTIME = {
+    "BACKLOG": 1000,          # أحداث محفوظة لإعادة الاتصال (Last-Event-ID)
+    "KEEPALIVE": 15,          # ثواني
+    "LONGPOLL_TIMEOUT": 25,   # ثواني (ASGI فقط؛ أقل من timeout الـ proxy)
+    "RETRY_MS": 3000,
+    "POLL_INTERVAL_MS": 3000,       # WSGI
+    "POLL_MAX_INTERVAL_MS": 30000,  # WSGI
+}
+
+# صفحات الداشبورد / ملف العميل: نسخة async بقراءات متوازية (accounts/fanout.py)
+# مغلق افتراضيًا: اتصال DB لكل قراءة، وعلى SQLite أبطأ بحوالي 2x من النسخة المتزامنة.
+# ASYNC_VIEWS=1 (تحت ASGI) فقط بعد run_benchmarks --concurrency على قاعدة الإنتاج يُظهر مكسبًا
+ASYNC_VIEWS = os.environ.get("ASYNC_VIEWS") == "1"
+
+# --------------------------------------------------
+# ✅ AUDIT POLICIES (accounts/audit.py) — أحداث الأمان تُسجل دائمًا
+# --------------------------------------------------
+# mode: "always" | "sample" (rate 0..1) | "coalesce" (window ثواني، flush_every)
+AUDIT_EVENT_POLICIES = {
+    "view": {"mode": "coalesce", "window": 300, "flush_every": 20},
+}
+
+# أحداث طلبات GET تُكتب دفعات من thread خلفي (صفحات العرض لا تكتب في DB)
+# تحت الاختبارات الكتابة فورية (mashromoahmecom/test_runner.py)
+AUDIT_DEFERRED = {
+    "ENABLED": True,
+    "FLUSH_INTERVAL": 2.0,  # ثواني
+    "MAX_BUFFER": 500,      # flush فوري عند هذا العدد
+}
+
+# --------------------------------------------------
+# ✅ AUDIT RETENTION (accounts/retention.py) — python manage.py prune_audit_events يوميًا
+# --------------------------------------------------
+AUDIT_RETENTION = {
+    "RAW_DAYS": 180,                   # الافتراضي لكل الأنواع
+    "RAW_DAYS_BY_TYPE": {"view": 30},  # تصفح الصفحات قليل القيمة
+    "ARCHIVE_DIR": BASE_DIR / "audit_archive",
+    "BATCH_SIZE": 5000,
+    "BATCH_SLEEP": 0.05,               # ثواني بين الدفعات (تخفيف الضغط على DB)
+}
+
+# --------------------------------------------------
+# ✅ PERFORMANCE (accounts/perf.py)
+# --------------------------------------------------
+PERF_ENABLED = True
+PERF_FLUSH_INTERVAL = 300  # تفريغ histograms إلى logger "perf" كل 5 دقائق
+
+# Query budget لكل view (accounts/urls.py): log في DEBUG
+# الاختبارات: "raise" عبر TEST_RUNNER و override_settings في accounts/test_query_budgets.py
+QUERY_BUDGET_MODE = "log" if DEBUG else "off"
+TEST_RUNNER = "mashromoahmecom.test_runner.TestRunner"
+QUERY_BUDGET_DUPLICATE_THRESHOLD = 5  # نفس SQL >= 5 مرات في طلب واحد => N+1
+
+# /metrics (Prometheus) — prometheus_client اختيارية.
+# لعدة workers: PROMETHEUS_MULTIPROC_DIR=/path/to/empty/dir في بيئة التشغيل.
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]
@@ -0,0 +1,16 @@
+# mashromoahmecom/test_runner.py
+"""
+python manage.py test: إعدادات الاختبار هنا بدل فحص sys.argv في settings.py
+(بنفس طريقة setup_test_environment في Django مع DEBUG / EMAIL_BACKEND).
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # تجاوز query budget لأي view => QueryBudgetExceeded (accounts/query_budget.py)
+        settings.QUERY_BUDGET_MODE = "raise"
+        # أحداث GET تُكتب فورًا (بدون thread خلفي) => النتائج حتمية داخل transaction الاختبار
+        settings.AUDIT_DEFERRED = {**settings.AUDIT_DEFERRED, "ENABLED": False}
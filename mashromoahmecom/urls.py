@@ -1,10 +1,15 @@
 from django.contrib import admin
 from django.urls import path, include
 from accounts import views as accounts_views
+from accounts.metrics import metrics_view
+from accounts.query_budget import query_budget
 
 urlpatterns = [
     path("admin/", admin.site.urls),
 
+    # ✅ Prometheus text format (سكربر محلي فقط)
+    path("metrics", metrics_view, name="metrics"),
+
     path("accounts/", include("accounts.urls")),
     path("", include("legal.urls")),
     path("", include("operations.urls")),
@@ -12,7 +17,7 @@ urlpatterns = [
     # 🔴 هذا السطر إلزامي
     path(
         "client/send-message/",
-        accounts_views.client_send_message,
+        query_budget(18)(accounts_views.client_send_message),
         name="client_send_message",
     ),
 ]
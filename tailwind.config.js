@@ -0,0 +1,14 @@
+/** Tailwind config الموحّد (بدل tailwind.config داخل كل قالب)
+ *  البناء: python manage.py build_assets
+ */
+module.exports = {
+  content: [
+    "./templates/**/*.html",
+    "./*/templates/**/*.html",
+  ],
+  theme: {
+    // مشترك مع Tailwind CDN قبل البناء ({% app_stylesheet %} في accounts/templatetags/assets.py)
+    extend: require("./assets/tailwind-theme.json"),
+  },
+  plugins: [],
+};